@@ -1,25 +1,122 @@
-# app/calculation.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Optional
-from app.operations import get_operation_instance
+import numpy as np
+from app.operations import get_operation, resolve_operation, operation_name
+from app.calculation_cache import ResultCache
+from app.history_buffer import HistoryRow
 from app.exceptions import InvalidOperationError, OperandError
 
-@dataclass
+@dataclass(slots=True)
 class Calculation:
+    """One calculation; slotted, so a million of them carry no per-instance dicts."""
     operation_token: str
     a: float
     b: float
     result: Optional[float] = None
     error: Optional[str] = None
+    op_id: Optional[int] = None  # resolved once by the factory
+
+    @property
+    def operation(self) -> str:
+        """Canonical operation name; aliases like '+' and 'add' share one."""
+        return operation_name(self._resolved_id())
+
+    def as_row(self, timestamp: Any = None) -> HistoryRow:
+        """The history row for this calculation, as HistoryManager.add_row takes it."""
+        return (operation_name(self._resolved_id()), self.a, self.b, self.result, self.error, timestamp)
 
-    def perform(self) -> float:
-        op = get_operation_instance(self.operation_token)
+    def _resolved_id(self) -> int:
+        if self.op_id is None:
+            self.op_id = resolve_operation(self.operation_token)
+        return self.op_id
+
+    def perform(self, cache: Optional[ResultCache] = None) -> float:
+        op_id = self._resolved_id()
+        key = ResultCache.key(op_id, self.a, self.b) if cache is not None else None
+        if key is not None:
+            entry = cache.get(key)
+            if entry is not None:
+                self.result, self.error = entry.result, entry.error
+                entry.raise_error()
+                return self.result
+        op = get_operation(op_id)
         try:
             self.result = op.execute(self.a, self.b)
-            return self.result
         except Exception as e:
             self.error = str(e)
+            if key is not None:
+                cache.put(key, error=e)
             raise
+        if key is not None:
+            cache.put(key, result=self.result)
+        return self.result
+
+@dataclass
+class BatchCalculation:
+    """Column-oriented counterpart of Calculation evaluated with array kernels.
+
+    After `perform`, `results` holds NaN and `errors` holds the message for
+    every row that broke a domain rule (or named an unknown operation).
+    """
+    operation_tokens: np.ndarray
+    a: np.ndarray
+    b: np.ndarray
+    results: Optional[np.ndarray] = None
+    errors: Optional[np.ndarray] = None
+    error_masks: dict = field(default_factory=dict)
+    op_ids: Optional[np.ndarray] = None  # -1 where the token was not recognised
+
+    def __len__(self) -> int:
+        return len(self.a)
+
+    @property
+    def error_mask(self) -> np.ndarray:
+        if self.errors is None:
+            raise ValueError("Batch has not been performed")
+        return np.not_equal(self.errors, None)
+
+    def perform(self) -> np.ndarray:
+        n = len(self.a)
+        results = np.full(n, np.nan)
+        errors = np.full(n, None, dtype=object)
+        masks = {}
+
+        # resolve each distinct token once; aliases such as "+" and "add"
+        # map to the same operation ID and share one kernel call
+        tokens, inverse = np.unique(self.operation_tokens, return_inverse=True)
+        token_ids = np.empty(len(tokens), dtype=np.int16)
+        for i, token in enumerate(tokens):
+            try:
+                if not token.strip():
+                    raise InvalidOperationError("Operation must be provided")
+                token_ids[i] = resolve_operation(token)
+            except InvalidOperationError as e:
+                token_ids[i] = -1
+                rows = inverse == i
+                errors[rows] = str(e)
+                masks[str(e)] = masks[str(e)] | rows if str(e) in masks else rows
+        op_ids = token_ids[inverse.ravel()] if n else np.empty(0, dtype=np.int16)
+
+        rows_by_op = {}
+        for op_id in np.unique(token_ids):
+            if op_id >= 0:
+                rows_by_op[int(op_id)] = (get_operation(int(op_id)), op_ids == op_id)
+
+        for op, rows in rows_by_op.values():
+            values, op_errors = op.execute_array(self.a[rows], self.b[rows])
+            results[rows] = values
+            idx = np.flatnonzero(rows)
+            for message, sub_mask in op_errors.items():
+                full = np.zeros(n, dtype=bool)
+                full[idx[sub_mask]] = True
+                errors[full] = message
+                masks[message] = masks[message] | full if message in masks else full
+
+        self.op_ids = op_ids
+        self.results = results
+        self.errors = errors
+        self.error_masks = masks
+        return results
 
 class CalculationFactory:
     """Validates, converts, and returns a Calculation instance."""
@@ -40,8 +137,34 @@ class CalculationFactory:
         except Exception as e:
             raise OperandError(f"Operands must be numbers: {e}")
 
-        # verify operation exists (Factory)
-        # get_operation_instance will raise InvalidOperationError if unknown
-        _ = get_operation_instance(operation_token)
+        # verify operation exists (Factory) and resolve it once;
+        # resolve_operation raises InvalidOperationError if unknown
+        op_id = resolve_operation(operation_token)
+
+        return Calculation(operation_token, a, b, op_id=op_id)
+
+    @staticmethod
+    def create_batch(operation_tokens: Any, a_raw: Any, b_raw: Any) -> BatchCalculation:
+        """Converts array-likes (lists, ndarrays, DataFrame columns) into a BatchCalculation.
+
+        `operation_tokens` may be a single token applied to every row. Unknown
+        tokens are reported per row by `perform` rather than raised here.
+        """
+        try:
+            a = np.asarray(a_raw, dtype=np.float64).ravel()
+            b = np.asarray(b_raw, dtype=np.float64).ravel()
+        except Exception as e:
+            raise OperandError(f"Operands must be numbers: {e}")
+        if a.shape != b.shape:
+            raise OperandError(f"Operand lengths differ: {len(a)} != {len(b)}")
+
+        if isinstance(operation_tokens, str):
+            if operation_tokens.strip() == "":
+                raise InvalidOperationError("Operation must be provided")
+            tokens = np.full(len(a), operation_tokens)
+        else:
+            tokens = np.asarray(operation_tokens).astype(str).ravel()
+            if tokens.shape != a.shape:
+                raise OperandError(f"Operation count differs from operands: {len(tokens)} != {len(a)}")
 
-        return Calculation(operation_token, a, b)
+        return BatchCalculation(tokens, a, b)
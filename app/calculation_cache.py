@@ -0,0 +1,96 @@
+# app/calculation_cache.py
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple, Type
+
+
+@dataclass
+class CacheEntry:
+    """Outcome of one calculation: a result, or the exception it raised."""
+    result: Optional[float] = None
+    error_type: Optional[Type[BaseException]] = None
+    error: Optional[str] = None
+    expires_at: Optional[float] = None
+
+    def raise_error(self) -> None:
+        if self.error_type is not None:
+            raise self.error_type(self.error)
+
+
+class ResultCache:
+    """Bounded LRU memo of calculation outcomes with an optional TTL.
+
+    Errors such as division by zero are cached like results and re-raised
+    with their original type on a hit.
+    """
+    def __init__(self, capacity: int = 1024, ttl_seconds: Optional[float] = None,
+                 clock=time.monotonic):
+        self.capacity = max(int(capacity), 0)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at is not None and entry.expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, result: Optional[float] = None,
+            error: Optional[BaseException] = None) -> None:
+        if self.capacity == 0:
+            return
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds else None
+        if error is not None:
+            entry = CacheEntry(error_type=type(error), error=str(error), expires_at=expires_at)
+        else:
+            entry = CacheEntry(result=result, expires_at=expires_at)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @staticmethod
+    def key(op_id: int, a: float, b: float) -> Optional[Tuple[int, float, float, bool, bool]]:
+        """Cache key of a calculation; None when it must not be cached.
+
+        0.0 == -0.0, so the operands' sign bits are part of the key
+        (1 / -0.0 and 1 / 0.0 differ). NaN never equals itself, so NaN
+        operands would only fill the cache with entries nothing can hit.
+        """
+        if a != a or b != b:
+            return None
+        return (op_id, a, b, math.copysign(1.0, a) < 0, math.copysign(1.0, b) < 0)
@@ -0,0 +1,257 @@
+# app/calculator_batch.py
+"""Non-interactive batch mode: `python -m app.calculator_batch jobs.csv -o results.csv`.
+
+Jobs are streamed from a CSV file (header `operation,a,b`) or a JSON Lines
+file (`{"operation": ..., "a": ..., "b": ...}` per line), or from stdin,
+and evaluated `chunk_size` rows at a time through the array kernels.
+Results and errors are written as each chunk finishes, so memory use does
+not grow with the input.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from app.calculation import CalculationFactory
+from app.operations import operation_name
+
+Job = Tuple[Any, Any, Any]  # operation token, raw a, raw b
+ResultRow = Tuple[Any, Any, Any, Optional[float], Optional[str]]
+
+RESULT_COLUMNS = ["operation", "a", "b", "result", "error"]
+FORMATS = ("csv", "jsonl")
+
+
+class MalformedLine(str):
+    """Stands in for the operation of an input line that could not be parsed; the text is the error."""
+
+
+@dataclass
+class BatchReport:
+    rows: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"Processed {self.rows} rows ({self.errors} errors) in {self.seconds:.3f}s: "
+                f"{self.rows_per_second:,.0f} rows/sec")
+
+
+def detect_format(path: Any, fmt: str = "auto") -> str:
+    """Picks csv/jsonl from the file extension when `fmt` is "auto"; stdin defaults to csv."""
+    fmt = fmt.lower()
+    if fmt == "auto":
+        suffix = Path(path).suffix.lower() if isinstance(path, (str, Path)) and str(path) != "-" else ""
+        fmt = "jsonl" if suffix in (".jsonl", ".ndjson", ".json") else "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown batch format: {fmt}")
+    return fmt
+
+
+def read_jobs(stream: IO[str], fmt: str = "csv") -> Iterator[Job]:
+    """Yields (operation, a, b) one row at a time.
+
+    A JSONL line that does not parse to an object yields a MalformedLine
+    naming the line number in place of the operation.
+    """
+    if fmt == "jsonl":
+        for lineno, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                yield MalformedLine(f"Line {lineno}: invalid JSON: {e}"), None, None
+                continue
+            if not isinstance(job, dict):
+                yield MalformedLine(f"Line {lineno}: expected a JSON object"), None, None
+                continue
+            yield job.get("operation"), job.get("a"), job.get("b")
+        return
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [c.strip().lower() for c in header]
+    try:
+        idx = [columns.index(c) for c in ("operation", "a", "b")]
+    except ValueError:
+        raise ValueError("Batch CSV needs a header with operation, a and b columns") from None
+    width = max(idx) + 1
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        yield row[idx[0]], row[idx[1]], row[idx[2]]
+
+
+def chunked(jobs: Iterable[Job], size: int) -> Iterator[List[Job]]:
+    it = iter(jobs)
+    while True:
+        chunk = list(islice(it, max(int(size), 1)))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_column(values: List[Any], which: str) -> Tuple[np.ndarray, List[Optional[str]]]:
+    # numpy would turn None into NaN, so columns with missing values take the slow path
+    if not any(v is None for v in values):
+        try:
+            return np.array(values, dtype=np.float64), [None] * len(values)
+        except (TypeError, ValueError):
+            pass
+    # slow path: find the bad rows one by one
+    parsed = np.empty(len(values))
+    errors: List[Optional[str]] = [None] * len(values)
+    for i, v in enumerate(values):
+        if v is None or (isinstance(v, str) and v.strip() == ""):
+            parsed[i], errors[i] = 0.0, f"{which} operand empty"
+            continue
+        try:
+            parsed[i] = float(v)
+        except (TypeError, ValueError) as e:
+            parsed[i], errors[i] = 0.0, f"Operands must be numbers: {e}"
+    return parsed, errors
+
+
+def evaluate_chunk(jobs: List[Job]) -> Tuple[List[ResultRow], np.ndarray]:
+    """Evaluates one chunk; returns result rows and each row's operation ID.
+
+    The ID is -1 only where the operation is unknown or the line did not
+    parse; rows with bad operands keep theirs and carry the error.
+    """
+    tokens = ["" if j[0] is None or isinstance(j[0], MalformedLine) else str(j[0]) for j in jobs]
+    a, a_errors = _parse_column([j[1] for j in jobs], "First")
+    b, b_errors = _parse_column([j[2] for j in jobs], "Second")
+    batch = CalculationFactory.create_batch(tokens, a, b)
+    batch.perform()
+    rows: List[ResultRow] = []
+    for i, (op, a_raw, b_raw) in enumerate(jobs):
+        if isinstance(op, MalformedLine):
+            rows.append((None, None, None, None, str(op)))
+            continue
+        error = a_errors[i] or b_errors[i] or batch.errors[i]
+        result = None if error is not None else float(batch.results[i])
+        rows.append((op, a_raw, b_raw, result, error))
+    return rows, batch.op_ids
+
+
+class _ResultWriter:
+    def __init__(self, stream: IO[str], fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == "csv":
+            self._csv = csv.writer(stream, lineterminator="\n")
+            self._csv.writerow(RESULT_COLUMNS)
+
+    def write(self, rows: List[ResultRow]) -> None:
+        if self.fmt == "csv":
+            self._csv.writerows(["" if v is None else v for v in row] for row in rows)
+        else:
+            self.stream.writelines(json.dumps(dict(zip(RESULT_COLUMNS, row))) + "\n" for row in rows)
+
+
+@contextmanager
+def _open(target: Any, mode: str):
+    if target == "-" or target is None:
+        yield sys.stdin if "r" in mode else sys.stdout
+    elif isinstance(target, io.IOBase) or hasattr(target, "write" if "w" in mode else "read"):
+        yield target
+    else:
+        if "w" in mode:
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+        with open(target, mode, newline="", encoding="utf-8") as f:
+            yield f
+
+
+def record_rows(history, rows: List[ResultRow], op_ids: np.ndarray) -> None:
+    """Adds evaluated rows to `history`, under the canonical operation name where known."""
+    timestamp = time.time_ns()
+    history.add_many(
+        (operation_name(int(op_id)) if op_id >= 0 else ("" if op is None else str(op)),
+         _number(a), _number(b), result, error, timestamp)
+        for (op, a, b, result, error), op_id in zip(rows, op_ids))
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def run_batch(source: Any, output: Any, input_format: str = "auto", output_format: str = "auto",
+              chunk_size: int = 1000, history=None, workers: int = 1) -> BatchReport:
+    """Streams jobs from `source` to `output` (paths, open files or "-").
+
+    When `history` is given every row is also added to it. With
+    `workers` > 1 chunks are evaluated in a process pool; results are
+    still written and recorded in input order.
+    """
+    in_fmt = detect_format(source, input_format)
+    out_fmt = detect_format(output, output_format)
+    report = BatchReport()
+    start = time.perf_counter()
+    with _open(source, "r") as src, _open(output, "w") as dst:
+        writer = _ResultWriter(dst, out_fmt)
+        chunks = chunked(read_jobs(src, in_fmt), chunk_size)
+        if workers > 1:
+            # multiprocessing is only imported for parallel runs
+            from app.calculator_parallel import evaluate_parallel
+            evaluated = evaluate_parallel(chunks, evaluate_chunk, workers=workers)
+        else:
+            evaluated = map(evaluate_chunk, chunks)
+        for rows, op_ids in evaluated:
+            writer.write(rows)
+            if history is not None:
+                record_rows(history, rows, op_ids)
+            report.rows += len(rows)
+            report.errors += sum(1 for r in rows if r[4] is not None)
+        dst.flush()
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.calculator_repl import Calculator
+
+    parser = argparse.ArgumentParser(description="Evaluate calculator jobs in batch.")
+    parser.add_argument("input", nargs="?", default="-", help="CSV or JSON Lines file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="results file, or - for stdout")
+    parser.add_argument("--input-format", default="auto", choices=("auto",) + FORMATS)
+    parser.add_argument("--output-format", default="auto", choices=("auto",) + FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (1 = evaluate in-process)")
+    parser.add_argument("--no-history", action="store_true", help="do not add rows to history")
+    parser.add_argument("--no-autosave", action="store_true", help="skip per-row autosave writes")
+    parser.add_argument("--no-undo", action="store_true", help="do not make the run undoable")
+    args = parser.parse_args(argv)
+
+    calc = Calculator()
+    try:
+        report = calc.run_batch(args.input, args.output, input_format=args.input_format,
+                                output_format=args.output_format, chunk_size=args.chunk_size,
+                                workers=args.workers,
+                                record_history=not args.no_history, autosave=not args.no_autosave,
+                                undoable=not args.no_undo)
+    finally:
+        calc.close()
+    print(report, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
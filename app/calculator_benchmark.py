@@ -0,0 +1,383 @@
+# app/calculator_benchmark.py
+"""Benchmarks, run locally with no network access.
+
+`python -m app.calculator_benchmark startup --budget-ms 500` starts fresh
+interpreters, imports the REPL module and builds a Calculator, which is
+what every scripted launch pays before the first prompt. It exits 1 when
+the median launch exceeds the budget or when a module that should load
+lazily (pandas, sqlite3, multiprocessing) was imported during startup.
+
+`python -m app.calculator_benchmark suite --output results.json` measures
+`Calculator.evaluate` latency percentiles, history append throughput,
+undo/redo cost and CSV/binary save and load times at each history size
+(1e3, 1e5 and 1e6 rows by default). Results are written as JSON and
+compared against a stored baseline (benchmarks/baseline.json); a metric
+that is worse than the baseline by more than `--tolerance` fails the run.
+p99 latencies are reported only, and differences under a small absolute
+floor (25 us, 5 ms) are treated as timer noise.
+
+`python -m app.calculator_benchmark memory --rows 1000000` reports the
+bytes each calculation costs as dict-backed dataclass instances (the old
+Calculation layout), as slotted Calculation records, as columnar history
+rows and as the materialized history DataFrame.
+
+Logs and history files go to a temporary directory.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# loaded on first use only; importing one at startup is a regression
+LAZY_MODULES = ("pandas", "sqlite3", "multiprocessing")
+
+DEFAULT_STARTUP_BUDGET_MS = 500.0
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_TOLERANCE = 0.25
+
+# differences smaller than this are timer noise, whatever the ratio
+_NOISE_FLOOR = {"_us": 25.0, "seconds": 0.005}
+
+_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = _ROOT / "benchmarks" / "baseline.json"
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app.calculator_repl import Calculator
+imported = time.perf_counter()
+calc = Calculator()
+built = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "construct_ms": (built - imported) * 1000,
+    "lazy_loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+@dataclass
+class StartupReport:
+    wall_ms: List[float] = field(default_factory=list)
+    import_ms: List[float] = field(default_factory=list)
+    construct_ms: List[float] = field(default_factory=list)
+    lazy_loaded: List[str] = field(default_factory=list)
+
+    @property
+    def median_ms(self) -> float:
+        return statistics.median(self.wall_ms) if self.wall_ms else 0.0
+
+    def within(self, budget_ms: float) -> bool:
+        return self.median_ms <= budget_ms and not self.lazy_loaded
+
+    def __str__(self) -> str:
+        lines = [f"Startup over {len(self.wall_ms)} runs: median {self.median_ms:.1f} ms "
+                 f"(import {statistics.median(self.import_ms):.1f} ms, "
+                 f"Calculator() {statistics.median(self.construct_ms):.1f} ms)"]
+        if self.lazy_loaded:
+            lines.append(f"Loaded at startup but should be lazy: {', '.join(self.lazy_loaded)}")
+        return "\n".join(lines)
+
+
+def _workdir_env(workdir: str) -> Dict[str, str]:
+    """Settings that keep every file a benchmark writes inside `workdir`."""
+    return {
+        "CALCULATOR_LOG_DIR": os.path.join(workdir, "logs"),
+        "CALCULATOR_HISTORY_DIR": os.path.join(workdir, "data"),
+        "CALCULATOR_HISTORY_FILE": os.path.join(workdir, "data", "history.csv"),
+        "CALCULATOR_AUTO_SAVE_PATH": os.path.join(workdir, "data", "history.csv"),
+        "CALCULATOR_HISTORY_ARCHIVE_DIR": os.path.join(workdir, "data", "archive"),
+    }
+
+
+def _child_env(workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_ROOT), env.get("PYTHONPATH")]))
+    env.update(_workdir_env(workdir))
+    return env
+
+
+def measure_startup(runs: int = 5, python: str = sys.executable) -> StartupReport:
+    """Launches `runs` fresh interpreters and times each one's startup."""
+    report = StartupReport()
+    lazy_loaded = set()
+    with tempfile.TemporaryDirectory() as workdir:
+        env = _child_env(workdir)
+        for _ in range(max(int(runs), 1)):
+            start = time.perf_counter()
+            out = subprocess.run([python, "-c", _CHILD % (LAZY_MODULES,)], env=env, cwd=workdir,
+                                 capture_output=True, text=True, check=True).stdout
+            report.wall_ms.append((time.perf_counter() - start) * 1000)
+            timings = json.loads(out.strip().splitlines()[-1])
+            report.import_ms.append(timings["import_ms"])
+            report.construct_ms.append(timings["construct_ms"])
+            lazy_loaded.update(timings["lazy_loaded"])
+    report.lazy_loaded = sorted(lazy_loaded)
+    return report
+
+
+@contextmanager
+def _environ(overrides: Dict[str, str]) -> Iterator[None]:
+    saved = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _percentile(samples: Sequence[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def _best_of(repeats: int, fn, *args) -> float:
+    return min(_timed(fn, *args) for _ in range(repeats))
+
+
+def _latencies(prefix: str, samples: Sequence[float]) -> Dict[str, float]:
+    micros = [s * 1e6 for s in samples]
+    return {f"{prefix}/{name}_us": _percentile(micros, q) for name, q in (("p50", 50), ("p95", 95), ("p99", 99))}
+
+
+def _bench_size(size: int, samples: int, workdir: str) -> Dict[str, float]:
+    from app.calculator_repl import Calculator
+    from app.history import HistoryManager
+
+    env = {**_workdir_env(workdir), "CALCULATOR_MAX_HISTORY_SIZE": "0", "CALCULATOR_AUTO_SAVE": "false",
+           "CALCULATOR_MAX_UNDO_DEPTH": str(samples)}
+    with _environ(env):
+        calc = Calculator()
+    metrics: Dict[str, float] = {}
+    try:
+        stamp = datetime.datetime(2026, 1, 1).isoformat()
+
+        def append(history: HistoryManager) -> None:
+            for i in range(size):
+                history.add("add", float(i), 1.0, i + 1.0, None, stamp)
+
+        # HistoryManager.add alone, best of three fresh histories
+        metrics[f"history_append/{size}/rows_per_sec"] = size / min(
+            _timed(append, HistoryManager()) for _ in range(3))
+        calc.history.detach(calc.logging_observer)
+        append(calc.history)
+        calc.history.attach(calc.logging_observer)
+
+        ops = ("add", "subtract", "multiply", "divide")
+        for i in range(min(samples, 100)):  # warm the log file, caches and allocator
+            calc.evaluate(ops[i % len(ops)], str(-i - 1), "3")
+        metrics.update(_latencies(f"evaluate/{size}", [
+            _timed(calc.evaluate, ops[i % len(ops)], str(i + 1), str(i % 97 + 1)) for i in range(samples)]))
+        metrics.update(_latencies(f"undo/{size}", [_timed(calc.undo) for _ in range(samples)]))
+        metrics.update(_latencies(f"redo/{size}", [_timed(calc.redo) for _ in range(samples)]))
+
+        for fmt, suffix in (("csv", ".csv"), ("binary", ".hbin")):
+            path = os.path.join(workdir, f"bench-{size}{suffix}")
+            metrics[f"save_{fmt}/{size}/seconds"] = _best_of(3, calc.save, path)
+            metrics[f"load_{fmt}/{size}/seconds"] = _best_of(3, calc.load, path)
+    finally:
+        calc.close()
+    return metrics
+
+
+def run_suite(sizes: Sequence[int] = DEFAULT_SIZES, samples: int = 1000) -> Dict[str, Any]:
+    """Runs every benchmark at each history size; returns JSON-ready results."""
+    import pandas  # noqa: F401  -- keep the one-off import out of the first save/load timing
+    metrics: Dict[str, float] = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            metrics.update(_bench_size(int(size), max(int(samples), 1), workdir))
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": [int(s) for s in sizes],
+            "samples": int(samples),
+        },
+        "metrics": metrics,
+    }
+
+
+def _traced_bytes(build) -> int:
+    """Bytes still allocated after `build()` returns, counted by tracemalloc."""
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()  # noqa: F841  -- held until measured
+        return tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def measure_memory(rows: int = 1_000_000) -> Dict[str, float]:
+    """Bytes per calculation for each way a session can hold its calculations."""
+    import dataclasses
+    from app.calculation import Calculation
+    from app.history import HistoryManager
+
+    # Calculation as it was before it gained slots
+    DictCalculation = dataclasses.make_dataclass(
+        "DictCalculation", [(f.name, f.type, f) for f in dataclasses.fields(Calculation)])
+    stamp = datetime.datetime(2026, 1, 1).isoformat()
+
+    def records(cls):
+        return lambda: [cls("add", float(i), 1.0, float(i) + 1.0, None, 0) for i in range(rows)]
+
+    def history() -> HistoryManager:
+        h = HistoryManager()
+        for i in range(rows):
+            h.add_row(("add", float(i), 1.0, float(i) + 1.0, None, stamp))
+        return h
+
+    import pandas  # noqa: F401  -- its import is not part of any layout
+    filled = history()
+    return {
+        "calculation_dataclass": _traced_bytes(records(DictCalculation)) / rows,
+        "calculation_slots": _traced_bytes(records(Calculation)) / rows,
+        "history_buffer": _traced_bytes(history) / rows,
+        "history_frame": _traced_bytes(filled.to_buffer().to_frame) / rows,
+    }
+
+
+@dataclass
+class Comparison:
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def higher_is_better(self) -> bool:
+        return self.metric.endswith("_per_sec")
+
+    @property
+    def change(self) -> float:
+        """Relative change, positive when the metric got worse."""
+        if self.baseline == 0:
+            return 0.0
+        delta = (self.current - self.baseline) / self.baseline
+        return -delta if self.higher_is_better else delta
+
+    @property
+    def gated(self) -> bool:
+        """p99 latencies are reported but too noisy to fail a run on."""
+        return not self.metric.endswith("p99_us")
+
+    def regressed(self, tolerance: float) -> bool:
+        floor = next((v for unit, v in _NOISE_FLOOR.items() if self.metric.endswith(unit)), 0.0)
+        return self.gated and self.change > tolerance and abs(self.current - self.baseline) > floor
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[Comparison]:
+    """Pairs up metrics present in both result sets."""
+    current, before = results["metrics"], baseline["metrics"]
+    return [Comparison(name, before[name], current[name]) for name in current if name in before]
+
+
+def _format_comparisons(comparisons: List[Comparison], tolerance: float) -> str:
+    lines = []
+    for c in comparisons:
+        flag = "REGRESSED" if c.regressed(tolerance) else "ok" if c.gated else "info"
+        lines.append(f"{c.metric:<40} {c.baseline:>14.3f} {c.current:>14.3f} {c.change:>+8.1%}  {flag}")
+    return "\n".join(lines)
+
+
+def _startup(args: argparse.Namespace) -> int:
+    report = measure_startup(args.runs)
+    print(report)
+    if not report.within(args.budget_ms):
+        print(f"Startup regression (budget {args.budget_ms:.0f} ms, no eager heavy imports)", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _suite(args: argparse.Namespace) -> int:
+    results = run_suite([int(float(s)) for s in args.sizes.split(",")], args.samples)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(text + "\n", encoding="utf-8")
+        return 0
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; nothing to compare", file=sys.stderr)
+        return 0
+    comparisons = compare(results, json.loads(baseline_path.read_text(encoding="utf-8")))
+    print(_format_comparisons(comparisons, args.tolerance), file=sys.stderr)
+    regressions = [c for c in comparisons if c.regressed(args.tolerance)]
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _memory(args: argparse.Namespace) -> int:
+    per_row = measure_memory(args.rows)
+    print(f"{'layout':<24} {'bytes/calc':>10} {'MB total':>10}")
+    for name, size in per_row.items():
+        print(f"{name:<24} {size:>10.1f} {size * args.rows / 1e6:>10.1f}")
+    saved = 1 - per_row["calculation_slots"] / per_row["calculation_dataclass"]
+    print(f"slots save {saved:.0%} per Calculation; history rows take "
+          f"{per_row['history_buffer']:.0f} bytes each")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Calculator benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    startup = commands.add_parser("startup", help="time fresh launches against a budget")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--budget-ms", type=float,
+                         default=float(os.getenv("CALCULATOR_STARTUP_BUDGET_MS", DEFAULT_STARTUP_BUDGET_MS)),
+                         help="fail when the median launch takes longer than this")
+    startup.set_defaults(run=_startup)
+
+    suite = commands.add_parser("suite", help="evaluate/history/undo/persistence benchmarks")
+    suite.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                       help="comma-separated history sizes, e.g. 1e3,1e5")
+    suite.add_argument("--samples", type=int, default=1000, help="timed evaluate/undo/redo calls per size")
+    suite.add_argument("-o", "--output", default=None, help="results file (default: stdout)")
+    suite.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    suite.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                       help="allowed relative slowdown before a metric counts as regressed")
+    suite.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    suite.set_defaults(run=_suite)
+
+    memory = commands.add_parser("memory", help="bytes per calculation for each record layout")
+    memory.add_argument("--rows", type=int, default=1_000_000)
+    memory.set_defaults(run=_memory)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,17 @@
 import os
 from pathlib import Path
 from dataclasses import dataclass
-from dotenv import load_dotenv
 
-load_dotenv()
+_dotenv_loaded = False
+
+
+def _load_dotenv() -> None:
+    """Reads .env once, on the first load_config() rather than at import."""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _dotenv_loaded = True
 
 
 @dataclass
@@ -11,10 +19,43 @@ class Config:
     CALCULATOR_LOG_DIR: str
     CALCULATOR_HISTORY_DIR: str
     CALCULATOR_HISTORY_FILE: str
+    CALCULATOR_HISTORY_FORMAT: str
+    CALCULATOR_HISTORY_BACKEND: str
+    CALCULATOR_HISTORY_DB: str
+    CALCULATOR_SQLITE_BATCH_SIZE: int
     CALCULATOR_AUTO_SAVE: bool
     CALCULATOR_AUTO_SAVE_PATH: str
+    CALCULATOR_AUTO_SAVE_MODE: str
+    CALCULATOR_AUTO_SAVE_COMPACT_EVERY: int
+    CALCULATOR_AUTO_SAVE_FLUSH_ROWS: int
+    CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS: int
+    CALCULATOR_AUTO_SAVE_FSYNC: bool
     CALCULATOR_MAX_HISTORY_SIZE: int
+    CALCULATOR_HISTORY_ARCHIVE_DIR: str
+    CALCULATOR_ARCHIVE_SPILL_ROWS: int
+    CALCULATOR_ARCHIVE_FILE_ROWS: int
+    CALCULATOR_MAX_UNDO_DEPTH: int
     CALCULATOR_PRECISION: int
+    CALCULATOR_CACHE_SIZE: int
+    CALCULATOR_CACHE_TTL_SECONDS: float
+    CALCULATOR_EXPRESSION_CACHE_SIZE: int
+    CALCULATOR_BATCH_CHUNK_SIZE: int
+    CALCULATOR_WORKERS: int
+    CALCULATOR_SERVER_HOST: str
+    CALCULATOR_SERVER_PORT: int
+    CALCULATOR_SERVER_HISTORY: str
+    CALCULATOR_OBSERVER_DISPATCH: str
+    CALCULATOR_OBSERVER_QUEUE_SIZE: int
+    CALCULATOR_OBSERVER_BATCH_SIZE: int
+    CALCULATOR_OBSERVER_BACKPRESSURE: str
+    CALCULATOR_LOG_FORMAT: str
+    CALCULATOR_LOG_QUEUE: bool
+    CALCULATOR_LOG_MAX_BYTES: int
+    CALCULATOR_LOG_BACKUP_COUNT: int
+    CALCULATOR_LOG_BATCH_SIZE: int
+    CALCULATOR_LOG_SAMPLE_EVERY: int
+    CALCULATOR_LOG_MAX_PER_SECOND: float
+    CALCULATOR_METRICS: bool
     CALCULATOR_MAX_INPUT_VALUE: float
     CALCULATOR_DEFAULT_ENCODING: str
     HISTORY_PATH: str  # some tests expect this
@@ -25,15 +66,51 @@ def _bool_from_env(key: str, default: str = "false") -> bool:
 
 
 def load_config() -> Config:
+    _load_dotenv()
     log_dir = os.getenv("CALCULATOR_LOG_DIR", "logs")
     history_dir = os.getenv("CALCULATOR_HISTORY_DIR", "data")
     history_file = os.getenv("CALCULATOR_HISTORY_FILE", "data/history.csv")
     history_path = os.getenv("HISTORY_PATH", history_file)
+    history_format = os.getenv("CALCULATOR_HISTORY_FORMAT", "auto").lower()
+    history_backend = os.getenv("CALCULATOR_HISTORY_BACKEND", "memory").lower()
+    history_db = os.getenv("CALCULATOR_HISTORY_DB", str(Path(history_dir) / "history.db"))
+    sqlite_batch_size = int(os.getenv("CALCULATOR_SQLITE_BATCH_SIZE", "500"))
     auto_save = _bool_from_env("CALCULATOR_AUTO_SAVE", "false")
     auto_save_path = os.getenv("CALCULATOR_AUTO_SAVE_PATH", history_file)
+    auto_save_mode = os.getenv("CALCULATOR_AUTO_SAVE_MODE", "append").lower()
+    auto_save_compact_every = int(os.getenv("CALCULATOR_AUTO_SAVE_COMPACT_EVERY", "1000"))
+    auto_save_flush_rows = int(os.getenv("CALCULATOR_AUTO_SAVE_FLUSH_ROWS", "1"))
+    auto_save_flush_interval_ms = int(os.getenv("CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS", "0"))
+    auto_save_fsync = _bool_from_env("CALCULATOR_AUTO_SAVE_FSYNC", "true")
 
-    max_history_size = int(os.getenv("CALCULATOR_MAX_HISTORY_SIZE", "1000"))
+    # eviction and archiving are opt-in: 0 keeps every row in memory, and
+    # evicted rows are only archived when an archive directory is set
+    max_history_size = int(os.getenv("CALCULATOR_MAX_HISTORY_SIZE", "0"))
+    archive_dir = os.getenv("CALCULATOR_HISTORY_ARCHIVE_DIR", "")
+    archive_spill_rows = int(os.getenv("CALCULATOR_ARCHIVE_SPILL_ROWS", "256"))
+    archive_file_rows = int(os.getenv("CALCULATOR_ARCHIVE_FILE_ROWS", "100000"))
+    max_undo_depth = int(os.getenv("CALCULATOR_MAX_UNDO_DEPTH", "100"))
     precision = int(os.getenv("CALCULATOR_PRECISION", "6"))
+    cache_size = int(os.getenv("CALCULATOR_CACHE_SIZE", "1024"))
+    cache_ttl = float(os.getenv("CALCULATOR_CACHE_TTL_SECONDS", "0"))
+    expression_cache_size = int(os.getenv("CALCULATOR_EXPRESSION_CACHE_SIZE", "256"))
+    batch_chunk_size = int(os.getenv("CALCULATOR_BATCH_CHUNK_SIZE", "1000"))
+    workers = int(os.getenv("CALCULATOR_WORKERS", "1"))
+    server_host = os.getenv("CALCULATOR_SERVER_HOST", "127.0.0.1")
+    server_port = int(os.getenv("CALCULATOR_SERVER_PORT", "8765"))
+    server_history = os.getenv("CALCULATOR_SERVER_HISTORY", "shared").lower()
+    observer_dispatch = os.getenv("CALCULATOR_OBSERVER_DISPATCH", "sync").lower()
+    observer_queue_size = int(os.getenv("CALCULATOR_OBSERVER_QUEUE_SIZE", "1024"))
+    observer_batch_size = int(os.getenv("CALCULATOR_OBSERVER_BATCH_SIZE", "64"))
+    observer_backpressure = os.getenv("CALCULATOR_OBSERVER_BACKPRESSURE", "block").lower()
+    log_format = os.getenv("CALCULATOR_LOG_FORMAT", "text").lower()
+    log_queue = _bool_from_env("CALCULATOR_LOG_QUEUE", "false")
+    log_max_bytes = int(os.getenv("CALCULATOR_LOG_MAX_BYTES", "0"))
+    log_backup_count = int(os.getenv("CALCULATOR_LOG_BACKUP_COUNT", "5"))
+    log_batch_size = int(os.getenv("CALCULATOR_LOG_BATCH_SIZE", "1"))
+    log_sample_every = int(os.getenv("CALCULATOR_LOG_SAMPLE_EVERY", "1"))
+    log_max_per_second = float(os.getenv("CALCULATOR_LOG_MAX_PER_SECOND", "0"))
+    metrics = _bool_from_env("CALCULATOR_METRICS", "false")
     max_input = float(os.getenv("CALCULATOR_MAX_INPUT_VALUE", "1e12"))
     encoding = os.getenv("CALCULATOR_DEFAULT_ENCODING", "utf-8")
 
@@ -48,10 +125,43 @@ def load_config() -> Config:
         CALCULATOR_LOG_DIR=str(log_dir),
         CALCULATOR_HISTORY_DIR=str(history_dir),
         CALCULATOR_HISTORY_FILE=str(history_file),
+        CALCULATOR_HISTORY_FORMAT=history_format,
+        CALCULATOR_HISTORY_BACKEND=history_backend,
+        CALCULATOR_HISTORY_DB=str(history_db),
+        CALCULATOR_SQLITE_BATCH_SIZE=sqlite_batch_size,
         CALCULATOR_AUTO_SAVE=auto_save,
         CALCULATOR_AUTO_SAVE_PATH=str(auto_save_path),
+        CALCULATOR_AUTO_SAVE_MODE=auto_save_mode,
+        CALCULATOR_AUTO_SAVE_COMPACT_EVERY=auto_save_compact_every,
+        CALCULATOR_AUTO_SAVE_FLUSH_ROWS=auto_save_flush_rows,
+        CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS=auto_save_flush_interval_ms,
+        CALCULATOR_AUTO_SAVE_FSYNC=auto_save_fsync,
         CALCULATOR_MAX_HISTORY_SIZE=max_history_size,
+        CALCULATOR_HISTORY_ARCHIVE_DIR=str(archive_dir),
+        CALCULATOR_ARCHIVE_SPILL_ROWS=archive_spill_rows,
+        CALCULATOR_ARCHIVE_FILE_ROWS=archive_file_rows,
+        CALCULATOR_MAX_UNDO_DEPTH=max_undo_depth,
         CALCULATOR_PRECISION=precision,
+        CALCULATOR_CACHE_SIZE=cache_size,
+        CALCULATOR_CACHE_TTL_SECONDS=cache_ttl,
+        CALCULATOR_EXPRESSION_CACHE_SIZE=expression_cache_size,
+        CALCULATOR_BATCH_CHUNK_SIZE=batch_chunk_size,
+        CALCULATOR_WORKERS=workers,
+        CALCULATOR_SERVER_HOST=server_host,
+        CALCULATOR_SERVER_PORT=server_port,
+        CALCULATOR_SERVER_HISTORY=server_history,
+        CALCULATOR_OBSERVER_DISPATCH=observer_dispatch,
+        CALCULATOR_OBSERVER_QUEUE_SIZE=observer_queue_size,
+        CALCULATOR_OBSERVER_BATCH_SIZE=observer_batch_size,
+        CALCULATOR_OBSERVER_BACKPRESSURE=observer_backpressure,
+        CALCULATOR_LOG_FORMAT=log_format,
+        CALCULATOR_LOG_QUEUE=log_queue,
+        CALCULATOR_LOG_MAX_BYTES=log_max_bytes,
+        CALCULATOR_LOG_BACKUP_COUNT=log_backup_count,
+        CALCULATOR_LOG_BATCH_SIZE=log_batch_size,
+        CALCULATOR_LOG_SAMPLE_EVERY=log_sample_every,
+        CALCULATOR_LOG_MAX_PER_SECOND=log_max_per_second,
+        CALCULATOR_METRICS=metrics,
         CALCULATOR_MAX_INPUT_VALUE=max_input,
         CALCULATOR_DEFAULT_ENCODING=encoding,
         HISTORY_PATH=str(history_path),
@@ -1,18 +1,72 @@
 # app/calculator_memento.py
-from typing import List
-import pandas as pd
+from collections import deque
+from typing import TYPE_CHECKING, Deque, List, Optional
+
+if TYPE_CHECKING:
+    from app.history import HistoryManager
+    from app.history_buffer import HistoryBuffer, HistoryRow
+
 
 class Memento:
-    def __init__(self, snapshot: pd.DataFrame):
-        self.snapshot = snapshot.copy()
+    """A reversible change to history.
+
+    Mementos record what changed rather than a copy of the whole history,
+    so saving, undoing and redoing each cost O(1) per step.
+    """
+    def undo(self, history: "HistoryManager") -> None:
+        raise NotImplementedError
+
+    def redo(self, history: "HistoryManager") -> None:
+        raise NotImplementedError
+
+
+class AppendMemento(Memento):
+    """Rows appended to the end of history.
+
+    Only the row count is kept until the change is undone; the popped rows
+    are then held so redo can put them back.
+    """
+    def __init__(self, count: int = 1):
+        self.count = count
+        self.rows: List["HistoryRow"] = []
+
+    def undo(self, history: "HistoryManager") -> None:
+        self.rows = history.pop(self.count)
+
+    def redo(self, history: "HistoryManager") -> None:
+        history.push(self.rows)
+        self.rows = []
+
+
+class ReplaceMemento(Memento):
+    """History swapped wholesale (cleared or loaded).
+
+    Both sides reference the row buffers themselves; nothing is copied.
+    """
+    def __init__(self, before: "HistoryBuffer", after: "HistoryBuffer"):
+        self.before = before
+        self.after = after
+
+    def undo(self, history: "HistoryManager") -> None:
+        history.restore(self.before)
+
+    def redo(self, history: "HistoryManager") -> None:
+        history.restore(self.after)
+
 
 class Caretaker:
-    def __init__(self):
-        self._undos: List[Memento] = []
+    def __init__(self, max_depth: Optional[int] = None):
+        # the oldest mementos fall off once max_depth is reached
+        self.max_depth = max_depth if max_depth and max_depth > 0 else None
+        self._undos: Deque[Memento] = deque(maxlen=self.max_depth)
         self._redos: List[Memento] = []
 
-    def save(self, df: pd.DataFrame):
-        self._undos.append(Memento(df))
+    def save(self, memento: Memento):
+        self._undos.append(memento)
+        self._redos.clear()
+
+    def clear(self) -> None:
+        self._undos.clear()
         self._redos.clear()
 
     def can_undo(self) -> bool:
@@ -21,16 +75,16 @@ class Caretaker:
     def can_redo(self) -> bool:
         return bool(self._redos)
 
-    def undo(self, current_df: pd.DataFrame) -> pd.DataFrame:
+    def undo(self, history: "HistoryManager") -> None:
         if not self._undos:
             raise IndexError("Nothing to undo")
         m = self._undos.pop()
-        self._redos.append(Memento(current_df))
-        return m.snapshot.copy()
+        m.undo(history)
+        self._redos.append(m)
 
-    def redo(self, current_df: pd.DataFrame) -> pd.DataFrame:
+    def redo(self, history: "HistoryManager") -> None:
         if not self._redos:
             raise IndexError("Nothing to redo")
         m = self._redos.pop()
-        self._undos.append(Memento(current_df))
-        return m.snapshot.copy()
+        m.redo(history)
+        self._undos.append(m)
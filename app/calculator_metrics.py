@@ -0,0 +1,160 @@
+# app/calculator_metrics.py
+import math
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# evaluate() stages in call order; "history" excludes the observer fan-out
+STAGES = ("validate", "lookup", "perform", "history", "observers", "autosave", "caretaker", "total")
+
+# four buckets per power of two; 256 buckets reach far past any real latency
+_SUB_BUCKETS = 4
+_BUCKETS = 256
+# samples are buffered and bucketed in bulk, keeping record() to a list append
+_FOLD_EVERY = 1024
+
+
+class LatencyHistogram:
+    """Counts durations in log-spaced buckets; percentiles are bucket upper bounds."""
+    def __init__(self):
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._buckets = np.zeros(_BUCKETS, dtype=np.int64)
+        self._pending: List[float] = []
+
+    def record(self, seconds: float) -> None:
+        pending = self._pending
+        pending.append(seconds)
+        if len(pending) >= _FOLD_EVERY:
+            self._fold()
+
+    def _fold(self) -> None:
+        if not self._pending:
+            return
+        values = np.asarray(self._pending, dtype=np.float64)
+        self._pending = []
+        self._count += len(values)
+        self._total += float(values.sum())
+        self._max = max(self._max, float(values.max()))
+        # frexp splits nanoseconds into mantissa [0.5, 1) and exponent;
+        # the mantissa picks one of _SUB_BUCKETS linear steps in the octave
+        mantissa, exponent = np.frexp(values * 1e9)
+        steps = ((mantissa - 0.5) * 2 * _SUB_BUCKETS).astype(np.int64)
+        index = np.clip(np.where(exponent > 0, exponent * _SUB_BUCKETS + steps, 0), 0, _BUCKETS - 1)
+        self._buckets += np.bincount(index, minlength=_BUCKETS)
+
+    @property
+    def count(self) -> int:
+        return self._count + len(self._pending)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        self._fold()
+        other._fold()
+        self._count += other._count
+        self._total += other._total
+        self._max = max(self._max, other._max)
+        self._buckets += other._buckets
+
+    @staticmethod
+    def _upper_bound(bucket: int) -> float:
+        exponent, step = divmod(bucket, _SUB_BUCKETS)
+        return (0.5 + (step + 1) / (2 * _SUB_BUCKETS)) * 2.0 ** exponent / 1e9
+
+    def percentile(self, q: float) -> float:
+        """Upper bound, in seconds, of the bucket holding the q-th percentile."""
+        self._fold()
+        if not self._count:
+            return 0.0
+        rank = max(math.ceil(q / 100 * self._count), 1)
+        bucket = int(np.searchsorted(np.cumsum(self._buckets), rank))
+        return min(self._upper_bound(bucket), self._max)
+
+    def summary(self) -> Dict[str, float]:
+        self._fold()
+        return {
+            "count": self._count,
+            "total_ms": self._total * 1e3,
+            "mean_us": self._total / self._count * 1e6 if self._count else 0.0,
+            "p50_us": self.percentile(50) * 1e6,
+            "p95_us": self.percentile(95) * 1e6,
+            "p99_us": self.percentile(99) * 1e6,
+            "max_us": self._max * 1e6,
+        }
+
+
+class CalculatorMetrics:
+    """Per-stage and per-operation timings of `Calculator.evaluate`.
+
+    Samples are kept per (operation, stage) and merged into per-stage
+    totals by `snapshot()`, so recording touches one histogram. Stages
+    recorded inside `history.add` (observer fan-out, autosave) are also
+    accumulated in `nested`, so the caller can report the add itself
+    without them. Not locked: the calculator is used from one thread.
+    """
+    def __init__(self):
+        # operation (None for events without one) -> stage -> histogram
+        self._hists: Dict[Optional[str], Dict[str, LatencyHistogram]] = {}
+        self.nested = 0.0
+
+    def record(self, stage: str, seconds: float, operation: Optional[str] = None) -> None:
+        try:
+            self._hists[operation][stage].record(seconds)
+        except KeyError:
+            self._hists.setdefault(operation, {}).setdefault(stage, LatencyHistogram()).record(seconds)
+
+    def record_evaluate(self, operation: str, validate: float, lookup: float, perform: float,
+                        history: float, caretaker: float, total: float) -> None:
+        """Records one evaluate() call's stages in one go."""
+        hists = self._hists.get(operation)
+        if hists is None or "total" not in hists:
+            hists = self._hists.setdefault(operation, {})
+            for stage in ("validate", "lookup", "perform", "history", "caretaker", "total"):
+                hists.setdefault(stage, LatencyHistogram())
+        hists["validate"].record(validate)
+        hists["lookup"].record(lookup)
+        hists["perform"].record(perform)
+        hists["history"].record(history)
+        hists["caretaker"].record(caretaker)
+        hists["total"].record(total)
+
+    def record_nested(self, stage: str, seconds: float, operation: Optional[str] = None) -> None:
+        self.record(stage, seconds, operation)
+        self.nested += seconds
+
+    def take_nested(self) -> float:
+        nested, self.nested = self.nested, 0.0
+        return nested
+
+    def reset(self) -> None:
+        self._hists.clear()
+        self.nested = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summaries per stage and per operation and stage, in stage order."""
+        def ordered(hists: Dict[str, LatencyHistogram]) -> Dict[str, Dict[str, float]]:
+            names = [s for s in STAGES if s in hists] + sorted(s for s in hists if s not in STAGES)
+            return {name: hists[name].summary() for name in names}
+
+        stages: Dict[str, LatencyHistogram] = {}
+        for hists in self._hists.values():
+            for stage, hist in hists.items():
+                stages.setdefault(stage, LatencyHistogram()).merge(hist)
+        return {
+            "stages": ordered(stages),
+            "operations": {op: ordered(self._hists[op]) for op in sorted(op for op in self._hists if op is not None)},
+        }
+
+    def format(self) -> str:
+        snap = self.snapshot()
+        if not snap["stages"]:
+            return "(no calculations measured yet)"
+        lines = [f"{'stage':<10} {'count':>7} {'mean us':>9} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'max us':>9}"]
+        for stage, s in snap["stages"].items():
+            lines.append(f"{stage:<10} {s['count']:>7} {s['mean_us']:>9.1f} {s['p50_us']:>9.1f} "
+                         f"{s['p95_us']:>9.1f} {s['p99_us']:>9.1f} {s['max_us']:>9.1f}")
+        for op, stages in snap["operations"].items():
+            total = stages.get("total")
+            if total:
+                lines.append(f"  {op}: {total['count']} calls, p50 {total['p50_us']:.1f} us, "
+                             f"p99 {total['p99_us']:.1f} us")
+        return "\n".join(lines)
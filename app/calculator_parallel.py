@@ -0,0 +1,115 @@
+# app/calculator_parallel.py
+"""Evaluates batch chunks across a pool of worker processes.
+
+Chunks are submitted to a `ProcessPoolExecutor` with at most
+`max_pending` in flight, and results are yielded strictly in submission
+order: a slow chunk holds back the ones behind it rather than letting
+them overtake it. If a worker process dies, every unfinished chunk is
+rerun one at a time in a single-worker pool, which shows which chunk
+crashed it, before a fresh pool takes over; no row is lost or reordered.
+"""
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+_DONE = object()
+
+
+class WorkerCrashError(RuntimeError):
+    """Raised when the same chunk keeps taking its worker process down."""
+
+
+class _Pending:
+    __slots__ = ("index", "chunk", "future", "attempts")
+
+    def __init__(self, index: int, chunk: Any, future: Future):
+        self.index = index
+        self.chunk = chunk
+        self.future = future
+        self.attempts = 0
+
+    def finished(self) -> bool:
+        return self.future.done() and not self.future.cancelled() and self.future.exception() is None
+
+
+def _submit(pool: ProcessPoolExecutor, fn: Callable, chunk: Any) -> Future:
+    # a pool can break between two submits; hand back a failed future so
+    # the crash is handled in one place
+    try:
+        return pool.submit(fn, chunk)
+    except BrokenProcessPool as e:
+        future: Future = Future()
+        future.set_exception(e)
+        return future
+
+
+def _run_isolated(fn: Callable, entries: Iterable[_Pending], retries: int) -> None:
+    """Reruns `entries` one at a time in a single worker, so each crash is
+    charged to the chunk that caused it; raises WorkerCrashError once a
+    chunk has crashed more than `retries` times."""
+    pool = ProcessPoolExecutor(max_workers=1)
+    try:
+        for entry in entries:
+            while True:
+                future = _submit(pool, fn, entry.chunk)
+                if not isinstance(future.exception(), BrokenProcessPool):
+                    entry.future = future
+                    break
+                entry.attempts += 1
+                if entry.attempts > retries:
+                    raise WorkerCrashError(f"Chunk {entry.index} crashed its worker {entry.attempts} times")
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=1)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def evaluate_parallel(chunks: Iterable[T], fn: Callable[[T], R], workers: Optional[int] = None,
+                      max_pending: Optional[int] = None, retries: int = 2) -> Iterator[R]:
+    """Yields `fn(chunk)` for every chunk, in input order.
+
+    `fn` must be a picklable top-level function. A chunk whose call raises
+    is retried up to `retries` times and then run in this process, so its
+    exception surfaces here. A chunk that crashes its worker more than
+    `retries` times raises WorkerCrashError.
+    """
+    workers = max(int(workers or os.cpu_count() or 1), 1)
+    max_pending = max(int(max_pending or workers * 2), 1)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending: Deque[_Pending] = deque()
+    source = iter(chunks)
+    submitted = 0
+    try:
+        while True:
+            while len(pending) < max_pending:
+                chunk = next(source, _DONE)
+                if chunk is _DONE:
+                    break
+                pending.append(_Pending(submitted, chunk, _submit(pool, fn, chunk)))
+                submitted += 1
+            if not pending:
+                return
+            head = pending[0]
+            try:
+                result = head.future.result()
+            except BrokenProcessPool:
+                # any in-flight chunk may have killed the worker; find out
+                # which before charging an attempt to it
+                pool.shutdown(wait=False, cancel_futures=True)
+                _run_isolated(fn, [entry for entry in pending if not entry.finished()], retries)
+                pool = ProcessPoolExecutor(max_workers=workers)
+                continue
+            except Exception:
+                head.attempts += 1
+                if head.attempts <= retries:
+                    head.future = _submit(pool, fn, head.chunk)
+                    continue
+                result = fn(head.chunk)
+            pending.popleft()
+            yield result
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -1,66 +1,358 @@
-import datetime
+import math
+import time
+import uuid
 from pathlib import Path
-from typing import Optional
-from app.calculation import CalculationFactory
+from typing import Optional, Tuple
+from app.calculation import CalculationFactory, BatchCalculation
+from app.calculation_cache import ResultCache
+from app.calculator_batch import BatchReport, run_batch
+from app.calculator_metrics import CalculatorMetrics
+from app.expression import ExpressionCompiler
 from app.history import HistoryManager, AutoSaveObserver, LoggingObserver
-from app.calculator_memento import Caretaker
-from app.calculator_config import load_config
-from app.operations import get_operation_instance
-from app.exceptions import CalculatorError
-from app.input_validators import parse_operands_eafp
+from app.history_archive import HistoryArchive
+from app.history_dispatch import EventDispatcher
+from app.calculator_memento import Caretaker, AppendMemento, ReplaceMemento
+from app.calculator_config import Config, load_config
+from app.exceptions import CalculatorError, ExpressionError, InvalidOperationError
+from app.input_validators import parse_operand_eafp, parse_operands_eafp
+from app.operations import canonical_name, get_operation
+
+def _make_dispatcher(config) -> Optional[EventDispatcher]:
+    if config.CALCULATOR_OBSERVER_DISPATCH == "sync":
+        return None
+    if config.CALCULATOR_OBSERVER_DISPATCH != "async":
+        raise ValueError(f"Unknown observer dispatch mode: {config.CALCULATOR_OBSERVER_DISPATCH}")
+    return EventDispatcher(max_queue=config.CALCULATOR_OBSERVER_QUEUE_SIZE,
+                           batch_size=config.CALCULATOR_OBSERVER_BATCH_SIZE,
+                           policy=config.CALCULATOR_OBSERVER_BACKPRESSURE)
+
+def _make_history_manager(config) -> HistoryManager:
+    if config.CALCULATOR_HISTORY_BACKEND == "sqlite":
+        from app.history_sqlite import SQLiteHistoryManager
+        return SQLiteHistoryManager(config.CALCULATOR_HISTORY_DB,
+                                    csv_path=config.CALCULATOR_HISTORY_FILE,
+                                    encoding=config.CALCULATOR_DEFAULT_ENCODING,
+                                    file_format=config.CALCULATOR_HISTORY_FORMAT,
+                                    batch_size=config.CALCULATOR_SQLITE_BATCH_SIZE,
+                                    dispatcher=_make_dispatcher(config))
+    if config.CALCULATOR_HISTORY_BACKEND != "memory":
+        raise ValueError(f"Unknown history backend: {config.CALCULATOR_HISTORY_BACKEND}")
+    archive = None
+    if config.CALCULATOR_MAX_HISTORY_SIZE > 0 and config.CALCULATOR_HISTORY_ARCHIVE_DIR:
+        archive = HistoryArchive(config.CALCULATOR_HISTORY_ARCHIVE_DIR,
+                                 spill_rows=config.CALCULATOR_ARCHIVE_SPILL_ROWS,
+                                 rows_per_file=config.CALCULATOR_ARCHIVE_FILE_ROWS,
+                                 encoding=config.CALCULATOR_DEFAULT_ENCODING)
+    return HistoryManager(csv_path=config.CALCULATOR_HISTORY_FILE,
+                          encoding=config.CALCULATOR_DEFAULT_ENCODING,
+                          file_format=config.CALCULATOR_HISTORY_FORMAT,
+                          max_size=config.CALCULATOR_MAX_HISTORY_SIZE,
+                          archive=archive,
+                          dispatcher=_make_dispatcher(config))
 
 class Calculator:
-    def __init__(self):
-        self.config = load_config()
-        self.history = HistoryManager(csv_path=self.config.CALCULATOR_HISTORY_FILE,
-                                      encoding=self.config.CALCULATOR_DEFAULT_ENCODING)
-        self.caretaker = Caretaker()
+    def __init__(self, config: Optional[Config] = None, history: Optional[HistoryManager] = None):
+        # a caller-supplied history is the caller's to persist: no autosave
+        self.config = config or load_config()
+        self.history = history if history is not None else _make_history_manager(self.config)
+        self.caretaker = Caretaker(max_depth=self.config.CALCULATOR_MAX_UNDO_DEPTH)
+        self.cache = None
+        if self.config.CALCULATOR_CACHE_SIZE > 0:
+            self.cache = ResultCache(self.config.CALCULATOR_CACHE_SIZE, self.config.CALCULATOR_CACHE_TTL_SECONDS)
+        self.expressions = ExpressionCompiler(self.config.CALCULATOR_EXPRESSION_CACHE_SIZE)
+        self.metrics: Optional[CalculatorMetrics] = None
+        self.enable_metrics(self.config.CALCULATOR_METRICS)
 
         # attach observers
         log_file = Path(self.config.CALCULATOR_LOG_DIR) / "calculator_history.log"
-        self.history.attach(LoggingObserver(str(log_file)))
-        if self.config.CALCULATOR_AUTO_SAVE:
-            self.history.attach(AutoSaveObserver(self.history, self.config.CALCULATOR_AUTO_SAVE_PATH))
+        self.logging_observer = LoggingObserver(str(log_file), fmt=self.config.CALCULATOR_LOG_FORMAT,
+                                                use_queue=self.config.CALCULATOR_LOG_QUEUE,
+                                                max_bytes=self.config.CALCULATOR_LOG_MAX_BYTES,
+                                                backup_count=self.config.CALCULATOR_LOG_BACKUP_COUNT,
+                                                batch_size=self.config.CALCULATOR_LOG_BATCH_SIZE,
+                                                sample_every=self.config.CALCULATOR_LOG_SAMPLE_EVERY,
+                                                max_per_second=self.config.CALCULATOR_LOG_MAX_PER_SECOND)
+        self.history.attach(self.logging_observer)
+        self.autosave = None
+        if self.config.CALCULATOR_AUTO_SAVE and history is None:
+            self.autosave = AutoSaveObserver(self.history, self.config.CALCULATOR_AUTO_SAVE_PATH,
+                                             mode=self.config.CALCULATOR_AUTO_SAVE_MODE,
+                                             compact_every=self.config.CALCULATOR_AUTO_SAVE_COMPACT_EVERY,
+                                             flush_rows=self.config.CALCULATOR_AUTO_SAVE_FLUSH_ROWS,
+                                             flush_interval_ms=self.config.CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS,
+                                             fsync=self.config.CALCULATOR_AUTO_SAVE_FSYNC)
+            self.history.attach(self.autosave)
 
-        # save initial state
-        self.caretaker.save(self.history.df)
+    def session(self) -> "Calculator":
+        """A calculator with its own in-memory history and undo stack.
+
+        It shares this calculator's config, result and expression caches,
+        metrics and log pipeline, so starting one opens no files. A bounded
+        session history spills to its own directory under the archive, when
+        archiving is configured. Close it with `history.close()`: `close()`
+        would also stop the shared log pipeline.
+        """
+        config = self.config
+        archive = None
+        if config.CALCULATOR_MAX_HISTORY_SIZE > 0 and config.CALCULATOR_HISTORY_ARCHIVE_DIR:
+            archive = HistoryArchive(str(Path(config.CALCULATOR_HISTORY_ARCHIVE_DIR) / "sessions" / uuid.uuid4().hex),
+                                     spill_rows=config.CALCULATOR_ARCHIVE_SPILL_ROWS,
+                                     rows_per_file=config.CALCULATOR_ARCHIVE_FILE_ROWS,
+                                     encoding=config.CALCULATOR_DEFAULT_ENCODING)
+        calc = Calculator.__new__(Calculator)
+        calc.config = config
+        calc.history = HistoryManager(encoding=config.CALCULATOR_DEFAULT_ENCODING,
+                                      max_size=config.CALCULATOR_MAX_HISTORY_SIZE, archive=archive)
+        calc.caretaker = Caretaker(max_depth=config.CALCULATOR_MAX_UNDO_DEPTH)
+        calc.cache = self.cache
+        calc.expressions = self.expressions
+        calc.metrics = self.metrics
+        calc.history.metrics = self.metrics
+        calc.logging_observer = self.logging_observer
+        calc.history.attach(calc.logging_observer)
+        calc.autosave = None
+        return calc
 
     # Facade methods
     def evaluate(self, op_token: str, a_raw: str, b_raw: str) -> float:
+        if self.metrics is not None:
+            return self._evaluate_timed(op_token, a_raw, b_raw)
         calc = CalculationFactory.create(op_token, a_raw, b_raw)
-        self.caretaker.save(self.history.df)
         try:
-            result = calc.perform()
-            self.history.add(calc.operation_token, calc.a, calc.b, result, calc.error, datetime.datetime.utcnow().isoformat())
-            if self.config.CALCULATOR_AUTO_SAVE:
-                try:
-                    self.history.save(self.config.CALCULATOR_AUTO_SAVE_PATH)
-                except Exception:
-                    pass
+            result = calc.perform(self.cache)
+            self.history.add_row(calc.as_row(time.time_ns()))
+            self.caretaker.save(AppendMemento(1))
             return result
         except Exception as e:
-            self.history.add(calc.operation_token, calc.a, calc.b, None, str(e), datetime.datetime.utcnow().isoformat())
+            calc.result, calc.error = None, str(e)
+            self.history.add_row(calc.as_row(time.time_ns()))
+            self.caretaker.save(AppendMemento(1))
             # Re-raise as CalculatorError
             raise CalculatorError(str(e)) from e
 
+    def _evaluate_timed(self, op_token: str, a_raw: str, b_raw: str) -> float:
+        """evaluate() with every stage timed into self.metrics."""
+        metrics, clock = self.metrics, time.perf_counter
+        start = clock()
+        # validation covers operand parsing and resolving the token to an ID
+        calc = CalculationFactory.create(op_token, a_raw, b_raw)
+        validated = clock()
+        get_operation(calc.op_id)
+        operation = calc.operation
+        looked_up = clock()
+        error = None
+        try:
+            result = calc.perform(self.cache)
+        except Exception as e:
+            result, error = None, e
+        performed = clock()
+        metrics.take_nested()
+        self.history.add_row((operation, calc.a, calc.b, result, None if error is None else str(error),
+                              time.time_ns()))
+        added = clock()
+        fan_out = metrics.take_nested()
+        self.caretaker.save(AppendMemento(1))
+        saved = clock()
+        metrics.record_evaluate(operation, validated - start, looked_up - validated, performed - looked_up,
+                                added - performed - fan_out, saved - added, saved - start)
+        if error is not None:
+            raise CalculatorError(str(error)) from error
+        return result
+
+    def enable_metrics(self, enabled: bool = True) -> None:
+        """Turns stage timing on or off; when off, evaluate() runs untimed."""
+        if enabled and self.metrics is None:
+            self.metrics = CalculatorMetrics()
+        elif not enabled:
+            self.metrics = None
+        self.history.metrics = self.metrics
+
+    def metrics_snapshot(self) -> Optional[dict]:
+        """Per-stage and per-operation timings, or None when metrics are off."""
+        return self.metrics.snapshot() if self.metrics is not None else None
+
+    def evaluate_expression(self, source: str, bindings: Optional[dict] = None, **kwargs) -> float:
+        """Evaluates a multi-operator expression and records it as one history row.
+
+        The row's operation is the expression text; a and b are left empty.
+        """
+        compiled = self.expressions.compile(source)
+        try:
+            result = compiled.evaluate(bindings, **kwargs)
+        except ExpressionError:
+            raise
+        except Exception as e:
+            self.history.add(compiled.source, math.nan, math.nan, None, str(e), time.time_ns())
+            self.caretaker.save(AppendMemento(1))
+            raise CalculatorError(str(e)) from e
+        self.history.add(compiled.source, math.nan, math.nan, result, None, time.time_ns())
+        self.caretaker.save(AppendMemento(1))
+        return result
+
+    def evaluate_batch(self, op_tokens, a_values, b_values) -> BatchCalculation:
+        """Evaluates whole columns in one vectorized pass.
+
+        Domain errors (division by zero, even root of a negative, ...) do not
+        raise; they are reported per row through `errors` / `error_masks`.
+        History is left untouched.
+        """
+        batch = CalculationFactory.create_batch(op_tokens, a_values, b_values)
+        batch.perform()
+        return batch
+
+    def run_batch(self, source, output, input_format: str = "auto", output_format: str = "auto",
+                  chunk_size: Optional[int] = None, workers: Optional[int] = None,
+                  record_history: bool = True, autosave: bool = True, undoable: bool = True) -> BatchReport:
+        """Streams a job file through the calculator; see app.calculator_batch.
+
+        With `autosave=False` the autosave file is rewritten once at the end
+        instead of on every row. With `undoable=False` the run is not an undo
+        step and earlier steps are dropped, since undoing them would now pop
+        the batch rows.
+        """
+        history = self.history if record_history else None
+        paused = self.autosave if (history is not None and not autosave) else None
+        if paused is not None:
+            self.history.flush_events()
+            self.history.detach(paused)
+        try:
+            report = run_batch(source, output, input_format, output_format,
+                               chunk_size or self.config.CALCULATOR_BATCH_CHUNK_SIZE, history,
+                               workers or self.config.CALCULATOR_WORKERS)
+        finally:
+            if paused is not None:
+                self.history.flush_events()
+                self.history.attach(paused)
+                paused.compact()
+        if history is not None and report.rows:
+            if undoable:
+                self.caretaker.save(AppendMemento(report.rows))
+            else:
+                self.caretaker.clear()
+        return report
+
     def undo(self):
         if not self.caretaker.can_undo():
             raise IndexError("Nothing to undo")
-        self.history.df = self.caretaker.undo(self.history.df)
+        self.caretaker.undo(self.history)
 
     def redo(self):
         if not self.caretaker.can_redo():
             raise IndexError("Nothing to redo")
-        self.history.df = self.caretaker.redo(self.history.df)
+        self.caretaker.redo(self.history)
 
     def save(self, path: Optional[str] = None):
         self.history.save(path or self.config.CALCULATOR_HISTORY_FILE)
 
     def load(self, path: Optional[str] = None):
+        before = self.history.state
         self.history.load(path or self.config.CALCULATOR_HISTORY_FILE)
+        self.caretaker.save(ReplaceMemento(before, self.history.state))
 
     def clear_history(self):
+        before = self.history.state
         self.history.clear()
+        self.caretaker.save(ReplaceMemento(before, self.history.state))
+
+    @staticmethod
+    def _history_operation(operation: Optional[str]) -> Optional[str]:
+        """The name history rows use for `operation`, resolving aliases such as '+'."""
+        if operation is None:
+            return None
+        try:
+            return canonical_name(operation)
+        except InvalidOperationError:
+            return operation  # expression rows are stored under their source text
+
+    def query(self, operation: Optional[str] = None, **filters):
+        """history.query(), accepting operation aliases such as '+'."""
+        return self.history.query(operation=self._history_operation(operation), **filters)
+
+    def summary(self, operation: Optional[str] = None) -> dict:
+        """history.summary(), accepting operation aliases such as '+'."""
+        return self.history.summary(self._history_operation(operation))
+
+    def cache_stats(self) -> Optional[dict]:
+        """Hit/miss/eviction counters of the result cache, or None when it is disabled."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def close(self):
+        """Flushes any coalesced autosave writes and releases the history store."""
+        # queued observer events must reach autosave before it closes
+        self.history.flush_events()
+        if self.autosave is not None:
+            self.autosave.close()
+        self.logging_observer.close()
+        self.history.close()
+
+_QUERY_FILTERS = {"op": "operation", "operation": "operation", "status": "status",
+                  "since": "since", "until": "until", "limit": "limit"}
+
+def parse_query(args: str) -> dict:
+    """Turns 'op=add status=error result=1..10 since=2026-10-18' into query() arguments.
+
+    a, b and result take `low..high` (either side may be empty) or one value.
+    """
+    filters = {}
+    for token in args.split():
+        key, sep, value = token.partition("=")
+        key = key.lower()
+        if not sep or not value:
+            raise ValueError(f"Expected key=value, got: {token}")
+        if key in ("a", "b", "result"):
+            low, sep, high = value.partition("..")
+            if not sep:
+                high = low
+            filters[key] = (float(low) if low else None, float(high) if high else None)
+        elif key in _QUERY_FILTERS:
+            filters[_QUERY_FILTERS[key]] = int(value) if key == "limit" else value
+        else:
+            raise ValueError(f"Unknown query filter: {key}")
+    return filters
+
+HISTORY_PAGE_SIZE = 20
+
+def parse_history_args(args: str, total: int, page_size: int = HISTORY_PAGE_SIZE) -> Tuple[int, int]:
+    """Turns 'head 10', 'tail 5', 'page 3 limit 50', 'limit 50' or 'all' into a row range.
+
+    With no arguments (or only `limit`) the last page is shown; pages count from 1.
+    """
+    tokens = args.lower().split()
+    if tokens == ["all"]:
+        return 0, total
+    options = {}
+    for key, value in zip(tokens[::2], tokens[1::2]):
+        if key not in ("head", "tail", "page", "limit"):
+            raise ValueError(f"Unknown history option: {key}")
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"Expected a positive number after {key}")
+        options[key] = int(value)
+    if len(tokens) % 2:
+        raise ValueError(f"Expected a number after {tokens[-1]}")
+    if len(options) > 1 and set(options) != {"page", "limit"}:
+        raise ValueError("Use one of head, tail or page (page may take a limit)")
+    size = options.get("limit", page_size)
+    if "head" in options:
+        return 0, min(options["head"], total)
+    if "page" in options:
+        start = min((options["page"] - 1) * size, total)
+        return start, min(start + size, total)
+    count = options.get("tail", size)
+    return max(total - count, 0), total
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.6g}"
+
+def format_summary(per_operation: dict, overall: dict) -> str:
+    """Renders history.summary() and summary_overall() as a table."""
+    if not per_operation:
+        return "(history is empty)"
+    lines = [f"{'operation':<12} {'count':>7} {'errors':>7} {'err %':>6} {'min':>10} {'max':>10} "
+             f"{'mean':>10} {'p50':>10} {'p99':>10}"]
+    for name, s in [*per_operation.items(), ("(all)", overall)]:
+        lines.append(f"{name:<12} {s['count']:>7} {s['errors']:>7} {s['error_rate']:>6.1%} {_fmt(s['min']):>10} "
+                     f"{_fmt(s['max']):>10} {_fmt(s['mean']):>10} {_fmt(s['p50']):>10} {_fmt(s['p99']):>10}")
+    return "\n".join(lines)
 
 def repl():
     calc = Calculator()
@@ -68,25 +360,78 @@ def repl():
 
     while True:
         try:
-            raw = input("Enter operation (or 'help','history','exit','clear','undo','redo','save','load'): ").strip()
+            raw = input("Enter operation (or 'help','history','query','exit','clear','undo','redo','save','load','cache','stats','summary'): ").strip()
         except EOFError:
             print()
+            calc.close()
             break
         if not raw:
             continue
         cmd = raw.lower()
         if cmd in ("exit", "quit"):
+            calc.close()
             print("Goodbye!")
             break
         if cmd == "help":
-            print("Commands: help, history, exit, clear, undo, redo, save, load")
+            print("Commands: help, history, query, summary [op], exit, clear, undo, redo, save, load, cache, stats [on|off|reset]")
+            print("History: 'history' shows the last page; 'history head 10', 'tail 50', 'page 3 limit 50' or 'all'")
+            print("Query: 'query op=add status=error result=1..10 since=2026-10-18 until=2026-10-19 limit=20'")
+            print("Expressions: start with '=', e.g. '= (a + b) * c ** 0.5 % d' (you are asked for each variable)")
             print("Operations: add(+), subtract(-), multiply(*), divide(/), power(**), root(root), modulus(%), int_divide(//), percent, abs_diff(abs)")
             continue
-        if cmd == "history":
-            if calc.history.df.empty:
+        if cmd.split()[0] == "history":
+            total = len(calc.history)
+            try:
+                start, stop = parse_history_args(raw[len("history"):], total)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            if not total:
                 print("(history is empty)")
+            elif start >= stop:
+                print(f"(no rows there; history has {total})")
             else:
-                print(calc.history.df.to_string(index=False))
+                print(calc.history.render(start, stop))
+                if stop - start < total:
+                    print(f"(rows {start + 1}-{stop} of {total}; 'history head N|tail N|page P [limit N]|all')")
+            continue
+        if cmd.split()[0] == "query":
+            try:
+                rows = calc.query(**parse_query(raw[len("query"):]))
+            except (ValueError, CalculatorError) as e:
+                print(f"Error: {e}")
+                continue
+            print("(no matching rows)" if rows.empty else rows.to_string(index=False))
+            continue
+        if cmd.split()[0] == "summary":
+            args = raw.split()[1:]
+            if args:
+                summary = calc.summary(args[0])
+                print(format_summary({calc._history_operation(args[0]): summary}, summary)
+                      if summary["count"] else "(no rows for that operation)")
+            else:
+                print(format_summary(calc.summary(), calc.history.summary_overall()))
+            continue
+        if cmd == "cache":
+            stats = calc.cache_stats()
+            if stats is None:
+                print("Result cache is disabled.")
+            else:
+                print("Cache: size={size}/{capacity} hits={hits} misses={misses} "
+                      "evictions={evictions} expirations={expirations} hit_rate={hit_rate:.1%}".format(**stats))
+            continue
+        if cmd.split()[0] == "stats":
+            arg = cmd.split()[1] if len(cmd.split()) > 1 else ""
+            if arg in ("on", "off"):
+                calc.enable_metrics(arg == "on")
+                print(f"Metrics {arg}.")
+            elif calc.metrics is None:
+                print("Metrics are off (use 'stats on').")
+            elif arg == "reset":
+                calc.metrics.reset()
+                print("Metrics reset.")
+            else:
+                print(calc.metrics.format())
             continue
         if cmd == "clear":
             calc.clear_history()
@@ -121,6 +466,17 @@ def repl():
                 print(f"Error loading: {e}")
             continue
 
+        if raw.startswith("="):
+            try:
+                compiled = calc.expressions.compile(raw[1:])
+                bindings = {name: parse_operand_eafp(input(f"{name}: "), name) for name in compiled.variables}
+                print(f"Result: {calc.evaluate_expression(compiled.source, bindings)}")
+            except CalculatorError as e:
+                print(f"Error: {e}")
+            except Exception as e:
+                print(f"Unhandled error: {e}")
+            continue
+
         # Operation branch
         a_raw = input("first number: ")
         b_raw = input("second number: ")
@@ -0,0 +1,310 @@
+# app/calculator_server.py
+"""Line-delimited JSON over TCP: `python -m app.calculator_server --port 8765`.
+
+Every request is one JSON object on its own line and gets exactly one
+response line, in request order:
+
+    {"id": 1, "op": "evaluate", "operation": "+", "a": 1, "b": 2}
+    {"id": 1, "ok": true, "result": 3.0}
+
+Clients may pipeline requests without waiting for replies; lines already
+buffered on a connection are handled together in one hop to the
+calculator thread. Commands: evaluate (the default), expression, history,
+summary, undo, redo, clear, save, load, cache. save and load use the
+configured history file, or a "path" inside CALCULATOR_HISTORY_DIR.
+
+All Calculator calls run on one dedicated worker thread, so autosave,
+logging and save/load never block the event loop and no calculator is
+used from two threads at once.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from app.calculator_repl import Calculator
+from app.exceptions import CalculatorError
+from app.history_buffer import HISTORY_COLUMNS
+
+HISTORY_MODES = ("shared", "session")
+
+
+def _json_safe(value: Any) -> Any:
+    """JSON has no NaN or Infinity: non-finite floats become "nan", "inf" or
+    "-inf", which float() reads back."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else repr(float(value))
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def _encode(response: Dict[str, Any]) -> bytes:
+    try:
+        line = json.dumps(response, allow_nan=False)
+    except ValueError:
+        line = json.dumps(_json_safe(response), allow_nan=False)
+    return line.encode("utf-8") + b"\n"
+
+
+def _history_records(calc: Calculator, request: Dict[str, Any]) -> Dict[str, Any]:
+    # only the requested tail is copied and converted, not the whole history
+    limit = request.get("limit")
+    buffer = calc.history.tail_buffer(None if limit is None else int(limit))
+    return {"rows": [dict(zip(HISTORY_COLUMNS, buffer.row(i))) for i in range(len(buffer))]}
+
+
+def _summary(calc: Calculator, request: Dict[str, Any]) -> Dict[str, Any]:
+    operation = request.get("operation")
+    if operation is not None:
+        return {"summary": calc.summary(operation)}
+    return {"summary": calc.summary(), "overall": calc.history.summary_overall()}
+
+
+def _undo(calc: Calculator, request: Dict[str, Any]) -> Dict[str, Any]:
+    calc.undo()
+    return {}
+
+
+def _redo(calc: Calculator, request: Dict[str, Any]) -> Dict[str, Any]:
+    calc.redo()
+    return {}
+
+
+def _clear(calc: Calculator, request: Dict[str, Any]) -> Dict[str, Any]:
+    calc.clear_history()
+    return {}
+
+
+def _history_path(calc: Calculator, request: Dict[str, Any]) -> Optional[str]:
+    """The client's "path", resolved inside CALCULATOR_HISTORY_DIR; None for the configured file.
+
+    Clients are remote, so they may only name files in the history directory.
+    """
+    path = request.get("path")
+    if path is None:
+        return None
+    root = Path(calc.config.CALCULATOR_HISTORY_DIR).resolve()
+    resolved = (root / str(path)).resolve()
+    if not resolved.is_relative_to(root):
+        raise ValueError(f"Path outside the history directory: {path}")
+    return str(resolved)
+
+
+def _save(calc: Calculator, request: Dict[str, Any]) -> Dict[str, Any]:
+    calc.save(_history_path(calc, request))
+    return {}
+
+
+def _load(calc: Calculator, request: Dict[str, Any]) -> Dict[str, Any]:
+    calc.load(_history_path(calc, request))
+    return {"rows": len(calc.history)}
+
+
+_COMMANDS: Dict[str, Callable[[Calculator, Dict[str, Any]], Dict[str, Any]]] = {
+    "evaluate": lambda calc, r: {"result": calc.evaluate(r["operation"], r["a"], r["b"])},
+    "expression": lambda calc, r: {"result": calc.evaluate_expression(r["expression"], r.get("bindings") or {})},
+    "history": _history_records,
+    "summary": _summary,
+    "undo": _undo,
+    "redo": _redo,
+    "clear": _clear,
+    "save": _save,
+    "load": _load,
+    "cache": lambda calc, r: {"stats": calc.cache_stats()},
+}
+
+
+class CalculatorServer:
+    """Serves a Calculator over TCP.
+
+    With `history_mode="shared"` every connection works on the server's
+    calculator and history. With "session" each connection gets its own
+    in-memory history and undo stack; the result and expression caches
+    are still shared.
+    """
+    def __init__(self, calculator: Optional[Calculator] = None, history_mode: Optional[str] = None,
+                 host: Optional[str] = None, port: Optional[int] = None,
+                 max_batch: int = 256, max_pending: int = 4096):
+        self.calculator = calculator or Calculator()
+        config = self.calculator.config
+        self.history_mode = (history_mode or config.CALCULATOR_SERVER_HISTORY).lower()
+        if self.history_mode not in HISTORY_MODES:
+            raise ValueError(f"Unknown server history mode: {self.history_mode}")
+        self.host = host or config.CALCULATOR_SERVER_HOST
+        self.port = config.CALCULATOR_SERVER_PORT if port is None else port
+        self.max_batch = max(int(max_batch), 1)
+        self.max_pending = max(int(max_pending), 1)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calculator")
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # port 0 asks the OS for a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.calculator.close)
+        self._executor.shutdown(wait=True)
+
+    def _session(self) -> Calculator:
+        if self.history_mode == "shared":
+            return self.calculator
+        return self.calculator.session()
+
+    def handle_request(self, calc: Calculator, raw: Any) -> Dict[str, Any]:
+        """Runs one request (a JSON line or an already-decoded dict) and returns its response."""
+        try:
+            request = json.loads(raw) if isinstance(raw, (bytes, str)) else raw
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            return {"id": None, "ok": False, "error": f"Malformed request: {e}"}
+        response: Dict[str, Any] = {"id": request.get("id")}
+        command = _COMMANDS.get(request.get("op", "evaluate"))
+        if command is None:
+            return {**response, "ok": False, "error": f"Unknown command: {request.get('op')}"}
+        try:
+            return {**response, "ok": True, **command(calc, request)}
+        except KeyError as e:
+            return {**response, "ok": False, "error": f"Missing field: {e.args[0]}"}
+        except Exception as e:
+            # CalculatorError, IndexError from undo/redo, OSError from save/load, ...
+            return {**response, "ok": False, "error": str(e)}
+
+    def _handle_lines(self, calc: Calculator, lines: List[bytes]) -> bytes:
+        return b"".join(_encode(self.handle_request(calc, line)) for line in lines)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        calc = await loop.run_in_executor(self._executor, self._session)
+        lines: asyncio.Queue = asyncio.Queue(self.max_pending)
+
+        async def read() -> None:
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        await lines.put(line)
+            except (ConnectionError, ValueError):
+                pass
+            finally:
+                await lines.put(None)
+
+        reading = asyncio.create_task(read())
+        try:
+            done = False
+            while not done:
+                batch = [await lines.get()]
+                while len(batch) < self.max_batch and not lines.empty():
+                    batch.append(lines.get_nowait())
+                if batch[-1] is None:
+                    done = True
+                    batch.pop()
+                if batch:
+                    writer.write(await loop.run_in_executor(self._executor, self._handle_lines, calc, batch))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            reading.cancel()
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+            if calc is not self.calculator:
+                # not calc.close(): that would stop the shared log pipeline
+                await loop.run_in_executor(self._executor, calc.history.close)
+
+
+class CalculatorClient:
+    """Asyncio client for CalculatorServer; use `async with await CalculatorClient.connect(...)`."""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 8765) -> "CalculatorClient":
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def __aenter__(self) -> "CalculatorClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    def _encode(self, request: Dict[str, Any]) -> bytes:
+        if "id" not in request:
+            request = {**request, "id": next(self._ids)}
+        return json.dumps(request).encode("utf-8") + b"\n"
+
+    async def pipeline(self, requests: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Sends every request before reading any response; responses come back in order."""
+        payload = [self._encode(r) for r in requests]
+        self._writer.write(b"".join(payload))
+        await self._writer.drain()
+        responses = []
+        for _ in payload:
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionError("Server closed the connection")
+            responses.append(json.loads(line))
+        return responses
+
+    async def request(self, op: str = "evaluate", **fields: Any) -> Dict[str, Any]:
+        return (await self.pipeline([{"op": op, **fields}]))[0]
+
+    async def evaluate(self, operation: str, a: Any, b: Any) -> float:
+        response = await self.request("evaluate", operation=operation, a=a, b=b)
+        if not response["ok"]:
+            raise CalculatorError(response["error"])
+        return response["result"]
+
+    async def close(self) -> None:
+        self._writer.close()
+        with suppress(Exception):
+            await self._writer.wait_closed()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = CalculatorServer(history_mode=args.history, host=args.host, port=args.port)
+    await server.start()
+    print(f"Calculator server listening on {server.host}:{server.port} ({server.history_mode} history)")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the calculator over TCP (line-delimited JSON).")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--history", choices=HISTORY_MODES, default=None)
+    args = parser.parse_args(argv)
+    with suppress(KeyboardInterrupt):
+        asyncio.run(_serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,3 +9,7 @@ class InvalidOperationError(CalculatorError):
 
 class OperandError(CalculatorError):
     """Raised when operands are invalid (non-numeric or empty)."""
+
+
+class ExpressionError(CalculatorError):
+    """Raised when an expression cannot be parsed or is missing a binding."""
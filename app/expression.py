@@ -0,0 +1,248 @@
+# app/expression.py
+"""Multi-operator expressions such as `(a + b) * c ** 0.5 % d`.
+
+An expression is parsed once into a flat postfix program of
+(opcode, argument) pairs that a small stack machine runs. Infix symbols
+are the registry tokens `+ - * / ** // %`; every other registered
+operation is called by name with two arguments, e.g. `root(x, 3)`.
+Any other identifier is a variable bound at evaluation time.
+"""
+import re
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Tuple
+import numpy as np
+from app.exceptions import ExpressionError, InvalidOperationError
+from app.operations import ErrorMasks, get_operation, resolve_operation
+
+# opcodes
+CONST, LOAD, APPLY, NEG = range(4)
+
+Instruction = Tuple[int, object]
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|([A-Za-z_]\w*)|(\*\*|//|[-+*/%(),]))")
+
+# infix symbol -> (binding power, right associative)
+_INFIX = {
+    "+": (10, False), "-": (10, False),
+    "*": (20, False), "/": (20, False), "//": (20, False), "%": (20, False),
+    "**": (40, True),
+}
+_UNARY_POWER = 30  # binds looser than ** so -2 ** 2 == -4, as in Python
+
+
+def _tokenize(source: str) -> List[Tuple[str, str]]:
+    tokens, pos = [], 0
+    source = source.rstrip()
+    while pos < len(source):
+        m = _TOKEN.match(source, pos)
+        if m is None:
+            raise ExpressionError(f"Unexpected character at position {pos}: {source[pos:].strip()[:1]!r}")
+        number, name, symbol = m.groups()
+        if number is not None:
+            tokens.append(("num", number))
+        elif name is not None:
+            tokens.append(("name", name))
+        else:
+            tokens.append(("sym", symbol))
+        pos = m.end()
+    tokens.append(("end", ""))
+    return tokens
+
+
+class _Parser:
+    """Pratt parser that emits postfix instructions as it goes."""
+    def __init__(self, source: str):
+        self.tokens = _tokenize(source)
+        self.pos = 0
+        self.program: List[Instruction] = []
+
+    def peek(self) -> Tuple[str, str]:
+        return self.tokens[self.pos]
+
+    def take(self) -> Tuple[str, str]:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, symbol: str) -> None:
+        kind, text = self.take()
+        if kind != "sym" or text != symbol:
+            raise ExpressionError(f"Expected {symbol!r} but found {text or 'end of input'!r}")
+
+    def parse(self) -> List[Instruction]:
+        if self.peek()[0] == "end":
+            raise ExpressionError("Empty expression")
+        self.expression(0)
+        kind, text = self.peek()
+        if kind != "end":
+            raise ExpressionError(f"Unexpected {text!r}")
+        return self.program
+
+    def expression(self, min_power: int) -> None:
+        self.prefix()
+        while True:
+            kind, text = self.peek()
+            if kind != "sym" or text not in _INFIX:
+                return
+            power, right_assoc = _INFIX[text]
+            if power < min_power or (power == min_power and not right_assoc):
+                return
+            self.take()
+            self.expression(power if right_assoc else power + 1)
+            self.emit_apply(resolve_operation(text))
+
+    def prefix(self) -> None:
+        kind, text = self.take()
+        if kind == "num":
+            self.program.append((CONST, float(text)))
+        elif kind == "name":
+            if self.peek() == ("sym", "("):
+                self.call(text)
+            else:
+                self.program.append((LOAD, text))
+        elif (kind, text) == ("sym", "("):
+            self.expression(0)
+            self.expect(")")
+        elif (kind, text) == ("sym", "-"):
+            self.expression(_UNARY_POWER)
+            self.emit_neg()
+        elif (kind, text) == ("sym", "+"):
+            self.expression(_UNARY_POWER)
+        else:
+            raise ExpressionError(f"Unexpected {text or 'end of input'!r}")
+
+    def call(self, name: str) -> None:
+        try:
+            op_id = resolve_operation(name)
+        except InvalidOperationError:
+            raise ExpressionError(f"Unknown function: {name}") from None
+        self.expect("(")
+        self.expression(0)
+        self.expect(",")
+        self.expression(0)
+        self.expect(")")
+        self.emit_apply(op_id)
+
+    # constant subexpressions are folded as they are emitted, unless they
+    # raise: then the error is left for evaluation to report
+    def emit_apply(self, op_id: int) -> None:
+        if len(self.program) >= 2 and self.program[-1][0] == CONST and self.program[-2][0] == CONST:
+            try:
+                value = get_operation(op_id).execute(self.program[-2][1], self.program[-1][1])
+            except Exception:
+                pass
+            else:
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.program[-2:] = [(CONST, float(value))]
+                    return
+        self.program.append((APPLY, op_id))
+
+    def emit_neg(self) -> None:
+        if self.program and self.program[-1][0] == CONST:
+            self.program[-1] = (CONST, -self.program[-1][1])
+        else:
+            self.program.append((NEG, None))
+
+
+class CompiledExpression:
+    """A parsed expression; evaluate it for one binding or whole columns."""
+    def __init__(self, source: str, program: List[Instruction]):
+        self.source = source
+        self.program: Tuple[Instruction, ...] = tuple(program)
+        self.variables: Tuple[str, ...] = tuple(dict.fromkeys(arg for code, arg in program if code == LOAD))
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.source!r})"
+
+    def _missing(self, bindings: Mapping[str, object]) -> None:
+        missing = [v for v in self.variables if v not in bindings]
+        if missing:
+            raise ExpressionError(f"Missing value for: {', '.join(missing)}")
+
+    def evaluate(self, bindings: Optional[Mapping[str, float]] = None, **kwargs: float) -> float:
+        """Evaluates for scalar bindings; domain errors raise like `Calculation.perform`."""
+        bindings = {**(bindings or {}), **kwargs}
+        self._missing(bindings)
+        stack: List[float] = []
+        for code, arg in self.program:
+            if code == CONST:
+                stack.append(arg)
+            elif code == LOAD:
+                stack.append(float(bindings[arg]))
+            elif code == APPLY:
+                b = stack.pop()
+                stack.append(get_operation(arg).execute(stack.pop(), b))
+            else:
+                stack.append(-stack.pop())
+        return stack.pop()
+
+    def evaluate_array(self, bindings: Mapping[str, object]) -> Tuple[np.ndarray, ErrorMasks]:
+        """Evaluates every row of broadcast array bindings in one pass.
+
+        Returns `(values, {message: mask})` like the operation kernels; a row
+        reports only the first error it hits and holds NaN.
+        """
+        self._missing(bindings)
+        arrays = np.broadcast_arrays(*(np.asarray(bindings[v], dtype=np.float64) for v in self.variables))
+        shape = arrays[0].shape if arrays else ()
+        columns: Dict[str, np.ndarray] = dict(zip(self.variables, arrays))
+        failed = np.zeros(shape, dtype=bool)
+        errors: ErrorMasks = {}
+        stack: List[np.ndarray] = []
+        for code, arg in self.program:
+            if code == CONST:
+                stack.append(np.full(shape, arg))
+            elif code == LOAD:
+                stack.append(columns[arg])
+            elif code == APPLY:
+                b = stack.pop()
+                values, masks = get_operation(arg).execute_array(stack.pop(), b)
+                for message, mask in masks.items():
+                    new = mask & ~failed
+                    if new.any():
+                        errors[message] = errors[message] | new if message in errors else new
+                        failed |= new
+                stack.append(values)
+            else:
+                stack.append(np.negative(stack.pop()))
+        values = np.array(stack.pop(), dtype=np.float64)
+        values[failed] = np.nan
+        return values, errors
+
+
+class ExpressionCompiler:
+    """Compiles expressions, keeping the most recently used ones in an LRU cache."""
+    def __init__(self, capacity: int = 256):
+        self.capacity = max(int(capacity), 0)
+        self._compiled: "OrderedDict[str, CompiledExpression]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+    def compile(self, source: str) -> CompiledExpression:
+        key = source.strip()
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            self._compiled.move_to_end(key)
+            self.hits += 1
+            return compiled
+        self.misses += 1
+        compiled = compile_expression(key)
+        if self.capacity:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.capacity:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        self._compiled.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._compiled), "capacity": self.capacity, "hits": self.hits, "misses": self.misses}
+
+
+def compile_expression(source: str) -> CompiledExpression:
+    """Parses `source` without caching; raises ExpressionError on bad syntax."""
+    return CompiledExpression(source.strip(), _Parser(source).parse())
@@ -1,55 +1,486 @@
-import pandas as pd
-from typing import Callable, List, Dict, Any
+from __future__ import annotations
+
+import atexit
+import csv
+import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Callable, Iterable, List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import logging
+import numpy as np
+from app.history_buffer import (
+    HistoryBuffer, HistoryRow, HISTORY_COLUMNS, coerce_timestamp, decode_timestamp, typed_frame,
+)
+from app import history_binary
+from app.history_archive import HistoryArchive
+from app.history_dispatch import COALESCED, EventDispatcher
+from app.history_index import HistoryIndex
+from app.history_render import HistoryRenderer
+from app.history_stats import HistoryStats
+from app.log_handlers import EventSampler, attach_handlers, make_file_handler, stop_queue_logging
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from app.calculator_metrics import CalculatorMetrics
+
+def added_payload(row: HistoryRow, seq: int) -> Dict[str, Any]:
+    """Payload of the "added" event for `row`, the `seq`-th add."""
+    operation, a, b, result, error, timestamp = row
+    if timestamp is not None:
+        # normalized, so appended rows match those a rewrite writes
+        timestamp = decode_timestamp(coerce_timestamp(timestamp))
+    return {"operation": operation, "a": a, "b": b, "result": result, "error": error,
+            "timestamp": timestamp, "seq": seq}
+
+def batch_summary(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Row count, error count and per-operation counts of an "added_batch" payload's rows."""
+    operations: Dict[str, int] = {}
+    errors = 0
+    for row in rows:
+        operations[row["operation"]] = operations.get(row["operation"], 0) + 1
+        errors += row["error"] is not None
+    return {"count": len(rows), "errors": errors, "operations": operations}
 
 class HistoryObserver:
     def update(self, event: str, payload: Dict[str, Any]) -> None:
         raise NotImplementedError
 
+    def update_batch(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Receives events queued by an EventDispatcher, oldest first."""
+        for event, payload in events:
+            self.update(event, payload)
+
 class LoggingObserver(HistoryObserver):
-    """Logs every history event to a rotating file (simple implementation)."""
-    def __init__(self, logfile: str):
+    """Logs every history event to a file.
+
+    `fmt="json"` writes one compact JSON object per event; `max_bytes`
+    rotates the file and `batch_size` groups writes. With `use_queue` the
+    calling thread only enqueues the record and a listener thread formats
+    and writes it. "added" events, one per calculation, can be thinned
+    with `sample_every` and `max_per_second`; an "added_batch" event is
+    sampled as one event and logged as a single summary record.
+    """
+    def __init__(self, logfile: str, fmt: str = "text", use_queue: bool = False, max_bytes: int = 0,
+                 backup_count: int = 5, batch_size: int = 1, sample_every: int = 1, max_per_second: float = 0):
         self._logfile = logfile
-        # basic configuration - don't reconfigure root logger outside tests; this is per-instance logger
+        self.sampler = EventSampler(sample_every, max_per_second)
+        # per-file logger, so observers on the same file share one handler
         self.logger = logging.getLogger(f"HistoryLogger-{logfile}")
         if not self.logger.handlers:
-            handler = logging.FileHandler(logfile, encoding="utf-8")
-            formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
+            handler = make_file_handler(logfile, fmt, max_bytes=max_bytes, backup_count=backup_count,
+                                        batch_size=batch_size)
+            attach_handlers(self.logger, [handler], use_queue=use_queue)
             self.logger.setLevel(logging.INFO)
 
     def update(self, event: str, payload: Dict[str, Any]) -> None:
+        if event in ("added", "added_batch") and not self.sampler.allow():
+            return
+        if event == "added_batch":
+            payload = {**batch_summary(payload["rows"]), "seq": payload["seq"]}
         try:
-            self.logger.info("Event=%s payload=%s", event, payload)
+            self.logger.info("Event=%s payload=%s", event, payload, extra={"event": event, "payload": payload})
         except Exception:
             # observers must not break the main flow
             pass
 
+    def close(self) -> None:
+        """Drains a queued logger and flushes batched writes."""
+        stop_queue_logging(self.logger.name)
+        for handler in self.logger.handlers:
+            handler.flush()
+
+def recover_torn_tail(path: str | Path, fields: int | None = None, encoding: str = "utf-8") -> bool:
+    """Repairs a last line left without its newline by an interrupted append.
+
+    Every writer in this module terminates rows with a newline, so a file
+    whose final byte is not one ends in a torn row, which is truncated.
+    When `fields` is given, a last line that parses to exactly that many
+    CSV fields is kept and only its newline is added (files written by
+    other tools often omit it). Returns True if the file was changed.
+    """
+    p = Path(path)
+    if not p.exists():
+        return False
+    with open(p, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return False
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return False
+        # scan backwards for the start of the last line
+        start = pos = end
+        while pos > 0 and start == end:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            nl = f.read(step).rfind(b"\n")
+            if nl != -1:
+                start = pos + nl + 1
+        if pos == 0 and start == end:
+            start = 0
+        if fields is not None:
+            f.seek(start)
+            try:
+                parsed = list(csv.reader([f.read(end - start).decode(encoding)]))
+            except (UnicodeDecodeError, csv.Error):
+                parsed = []
+            if len(parsed) == 1 and len(parsed[0]) == fields:
+                f.seek(end)
+                f.write(b"\n")
+                return True
+        f.truncate(start)
+        return True
+
+def write_csv(path: str | Path, buffer: HistoryBuffer, encoding: str = "utf-8") -> None:
+    """Writes `buffer` as a history CSV, in the format appended rows use."""
+    rows = buffer.csv_rows()
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HISTORY_COLUMNS)
+        writer.writerows(rows)
+
 class AutoSaveObserver(HistoryObserver):
-    """Auto-saves the full dataframe to `path` whenever an 'added' event occurs."""
-    def __init__(self, history_manager: "HistoryManager", path: str):
+    """Auto-saves history to `path` whenever an 'added' or 'added_batch' event occurs.
+
+    In "append" mode (the default) only new rows are appended to the CSV.
+    The file is rewritten in full (compacted) on the first write, after any
+    clear/load/undo, and every `compact_every` appended rows. "full" mode
+    rewrites the whole file on every add. Once the file holds more rows
+    than a bounded history keeps in memory, the periodic rewrite is
+    skipped, so rows evicted from memory are not dropped from the file.
+
+    Appended rows are coalesced: they are written and fsync-ed once
+    `flush_rows` are pending and/or every `flush_interval_ms` by a
+    background timer. `close()` (also registered with atexit) flushes
+    whatever is left.
+    """
+    def __init__(self, history_manager: "HistoryManager", path: str,
+                 mode: str = "append", compact_every: int = 1000,
+                 flush_rows: int = 1, flush_interval_ms: int = 0, fsync: bool = True):
+        if mode not in ("append", "full"):
+            raise ValueError(f"Unknown autosave mode: {mode}")
         self.history_manager = history_manager
         self.path = Path(path)
+        # binary files cannot be appended to row by row; the manager's
+        # file_format decides, so a binary history in a ".csv" file stays binary
+        self.binary = history_manager._is_binary(self.path)
+        self.mode = "full" if self.binary else mode
+        self.compact_every = compact_every
+        self.flush_rows = max(int(flush_rows), 0)
+        self.flush_interval_ms = max(int(flush_interval_ms), 0)
+        self.fsync = fsync
+        self._needs_compact = True
+        self._appended = 0
+        self._file_rows = 0
+        self._compacted_seq = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.RLock()
+        self._file = None
+        self._writer = None
+        self._stop = threading.Event()
+        self._timer: threading.Thread | None = None
+        atexit.register(self.close)
 
     def update(self, event: str, payload: Dict[str, Any]) -> None:
+        if event in ("cleared", "loaded", "restored"):
+            with self._lock:
+                # file no longer mirrors history; rewrite it on the next add
+                self._pending.clear()
+                self._needs_compact = True
+            return
+        if event == COALESCED:
+            # rows were dropped before reaching us; resync from history now
+            try:
+                self.compact()
+            except Exception:
+                pass
+            return
         if event == "added":
+            rows = [payload]
+        elif event == "added_batch":
+            rows = payload["rows"]
+        else:
+            return
+        try:
+            with self._lock:
+                # skip rows already written by a compaction that ran after they were added
+                rows = [row for row in rows if row.get("seq", self._compacted_seq + 1) > self._compacted_seq]
+                if not rows:
+                    return
+                periodic = (self.compact_every and self._appended + len(self._pending) + len(rows) > self.compact_every
+                            and not self._holds_evicted(len(rows)))
+                if self.mode == "full" or self._needs_compact or periodic:
+                    self.compact()
+                    return
+                self._pending.extend(rows)
+                if self.flush_rows and len(self._pending) >= self.flush_rows:
+                    self.flush()
+                elif self.flush_interval_ms:
+                    self._ensure_timer()
+        except Exception:
+            # do not let autosave break main flow
+            pass
+
+    def _holds_evicted(self, incoming: int) -> bool:
+        """True once the file would hold rows a bounded history no longer keeps in memory."""
+        max_size = getattr(self.history_manager, "max_size", None)
+        return bool(max_size) and self._file_rows + len(self._pending) + incoming > max_size
+
+    def update_batch(self, events: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Handles a dispatched batch, syncing appended rows once at the end."""
+        with self._lock:
+            flush_rows, self.flush_rows = self.flush_rows, 0
+            try:
+                for event, payload in events:
+                    self.update(event, payload)
+            finally:
+                self.flush_rows = flush_rows
+            if flush_rows and len(self._pending) >= flush_rows:
+                self.flush()
+            elif self._pending and self.flush_interval_ms:
+                self._ensure_timer()
+
+    def _ensure_timer(self) -> None:
+        if self._timer is None or not self._timer.is_alive():
+            self._stop.clear()
+            self._timer = threading.Thread(target=self._run_timer, name=f"autosave-{self.path.name}", daemon=True)
+            self._timer.start()
+
+    def _run_timer(self) -> None:
+        while not self._stop.wait(self.flush_interval_ms / 1000.0):
             try:
-                # ensure parent exists
-                self.path.parent.mkdir(parents=True, exist_ok=True)
-                self.history_manager.df.to_csv(self.path, index=False)
+                self.flush()
             except Exception:
-                # do not let autosave break main flow
                 pass
 
+    def flush(self) -> None:
+        """Writes pending rows and syncs them to disk."""
+        with self._lock:
+            if not self._pending:
+                return
+            if self.binary:
+                # never append CSV rows to a binary file; rewrite it instead
+                self.compact()
+                return
+            rows, self._pending = self._pending, []
+            if self._file is None:
+                recover_torn_tail(self.path, len(HISTORY_COLUMNS), self.history_manager.encoding)
+                new_file = not self.path.exists() or self.path.stat().st_size == 0
+                self._file = open(self.path, "a", newline="", encoding=self.history_manager.encoding)
+                self._writer = csv.writer(self._file, lineterminator="\n")
+                if new_file:
+                    self._writer.writerow(HISTORY_COLUMNS)
+            self._writer.writerows(
+                ["" if row.get(c) is None else row.get(c) for c in HISTORY_COLUMNS] for row in rows)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._appended += len(rows)
+            self._file_rows += len(rows)
+
+    def compact(self) -> None:
+        """Rewrites the file from the in-memory history, atomically."""
+        with self._lock:
+            self._close_file()
+            # ensure parent exists
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # hold the history lock so the snapshot and its add count agree
+            # when events are delivered from a dispatcher thread
+            with self.history_manager._lock:
+                seq = self.history_manager._seq
+                buffer = self.history_manager.to_buffer()
+                file_rows = len(buffer)
+                if self.binary:
+                    history_binary.write_history(buffer, self.path)
+                    snapshot = None
+                else:
+                    # the CSV is written outside the lock, from a copy
+                    snapshot = buffer.take(np.arange(len(buffer)))
+            if snapshot is not None:
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                write_csv(tmp, snapshot, self.history_manager.encoding)
+                os.replace(tmp, self.path)
+            self._compacted_seq = seq
+            self._pending.clear()
+            self._needs_compact = False
+            self._appended = 0
+            self._file_rows = file_rows
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+                self._writer = None
+
+    def close(self) -> None:
+        """Stops the timer and flushes anything still pending."""
+        # rows may still be queued in an event dispatcher
+        self.history_manager.flush_events()
+        self._stop.set()
+        timer = self._timer
+        if timer is not None and timer is not threading.current_thread():
+            timer.join(timeout=1.0)
+        try:
+            self.flush()
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._close_file()
+            atexit.unregister(self.close)
+
 class HistoryManager:
-    """Manages history using a pandas DataFrame and notifies observers."""
-    def __init__(self, csv_path: str | None = None, encoding: str = "utf-8"):
+    """Manages history in columnar buffers and notifies observers.
+
+    Rows are appended to a HistoryBuffer; `df` is materialized on first
+    access and cached until the next mutation.
+
+    With `max_size` set only the newest `max_size` rows are kept in memory.
+    Older rows are evicted in bulk to `archive`, if one is given, and can
+    be read back with `full_history()`.
+
+    Observers are called synchronously unless a `dispatcher` is given, in
+    which case events are queued and delivered from its worker thread;
+    `flush_events()` waits for them. `add_many()` appends a block of rows
+    with one "added_batch" event instead of an "added" event per row.
+
+    `query()` filters rows through indexes maintained alongside the buffer.
+    `summary()` reads per-operation aggregates kept up to date on every
+    add; they cover all rows added since the last clear or load, including
+    rows evicted to the archive. `render()` formats a slice of the rows as
+    text, reusing rows it formatted before.
+
+    When `metrics` is set, the time spent notifying observers is recorded
+    as the "observers" and "autosave" stages (the enqueue, when dispatched).
+    """
+    metrics: CalculatorMetrics | None = None
+
+    def __init__(self, csv_path: str | None = None, encoding: str = "utf-8", file_format: str = "auto",
+                 max_size: int | None = None, archive: HistoryArchive | None = None,
+                 dispatcher: EventDispatcher | None = None):
+        if file_format not in ("auto", "csv", "binary"):
+            raise ValueError(f"Unknown history format: {file_format}")
         self.csv_path = Path(csv_path) if csv_path else None
         self.encoding = encoding
-        self.df = pd.DataFrame(columns=["operation","a","b","result","error","timestamp"])
+        self.file_format = file_format
+        self.max_size = max_size if max_size and max_size > 0 else None
+        self.archive = archive
+        self._buffer = HistoryBuffer(max_rows=self.max_size)
+        self._index = HistoryIndex()
+        self._stats = HistoryStats()
+        self._renderer = HistoryRenderer()
+        # aggregates of buffers swapped out, for undo/redo to swap back in
+        self._stats_by_buffer: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._df_cache: pd.DataFrame | None = None
         self._observers: List[HistoryObserver] = []
+        # guards the buffer against dispatcher-thread readers; _seq counts adds
+        self._lock = threading.RLock()
+        self._seq = 0
+        self.dispatcher = dispatcher
+        if dispatcher is not None:
+            dispatcher.bind(lambda: self._observers)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        with self._lock:
+            if self._df_cache is None:
+                self._df_cache = self._buffer.to_frame()
+            return self._df_cache
+
+    @df.setter
+    def df(self, value: pd.DataFrame) -> None:
+        buffer = HistoryBuffer.from_frame(value).bounded(self.max_size)
+        with self._lock:
+            self._swap_buffer(buffer)
+            self._df_cache = None
+
+    def _swap_buffer(self, buffer: HistoryBuffer, stats: HistoryStats | None = None) -> None:
+        """Makes `buffer` live, with its aggregates if known; the indexes go stale."""
+        self._stats_by_buffer[self._buffer] = self._stats
+        self._buffer = buffer
+        if stats is None:
+            stats = self._stats_by_buffer.get(buffer)
+        if stats is None:
+            stats = HistoryStats()
+            stats.invalidate()
+        self._stats = stats
+        self._index.invalidate()
+        self._renderer.reset()
+
+    def _append(self, row: HistoryRow) -> None:
+        buffer = self._buffer
+        operation, a, b, result, error, timestamp = row
+        if type(timestamp) is not int:
+            timestamp = coerce_timestamp(timestamp)
+        evicted = buffer.append(operation, a, b, result, error, timestamp)
+        self._index.add(buffer.evicted + len(buffer) - 1, operation, error, timestamp)
+        self._stats.add(row[0], row[3], row[4])
+        if evicted is not None:
+            self._index.note_eviction(len(buffer))
+            if self.archive is not None:
+                self.archive.stage(evicted)
+
+    def full_history(self) -> pd.DataFrame:
+        """Archived rows followed by the rows still held in memory."""
+        if self.archive is None:
+            return self.df
+        archived = self.archive.to_frame()
+        if archived.empty:
+            return self.df
+        if self.df.empty:
+            return archived
+        import pandas as pd
+        # categories differ between the parts, so the concatenation is retyped
+        return typed_frame(pd.concat([archived, self.df], ignore_index=True))
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def state(self) -> HistoryBuffer:
+        """The live row buffer. Shared, not copied: treat it as read-only."""
+        return self._buffer
+
+    def restore(self, state: HistoryBuffer) -> None:
+        """Swaps in a previously captured buffer (used by undo/redo)."""
+        with self._lock:
+            self._swap_buffer(state)
+            self._df_cache = None
+        self._notify("restored", {"rows": len(state)})
+
+    def pop(self, count: int = 1) -> List[HistoryRow]:
+        """Removes the newest rows and returns them so they can be re-applied.
+
+        Rows already evicted to the archive stay there; fewer than `count`
+        rows are returned if the in-memory window runs out.
+        """
+        with self._lock:
+            buffer = self._buffer
+            n = len(buffer)
+            stamps = [buffer.timestamp_ns(i) for i in range(n - min(max(int(count), 0), n), n)]
+            rows = buffer.pop(count)
+            end = buffer.evicted + len(buffer)
+            for offset in range(len(rows) - 1, -1, -1):
+                row = rows[offset]
+                self._index.remove(end + offset, row[0], row[4], stamps[offset])
+                self._stats.remove(row[0], row[3], row[4])
+            self._renderer.truncate(end)
+            self._df_cache = None
+        self._notify("restored", {"rows": len(self._buffer)})
+        return rows
+
+    def push(self, rows: List[HistoryRow]) -> None:
+        """Re-appends rows previously returned by `pop`."""
+        with self._lock:
+            for row in rows:
+                self._append(row)
+            self._df_cache = None
+        self._notify("restored", {"rows": len(self._buffer)})
 
     def attach(self, obs: HistoryObserver):
         self._observers.append(obs)
@@ -61,6 +492,12 @@ class HistoryManager:
             pass
 
     def _notify(self, event: str, payload: Dict[str, Any]):
+        if self.metrics is not None:
+            self._notify_timed(event, payload)
+            return
+        if self.dispatcher is not None:
+            self.dispatcher.submit(event, payload)
+            return
         for o in list(self._observers):
             try:
                 o.update(event, payload)
@@ -68,26 +505,213 @@ class HistoryManager:
                 # observers must not break the main flow
                 pass
 
+    def _notify_timed(self, event: str, payload: Dict[str, Any]):
+        metrics, operation = self.metrics, payload.get("operation")
+        if self.dispatcher is not None:
+            start = time.perf_counter()
+            self.dispatcher.submit(event, payload)
+            metrics.record_nested("observers", time.perf_counter() - start, operation)
+            return
+        spent = {"observers": 0.0}
+        for o in list(self._observers):
+            stage = "autosave" if isinstance(o, AutoSaveObserver) else "observers"
+            start = time.perf_counter()
+            try:
+                o.update(event, payload)
+            except Exception:
+                pass
+            spent[stage] = spent.get(stage, 0.0) + time.perf_counter() - start
+        for stage, seconds in spent.items():
+            metrics.record_nested(stage, seconds, operation)
+
     def add(self, operation: str, a: float, b: float, result: Any, error: str | None = None, timestamp: str | None = None):
-        row = {"operation": operation, "a": a, "b": b, "result": result, "error": error, "timestamp": timestamp}
-        self.df = pd.concat([self.df, pd.DataFrame([row])], ignore_index=True)
-        self._notify("added", row)
+        self.add_row((operation, a, b, result, error, timestamp))
+
+    def add_row(self, row: HistoryRow) -> None:
+        """`add` for a ready-made (operation, a, b, result, error, timestamp) tuple."""
+        with self._lock:
+            self._append(row)
+            self._df_cache = None
+            self._seq += 1
+            seq = self._seq
+        if self._observers or self.dispatcher is not None:
+            self._notify("added", added_payload(row, seq))
+
+    def add_many(self, rows: Iterable[HistoryRow]) -> int:
+        """Appends a block of rows and notifies observers once; returns how many.
+
+        Observers get one "added_batch" event whose payload holds `rows`,
+        the payloads "added" would have carried for each row, and `seq`,
+        that of the last row.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self._lock:
+            for row in rows:
+                self._append(row)
+            self._df_cache = None
+            first = self._seq + 1
+            self._seq += len(rows)
+        if self._observers or self.dispatcher is not None:
+            self._notify("added_batch", {"rows": [added_payload(row, first + i) for i, row in enumerate(rows)],
+                                         "seq": first + len(rows) - 1})
+        return len(rows)
+
+    def query(self, operation: Optional[str] = None, status: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              limit: Optional[int] = None, **ranges: Tuple[Optional[float], Optional[float]]) -> pd.DataFrame:
+        """Rows matching every filter, oldest first.
+
+        `status` is "ok" or "error"; `since` is inclusive and `until`
+        exclusive; `ranges` maps "a", "b" or "result" to an inclusive
+        (low, high) pair where either bound may be None. Operation, error
+        and time filters are answered from the indexes, so the cost follows
+        the matching rows rather than the history size; range filters are
+        applied to those candidates. Only in-memory rows are searched.
+        """
+        if status not in (None, "ok", "error"):
+            raise ValueError(f"Unknown status: {status}")
+        for column in ranges:
+            if column not in ("a", "b", "result"):
+                raise ValueError(f"Cannot filter on column: {column}")
+        with self._lock:
+            buffer, index = self._buffer, self._index
+            if index.stale:
+                index.rebuild(buffer)
+            first = buffer.evicted
+            candidates = None
+            if operation is not None:
+                candidates = index.operation_rows(operation, first)
+            if since is not None or until is not None:
+                window = index.time_rows(since, until, first)
+                candidates = window if candidates is None else np.intersect1d(candidates, window, assume_unique=True)
+            if status == "error":
+                failed = index.error_rows(first)
+                candidates = failed if candidates is None else np.intersect1d(candidates, failed, assume_unique=True)
+            if candidates is None:
+                positions = np.arange(len(buffer))
+            else:
+                positions = np.asarray(candidates, dtype=np.int64) - first
+            rows = buffer.take(positions)
+        cols = rows.columns()
+        keep = np.ones(len(rows), dtype=bool)
+        if status == "ok":
+            keep &= cols["error_codes"] < 0
+        for column, (low, high) in ranges.items():
+            values = cols[column]
+            if column == "result":
+                keep &= cols["result_valid"]
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+        selected = np.flatnonzero(keep)
+        if limit is not None:
+            selected = selected[:int(limit)]
+        if len(selected) < len(rows):
+            rows = rows.take(selected)
+        return rows.to_frame()
+
+    def summary(self, operation: Optional[str] = None) -> Dict[str, Any]:
+        """Count, errors, error rate and min/max/mean/p50/p99 of results.
+
+        Per operation keyed by name, or for one `operation`. Read from
+        running aggregates, so the cost does not grow with the history;
+        p50 and p99 are sketch estimates within 1% of the true value.
+        """
+        with self._lock:
+            return self._current_stats().summary(operation)
+
+    def summary_overall(self) -> Dict[str, Any]:
+        """`summary()` of all operations together."""
+        with self._lock:
+            return self._current_stats().overall().summary()
+
+    def _current_stats(self) -> HistoryStats:
+        if self._stats.stale:
+            self._stats.rebuild(self.to_buffer())
+        return self._stats
+
+    def render(self, start: int = 0, stop: int | None = None) -> str:
+        """Text table of in-memory rows [start:stop] (slice semantics).
+
+        Only those rows are read and formatted, and rows formatted by an
+        earlier call are reused, so paging through a long history or
+        re-showing its tail after a few adds costs the rows shown.
+        """
+        with self._lock:
+            start, stop, _ = slice(start, stop).indices(len(self))
+            first = self._buffer.evicted
+            return self._renderer.render(first + start, first + max(start, stop), self._rows, first)
+
+    def tail_buffer(self, limit: int | None = None) -> HistoryBuffer:
+        """A copy of the newest `limit` rows (all rows when None) as a HistoryBuffer."""
+        with self._lock:
+            buffer = self.to_buffer()
+            n = len(buffer)
+            start = 0 if limit is None else max(n - max(int(limit), 0), 0)
+            return buffer.take(np.arange(start, n))
+
+    def _rows(self, start: int, stop: int) -> List[HistoryRow]:
+        """In-memory rows start..stop-1 as tuples."""
+        buffer = self._buffer
+        return [buffer.row(i) for i in range(start, stop)]
+
+    def flush_events(self, timeout: float | None = None) -> bool:
+        """Waits until queued observer events are delivered (no-op when synchronous)."""
+        if self.dispatcher is None:
+            return True
+        return self.dispatcher.flush(timeout)
 
     def save(self, path: str | None = None):
         p = Path(path) if path else self.csv_path
         if not p:
             raise ValueError("No path specified for save")
         p.parent.mkdir(parents=True, exist_ok=True)
-        self.df.to_csv(p, index=False, encoding=self.encoding)
+        if self._is_binary(p):
+            history_binary.write_history(self.to_buffer(), p)
+        else:
+            write_csv(p, self.to_buffer(), self.encoding)
         self._notify("saved", {"path": str(p)})
 
     def load(self, path: str | None = None):
         p = Path(path) if path else self.csv_path
         if not p or not p.exists():
             raise FileNotFoundError("History file not found")
-        self.df = pd.read_csv(p, encoding=self.encoding)
+        if self._is_binary(p):
+            buffer = history_binary.read_history(p)
+        else:
+            import pandas as pd
+            buffer = HistoryBuffer.from_frame(pd.read_csv(p, encoding=self.encoding))
+        self._replace_rows(buffer)
         self._notify("loaded", {"path": str(p)})
 
+    def to_buffer(self) -> HistoryBuffer:
+        """History as a HistoryBuffer (the live one for the in-memory store)."""
+        return self._buffer
+
+    def _replace_rows(self, buffer: HistoryBuffer) -> None:
+        buffer = buffer.bounded(self.max_size)
+        with self._lock:
+            self._swap_buffer(buffer)
+            self._df_cache = None
+
+    def close(self) -> None:
+        """Delivers queued observer events and flushes rows staged for the archive."""
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    def _is_binary(self, p: Path) -> bool:
+        if self.file_format == "auto":
+            return history_binary.is_binary_path(p)
+        return self.file_format == "binary"
+
     def clear(self):
-        self.df = self.df.iloc[0:0]
+        with self._lock:
+            self._swap_buffer(HistoryBuffer(max_rows=self.max_size), HistoryStats())
+            self._index.reset()
+            self._df_cache = None
         self._notify("cleared", {})
@@ -0,0 +1,92 @@
+# app/history_archive.py
+from __future__ import annotations
+
+import atexit
+import csv
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+from app.history_buffer import HistoryRow, HISTORY_COLUMNS, empty_frame, typed_frame
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class HistoryArchive:
+    """Spills rows evicted from a bounded history to rotating CSV files.
+
+    Evicted rows are staged in memory and written `spill_rows` at a time;
+    a new file (history-archive-00001.csv, -00002, ...) is started once the
+    current one holds `rows_per_file` rows. Staged rows are also flushed
+    at interpreter exit, so exits that skip `close()` do not drop them.
+    """
+    PREFIX = "history-archive-"
+
+    def __init__(self, directory: str, spill_rows: int = 256, rows_per_file: int = 100_000,
+                 encoding: str = "utf-8"):
+        self.directory = Path(directory)
+        self.spill_rows = max(int(spill_rows), 1)
+        self.rows_per_file = max(int(rows_per_file), 1)
+        self.encoding = encoding
+        self._staged: List[HistoryRow] = []
+        existing = self.files()
+        self._file_index = int(existing[-1].stem[len(self.PREFIX):]) if existing else 1
+        self._rows_in_file = self._count_rows(existing[-1]) if existing else 0
+        atexit.register(self.flush)
+
+    def files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"{self.PREFIX}*.csv"))
+
+    def _path(self, index: int) -> Path:
+        return self.directory / f"{self.PREFIX}{index:05d}.csv"
+
+    @staticmethod
+    def _count_rows(path: Path) -> int:
+        with open(path, "rb") as f:
+            return max(sum(1 for _ in f) - 1, 0)
+
+    def stage(self, row: HistoryRow) -> None:
+        self._staged.append(row)
+        if len(self._staged) >= self.spill_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes staged rows, rotating to a new file as each one fills up."""
+        if not self._staged:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        rows, self._staged = self._staged, []
+        while rows:
+            if self._rows_in_file >= self.rows_per_file:
+                self._file_index += 1
+                self._rows_in_file = 0
+            take = rows[:self.rows_per_file - self._rows_in_file]
+            rows = rows[len(take):]
+            path = self._path(self._file_index)
+            new_file = not path.exists() or path.stat().st_size == 0
+            with open(path, "a", newline="", encoding=self.encoding) as f:
+                writer = csv.writer(f, lineterminator="\n")
+                if new_file:
+                    writer.writerow(HISTORY_COLUMNS)
+                writer.writerows(["" if v is None else v for v in row] for row in take)
+                f.flush()
+                os.fsync(f.fileno())
+            self._rows_in_file += len(take)
+
+    def close(self) -> None:
+        """Flushes staged rows and drops the exit hook."""
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Every archived row, oldest first, including rows not yet flushed."""
+        import pandas as pd
+        frames = [pd.read_csv(p, encoding=self.encoding) for p in self.files()]
+        if self._staged:
+            frames.append(pd.DataFrame(self._staged, columns=HISTORY_COLUMNS))
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return empty_frame()
+        return typed_frame(pd.concat(frames, ignore_index=True))
@@ -0,0 +1,120 @@
+# app/history_binary.py
+"""Binary columnar history format.
+
+Layout: an 8-byte magic, a little-endian uint32 version and uint32 header
+length, a JSON header, then one 64-byte aligned block per column. Numeric
+columns are raw fixed-width arrays that `read_history` memory-maps
+read-only; operation and error strings live in side tables in the header
+and rows refer to them by code. Timestamps are int64 epoch nanoseconds
+(version 2); version 1 files, which stored them as fixed-width ISO byte
+strings, are still read.
+"""
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict
+import numpy as np
+from app.history_buffer import HistoryBuffer, coerce_timestamp
+
+MAGIC = b"CALCHIST"
+VERSION = 2
+BINARY_EXTENSIONS = (".hbin",)
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 64
+
+# column name -> dtype written to disk
+_NUMERIC_COLUMNS = {
+    "op_codes": "<i4",
+    "a": "<f8",
+    "b": "<f8",
+    "result": "<f8",
+    "result_valid": "|b1",
+    "error_codes": "<i4",
+    "timestamps": "<i8",
+}
+
+
+def is_binary_path(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in BINARY_EXTENSIONS
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_history(buffer: HistoryBuffer, path: str | Path) -> None:
+    """Writes `buffer` to `path`, replacing the file atomically.
+
+    The replace matters when `path` is the file currently memory-mapped by
+    the live history: the old mapping keeps its inode alive.
+    """
+    p = Path(path)
+    cols = buffer.columns()
+    n = len(buffer)
+    arrays: Dict[str, np.ndarray] = {
+        name: np.ascontiguousarray(cols[name], dtype=dtype) for name, dtype in _NUMERIC_COLUMNS.items()
+    }
+
+    header: Dict[str, Any] = {
+        "rows": n,
+        "operations": cols["operations"],
+        "errors": cols["errors"],
+        "columns": {},
+    }
+    # offsets depend on header size, so lay columns out relative to a
+    # provisional data start and fix up once the header length is known
+    def layout(data_start: int) -> None:
+        offset = data_start
+        for name, arr in arrays.items():
+            offset = _aligned(offset)
+            header["columns"][name] = {"dtype": arr.dtype.str, "offset": offset}
+            offset += arr.nbytes
+
+    data_start = 0
+    while True:
+        layout(data_start)
+        raw_header = json.dumps(header).encode("utf-8")
+        needed = _aligned(_PREAMBLE.size + len(raw_header))
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(raw_header)))
+        f.write(raw_header)
+        for name, arr in arrays.items():
+            f.seek(header["columns"][name]["offset"])
+            f.write(arr.tobytes())
+    os.replace(tmp, p)
+
+
+def read_history(path: str | Path) -> HistoryBuffer:
+    """Memory-maps a binary history file; pages are read on demand."""
+    p = Path(path)
+    with open(p, "rb") as f:
+        magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a binary history file: {p}")
+        if version not in (1, VERSION):
+            raise ValueError(f"Unsupported binary history version: {version}")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+
+    n = header["rows"]
+    columns: Dict[str, np.ndarray] = {}
+    for name, spec in header["columns"].items():
+        dtype = np.dtype(spec["dtype"])
+        if n == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(p, dtype=dtype, mode="r", offset=spec["offset"], shape=(n,))
+    if version == 1:
+        columns["timestamps"] = np.array([coerce_timestamp(t) for t in columns["timestamps"].tolist()], dtype=np.int64)
+
+    return HistoryBuffer.from_columns(
+        header["operations"], header["errors"],
+        columns["op_codes"], columns["a"], columns["b"], columns["result"],
+        columns["result_valid"], columns["error_codes"], columns["timestamps"],
+    )
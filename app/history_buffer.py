@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# pandas is imported where frames are built or read, keeping it off the startup path
+if TYPE_CHECKING:
+    import pandas as pd
+
+HISTORY_COLUMNS = ["operation", "a", "b", "result", "error", "timestamp"]
+
+# dtypes of the frames history hands out: operation and error are codes
+# into their message tables, result carries a null mask, timestamps are UTC
+HISTORY_SCHEMA = {
+    "operation": "category",
+    "a": "float64",
+    "b": "float64",
+    "result": "Float64",
+    "error": "category",
+    "timestamp": "datetime64[ns]",
+}
+
+# (operation, a, b, result, error, timestamp); the timestamp is an ISO string
+# when read back, and may also be given as a datetime or epoch nanoseconds
+HistoryRow = Tuple[str, float, float, Any, Optional[str], Optional[str]]
+
+# timestamps are stored as int64 nanoseconds since the epoch; this is NaT
+NAT = np.iinfo(np.int64).min
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+class _Interner:
+    """Maps repeated strings (operation tokens, error messages) to small int codes."""
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for v in values or []:
+            self.code(v)
+
+    def code(self, value: str) -> int:
+        c = self._codes.get(value)
+        if c is None:
+            c = len(self.values)
+            self._codes[value] = c
+            self.values.append(value)
+        return c
+
+
+def encode_timestamp(value: Any) -> int:
+    """Epoch nanoseconds (UTC) of an ISO string, datetime or integer; NAT for None."""
+    if type(value) is int:
+        return value
+    if value is None or value == "" or value != value:  # the last catches NaN
+        return NAT
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    nanos = 0
+    if isinstance(value, str):
+        text = value
+        try:
+            value = datetime.datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"Invalid timestamp: {text!r}") from None
+        nanos = _sub_micro_nanos(text)
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return (value - _EPOCH) // _MICROSECOND * 1_000 + nanos
+    raise ValueError(f"Invalid timestamp: {value!r}")
+
+
+def coerce_timestamp(value: Any) -> int:
+    """encode_timestamp, with NAT for values it cannot parse, as frames read
+    back from CSV get NaT; rows added with a bad timestamp are still kept."""
+    try:
+        return encode_timestamp(value)
+    except ValueError:
+        return NAT
+
+
+def _sub_micro_nanos(text: str) -> int:
+    """Nanoseconds from fraction digits past the sixth, which fromisoformat drops."""
+    dot = text.find(".")
+    if dot == -1 or len(text) <= dot + 7:
+        return 0
+    extra = text[dot + 7:dot + 10]
+    digits = len(extra) - len(extra.lstrip("0123456789"))
+    return int(extra[:digits].ljust(3, "0")) if digits else 0
+
+
+def decode_timestamp(ns: int) -> Optional[str]:
+    """ISO string of epoch nanoseconds, with nine fraction digits when needed; None for NAT."""
+    if ns == NAT:
+        return None
+    micros, nanos = divmod(ns, 1_000)
+    text = (_EPOCH + datetime.timedelta(microseconds=micros)).isoformat()
+    if nanos:
+        text = f"{text}{'' if '.' in text else '.000000'}{nanos:03d}"
+    return text
+
+
+def format_timestamps(ns: np.ndarray) -> List[Optional[str]]:
+    """decode_timestamp over an int64 array, formatted by numpy."""
+    out: List[Optional[str]] = []
+    for text in np.datetime_as_string(np.asarray(ns, dtype=np.int64).view("datetime64[ns]"), unit="ns").tolist():
+        if text == "NaT":
+            out.append(None)
+            continue
+        # nine fraction digits, trimmed as isoformat trims: to six, then none
+        if text.endswith("000"):
+            text = text[:-3]
+            if text.endswith(".000000"):
+                text = text[:-7]
+        out.append(text)
+    return out
+
+
+def empty_frame() -> pd.DataFrame:
+    import pandas as pd
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in HISTORY_SCHEMA.items()})
+
+
+def typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` converted to HISTORY_SCHEMA (e.g. rows read back from CSV or SQL)."""
+    return HistoryBuffer.from_frame(df).to_frame()
+
+
+def _timestamp_column(column: pd.Series) -> np.ndarray:
+    """Epoch nanoseconds of a column of datetimes or ISO strings; NAT where unparseable."""
+    import pandas as pd
+    if not pd.api.types.is_datetime64_any_dtype(column):
+        column = pd.to_datetime(column, errors="coerce", format="ISO8601", utc=True)
+    if getattr(column.dt, "tz", None) is not None:
+        column = column.dt.tz_convert("UTC").dt.tz_localize(None)
+    return column.astype("datetime64[ns]").to_numpy().view(np.int64)
+
+
+class HistoryBuffer:
+    """Growable, column-oriented storage for history rows.
+
+    Numeric columns live in float64 arrays that double in capacity when full,
+    so appends are amortized O(1). Operations and errors are interned into
+    integer code arrays; `result` carries a validity mask so failed
+    calculations keep a null when materialized; timestamps are int64
+    epoch nanoseconds. `to_frame()` returns HISTORY_SCHEMA dtypes.
+
+    With `max_rows` set the buffer stops growing at that size and becomes a
+    ring: each further append overwrites the oldest slot and returns the
+    row it displaced.
+    """
+    _ARRAYS = ("_a", "_b", "_result", "_result_valid", "_op_codes", "_error_codes", "_timestamps")
+
+    def __init__(self, capacity: int = 64, max_rows: Optional[int] = None):
+        self.max_rows = max_rows if max_rows and max_rows > 0 else None
+        capacity = max(int(capacity), 1)
+        if self.max_rows:
+            capacity = min(capacity, self.max_rows)
+        self._n = 0
+        self._start = 0  # physical slot of the oldest row; non-zero only once the ring wraps
+        self.evicted = 0  # rows pushed out of the ring so far
+        self._a = np.empty(capacity, dtype=np.float64)
+        self._b = np.empty(capacity, dtype=np.float64)
+        self._result = np.empty(capacity, dtype=np.float64)
+        self._result_valid = np.empty(capacity, dtype=bool)
+        self._op_codes = np.empty(capacity, dtype=np.int32)
+        self._error_codes = np.empty(capacity, dtype=np.int32)  # -1 means no error
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._ops = _Interner()
+        self._errors = _Interner()
+        # True while the columns are read-only views (e.g. a memory-mapped
+        # file); the first mutation copies them into private arrays
+        self._mapped = False
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def capacity(self) -> int:
+        return len(self._a)
+
+    def _slot(self, i: int) -> int:
+        return (self._start + i) % self.capacity if self._start else i
+
+    def _ordered(self, arr: Any) -> Any:
+        """Logical (oldest-first) view of a physical column."""
+        n, start = self._n, self._start
+        if start == 0 or start + n <= self.capacity:
+            return arr[start:start + n]
+        tail = arr[:start + n - self.capacity]
+        if isinstance(arr, list):
+            return arr[start:] + tail
+        return np.concatenate((arr[start:], tail))
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self.capacity and not self._mapped:
+            return
+        capacity = max(self.capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        if self.max_rows:
+            capacity = max(min(capacity, self.max_rows), needed)
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._n] = self._ordered(old)
+            setattr(self, name, new)
+        self._mapped = False
+        self._start = 0
+
+    def append(self, operation: str, a: float, b: float, result: Any = None,
+               error: Optional[str] = None, timestamp: Any = None) -> Optional[HistoryRow]:
+        """Appends a row; returns the evicted oldest row when the ring is full."""
+        evicted = None
+        n = self._n
+        if self._mapped or (n == self.capacity and n != self.max_rows):
+            self._grow(n + 1)
+        if n == self.max_rows:
+            evicted = self.row(0)
+            i = self._start
+            self._start = (self._start + 1) % self.capacity
+            self.evicted += 1
+        else:
+            i = self._slot(n)
+            self._n = n + 1
+        self._op_codes[i] = self._ops.code(operation)
+        self._a[i] = a
+        self._b[i] = b
+        if result is None:
+            self._result[i] = np.nan
+            self._result_valid[i] = False
+        else:
+            self._result[i] = result
+            self._result_valid[i] = True
+        self._error_codes[i] = -1 if error is None else self._errors.code(error)
+        self._timestamps[i] = timestamp if type(timestamp) is int else coerce_timestamp(timestamp)
+        return evicted
+
+    def pop(self, count: int = 1) -> List[HistoryRow]:
+        """Removes and returns the newest `count` rows, oldest first."""
+        count = min(max(int(count), 0), self._n)
+        rows = [self.row(i) for i in range(self._n - count, self._n)]
+        self._grow(self._n)
+        self._n -= count
+        return rows
+
+    def row(self, i: int) -> HistoryRow:
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("History row out of range")
+        i = self._slot(i)
+        code = self._error_codes[i]
+        return (
+            self._ops.values[self._op_codes[i]],
+            float(self._a[i]),
+            float(self._b[i]),
+            float(self._result[i]) if self._result_valid[i] else None,
+            None if code < 0 else self._errors.values[code],
+            decode_timestamp(int(self._timestamps[i])),
+        )
+
+    def timestamp_ns(self, i: int) -> int:
+        """Stored timestamp of row `i` in epoch nanoseconds (NAT when missing)."""
+        return int(self._timestamps[self._slot(i)])
+
+    def take(self, positions: np.ndarray) -> "HistoryBuffer":
+        """A new buffer holding the rows at logical `positions`, in that order."""
+        positions = np.asarray(positions, dtype=np.int64)
+        slots = (self._start + positions) % self.capacity if self._start else positions
+        return HistoryBuffer.from_columns(
+            list(self._ops.values), list(self._errors.values),
+            self._op_codes[slots], self._a[slots], self._b[slots], self._result[slots],
+            self._result_valid[slots], self._error_codes[slots], self._timestamps[slots],
+        )
+
+    def timestamps(self) -> List[Optional[str]]:
+        """Timestamps as ISO strings, oldest first."""
+        return [decode_timestamp(t) for t in self._ordered(self._timestamps).tolist()]
+
+    def columns(self) -> Dict[str, Any]:
+        """The live columns in row order plus the interning tables.
+
+        Views are returned where possible; treat them as read-only.
+        """
+        return {
+            "operations": list(self._ops.values),
+            "errors": list(self._errors.values),
+            "op_codes": self._ordered(self._op_codes),
+            "a": self._ordered(self._a),
+            "b": self._ordered(self._b),
+            "result": self._ordered(self._result),
+            "result_valid": self._ordered(self._result_valid),
+            "error_codes": self._ordered(self._error_codes),
+            "timestamps": self._ordered(self._timestamps),
+        }
+
+    def csv_rows(self) -> List[Tuple[Any, ...]]:
+        """Rows as CSV fields, oldest first: missing values empty, timestamps as
+        decode_timestamp writes them. Needs no pandas, so it works at shutdown."""
+        cols = self.columns()
+        ops, errors = cols["operations"], cols["errors"]
+
+        def number(value: float, present: bool = True) -> Any:
+            return value if present and value == value else ""
+
+        return list(zip(
+            [ops[c] for c in cols["op_codes"].tolist()],
+            [number(v) for v in cols["a"].tolist()],
+            [number(v) for v in cols["b"].tolist()],
+            [number(v, ok) for v, ok in zip(cols["result"].tolist(), cols["result_valid"].tolist())],
+            [errors[c] if c >= 0 else "" for c in cols["error_codes"].tolist()],
+            [t or "" for t in format_timestamps(cols["timestamps"])],
+        ))
+
+    def bounded(self, max_rows: Optional[int]) -> "HistoryBuffer":
+        """A copy limited to the newest `max_rows` rows (self if already within it)."""
+        if not max_rows or max_rows <= 0:
+            return self
+        if self.max_rows == max_rows:
+            return self
+        cols = self.columns()
+        keep = slice(max(self._n - max_rows, 0), self._n)
+        buf = HistoryBuffer.from_columns(
+            cols["operations"], cols["errors"],
+            *(np.array(cols[name][keep]) for name in
+              ("op_codes", "a", "b", "result", "result_valid", "error_codes", "timestamps")),
+        )
+        buf.max_rows = max_rows
+        return buf
+
+    @classmethod
+    def from_columns(cls, operations: List[str], errors: List[str], op_codes: np.ndarray,
+                     a: np.ndarray, b: np.ndarray, result: np.ndarray, result_valid: np.ndarray,
+                     error_codes: np.ndarray, timestamps: np.ndarray) -> "HistoryBuffer":
+        """Adopts existing column arrays without copying them.
+
+        Read-only arrays (such as np.memmap views) are copied lazily on the
+        first append or pop.
+        """
+        buf = cls(capacity=1)
+        buf._ops = _Interner(operations)
+        buf._errors = _Interner(errors)
+        buf._op_codes, buf._a, buf._b = op_codes, a, b
+        buf._result, buf._result_valid, buf._error_codes = result, result_valid, error_codes
+        buf._timestamps = timestamps
+        buf._n = len(a)
+        buf._mapped = not (a.flags.writeable and timestamps.flags.writeable)
+        return buf
+
+    def to_frame(self) -> pd.DataFrame:
+        """The rows as a frame typed by HISTORY_SCHEMA; columns are copied."""
+        import pandas as pd
+        if self._n == 0:
+            return empty_frame()
+        cols = self.columns()
+        return pd.DataFrame({
+            "operation": pd.Categorical.from_codes(np.array(cols["op_codes"]), categories=cols["operations"]),
+            "a": np.array(cols["a"]),
+            "b": np.array(cols["b"]),
+            "result": pd.arrays.FloatingArray(np.array(cols["result"]), ~cols["result_valid"]),
+            "error": pd.Categorical.from_codes(np.array(cols["error_codes"]), categories=cols["errors"]),
+            "timestamp": np.array(cols["timestamps"]).view("datetime64[ns]"),
+        }, columns=HISTORY_COLUMNS)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "HistoryBuffer":
+        import pandas as pd
+        buf = cls(capacity=max(len(df), 64))
+        if len(df) == 0:
+            return buf
+        n = len(df)
+
+        def column(name: str, default: Any = None) -> pd.Series:
+            if name in df.columns:
+                return df[name]
+            return pd.Series([default] * n, index=df.index)
+
+        operation = column("operation")
+        if isinstance(operation.dtype, pd.CategoricalDtype) and not operation.isna().any():
+            buf._ops = _Interner([str(c) for c in operation.cat.categories])
+            buf._op_codes[:n] = operation.cat.codes.to_numpy()
+        else:
+            buf._op_codes[:n] = [buf._ops.code(o) for o in operation.astype(str).to_numpy(dtype=object)]
+        buf._a[:n] = pd.to_numeric(column("a"), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        buf._b[:n] = pd.to_numeric(column("b"), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        result = pd.to_numeric(column("result"), errors="coerce")
+        buf._result[:n] = result.to_numpy(dtype=np.float64, na_value=np.nan)
+        buf._result_valid[:n] = result.notna().to_numpy()
+        errors = column("error")
+        if isinstance(errors.dtype, pd.CategoricalDtype):
+            buf._errors = _Interner([str(c) for c in errors.cat.categories])
+            buf._error_codes[:n] = errors.cat.codes.to_numpy()  # -1 where missing
+        else:
+            buf._error_codes[:n] = [-1 if pd.isna(e) else buf._errors.code(str(e)) for e in errors]
+        buf._timestamps[:n] = _timestamp_column(column("timestamp"))
+        buf._n = n
+        return buf
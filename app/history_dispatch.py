@@ -0,0 +1,147 @@
+# app/history_dispatch.py
+import atexit
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.history import HistoryObserver
+
+Event = Tuple[str, Dict[str, Any]]
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "coalesce")
+
+# delivered ahead of the next batch after events were dropped, so
+# observers that mirror history (autosave) can resynchronize
+COALESCED = "coalesced"
+
+
+class EventDispatcher:
+    """Delivers history events to observers on a background thread.
+
+    Events go into a queue holding at most `max_queue` entries; a worker
+    thread hands them to every observer's `update_batch` up to
+    `batch_size` at a time. When the queue is full, `policy` decides:
+
+    - "block": the producer waits for the worker to make room.
+    - "drop_oldest": the oldest queued event is discarded.
+    - "coalesce": every queued "added" and "added_batch" event is discarded at once,
+      keeping state changes such as "cleared" or "loaded".
+
+    Whenever events are discarded, observers next receive a "coalesced"
+    event with the number dropped. `flush()` waits until everything queued
+    has been delivered; `close()` drains the queue and stops the worker.
+    It also runs at interpreter exit, so queued events are not lost with
+    the daemon worker when nobody calls it.
+    """
+    def __init__(self, max_queue: int = 1024, batch_size: int = 64, policy: str = "block"):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.max_queue = max(int(max_queue), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.policy = policy
+        self.delivered = 0
+        self.dropped = 0
+        self._queue: Deque[Event] = deque()
+        self._cond = threading.Condition()
+        self._observers: Callable[[], List["HistoryObserver"]] = list
+        self._lost = 0
+        self._in_flight = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def bind(self, observers: Callable[[], List["HistoryObserver"]]) -> None:
+        """Sets the callable that returns the observers to deliver to."""
+        self._observers = observers
+
+    def submit(self, event: str, payload: Dict[str, Any]) -> None:
+        with self._cond:
+            closed = self._closed
+        if closed:
+            # after close, fall back to delivering inline
+            self._deliver([(event, payload)])
+            return
+        with self._cond:
+            on_worker = threading.current_thread() is self._thread
+            while len(self._queue) >= self.max_queue and not on_worker:
+                if self.policy == "block":
+                    self._cond.wait()
+                elif self.policy == "drop_oldest":
+                    self._queue.popleft()
+                    self._discarded(1)
+                else:
+                    kept = deque(e for e in self._queue if e[0] not in ("added", "added_batch"))
+                    dropped = len(self._queue) - len(kept)
+                    if dropped == 0:
+                        kept.popleft()
+                        dropped = 1
+                    self._queue = kept
+                    self._discarded(dropped)
+            self._queue.append((event, payload))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="history-dispatch", daemon=True)
+                self._thread.start()
+                # atexit runs hooks last-registered first; registering now, after
+                # the observers were set up, drains the queue before they close
+                atexit.register(self.close)
+            self._cond.notify_all()
+
+    def _discarded(self, count: int) -> None:
+        self.dropped += count
+        self._lost += count
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if self._lost:
+                    batch.insert(0, (COALESCED, {"dropped": self._lost}))
+                    self._lost = 0
+                self._in_flight = len(batch)
+                # wake producers blocked on a full queue
+                self._cond.notify_all()
+            self._deliver(batch)
+            with self._cond:
+                self._in_flight = 0
+                self.delivered += len(batch)
+                self._cond.notify_all()
+
+    def _deliver(self, batch: List[Event]) -> None:
+        for observer in list(self._observers()):
+            try:
+                update_batch = getattr(observer, "update_batch", None)
+                if update_batch is not None:
+                    update_batch(batch)
+                else:
+                    for event, payload in batch:
+                        observer.update(event, payload)
+            except Exception:
+                # observers must not break the main flow
+                pass
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue) + self._in_flight
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every queued event is delivered; False on timeout."""
+        if threading.current_thread() is self._thread:
+            return False
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Drains the queue, then stops the worker."""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        atexit.unregister(self.close)
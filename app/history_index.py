@@ -0,0 +1,128 @@
+# app/history_index.py
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence
+from app.history_buffer import NAT, HistoryBuffer, encode_timestamp
+
+# stale entries left behind by evictions are tolerated up to this many
+# beyond the live row count before the indexes are rebuilt
+_EVICTION_SLACK = 1024
+
+
+class HistoryIndex:
+    """Secondary indexes over the rows of a HistoryBuffer.
+
+    Rows are identified by absolute number (position plus the rows evicted
+    before it), so evicting the oldest rows does not renumber the rest.
+    Keeps per-operation row lists, the rows that failed, and timestamps in
+    sorted order. Row numbers and timestamps (epoch nanoseconds) are held
+    in int64 arrays, so the indexes cost a few machine words per row.
+    Appending or popping the newest rows updates the indexes
+    in place; replacing the whole buffer (load, undo of a clear) marks them
+    stale and the next lookup rebuilds them.
+    """
+    def __init__(self):
+        self.stale = False
+        self._by_op: Dict[str, array] = {}
+        self._errors = array("q")
+        # sorted by (timestamp, row): parallel timestamps and row numbers
+        self._time_keys = array("q")
+        self._time_rows = array("q")
+        self._evicted = 0
+
+    def reset(self) -> None:
+        """Empties the indexes for an empty buffer."""
+        self._by_op = {}
+        self._errors = array("q")
+        self._time_keys = array("q")
+        self._time_rows = array("q")
+        self._evicted = 0
+        self.stale = False
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    def rebuild(self, buffer: HistoryBuffer) -> None:
+        self.reset()
+        first = buffer.evicted
+        cols = buffer.columns()
+        names = cols["operations"]
+        times = []
+        for pos, (code, error, timestamp) in enumerate(zip(cols["op_codes"].tolist(), cols["error_codes"].tolist(),
+                                                           cols["timestamps"].tolist())):
+            row = first + pos
+            rows = self._by_op.get(names[code])
+            if rows is None:
+                rows = self._by_op[names[code]] = array("q")
+            rows.append(row)
+            if error >= 0:
+                self._errors.append(row)
+            if timestamp != NAT:
+                times.append((timestamp, row))
+        times.sort()
+        self._time_keys = array("q", [key for key, _ in times])
+        self._time_rows = array("q", [row for _, row in times])
+
+    def add(self, row: int, operation: str, error: Optional[str], timestamp: int) -> None:
+        """Indexes the newest row; `timestamp` is in epoch nanoseconds (NAT for none)."""
+        if self.stale:
+            return
+        rows = self._by_op.get(operation)
+        if rows is None:
+            rows = self._by_op[operation] = array("q")
+        rows.append(row)
+        if error is not None:
+            self._errors.append(row)
+        if timestamp != NAT:
+            key, keys = timestamp, self._time_keys
+            if not keys or key >= keys[-1]:
+                keys.append(key)
+                self._time_rows.append(row)
+            else:
+                # rows arrive in increasing order, so a new row sorts after equal timestamps
+                i = bisect_right(keys, key)
+                keys.insert(i, key)
+                self._time_rows.insert(i, row)
+
+    def remove(self, row: int, operation: str, error: Optional[str], timestamp: int) -> None:
+        """Drops the newest row (the one `pop` removed)."""
+        if self.stale:
+            return
+        rows = self._by_op.get(operation)
+        if rows and rows[-1] == row:
+            rows.pop()
+        if error is not None and self._errors and self._errors[-1] == row:
+            self._errors.pop()
+        if timestamp != NAT:
+            key, keys, rows = timestamp, self._time_keys, self._time_rows
+            i = len(keys) - 1
+            if i < 0 or rows[i] != row:
+                i = bisect_left(keys, key)
+                while i < len(keys) and keys[i] == key and rows[i] != row:
+                    i += 1
+            if i < len(keys) and keys[i] == key and rows[i] == row:
+                del keys[i]
+                del rows[i]
+
+    def note_eviction(self, live_rows: int) -> None:
+        self._evicted += 1
+        if self._evicted > live_rows + _EVICTION_SLACK:
+            self.stale = True
+
+    @staticmethod
+    def _from(rows: Sequence[int], first: int) -> Sequence[int]:
+        return rows[bisect_left(rows, first):] if rows and rows[0] < first else rows
+
+    def operation_rows(self, operation: str, first: int = 0) -> Sequence[int]:
+        """Row numbers of `operation`, ascending."""
+        return self._from(self._by_op.get(operation, array("q")), first)
+
+    def error_rows(self, first: int = 0) -> Sequence[int]:
+        return self._from(self._errors, first)
+
+    def time_rows(self, since: Any = None, until: Any = None, first: int = 0) -> List[int]:
+        """Row numbers with since <= timestamp < until, ascending; bounds as for encode_timestamp."""
+        keys = self._time_keys
+        lo = 0 if since is None else bisect_left(keys, encode_timestamp(since))
+        hi = len(keys) if until is None else bisect_left(keys, encode_timestamp(until))
+        return sorted(row for row in self._time_rows[lo:hi] if row >= first)
@@ -0,0 +1,83 @@
+# app/history_render.py
+import math
+from typing import Callable, Dict, List, Tuple
+from app.history_buffer import HISTORY_COLUMNS, HistoryRow
+
+# past this many cached rows, evicted rows are dropped from the cache, and
+# if that is not enough only the rows being shown are kept
+_MAX_CACHED = 10_000
+
+Cells = Tuple[str, ...]
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return "-" if math.isnan(value) else f"{value:.12g}"
+    return str(value)
+
+
+def format_row(row: HistoryRow) -> Cells:
+    return tuple(_cell(v) for v in row)
+
+
+class HistoryRenderer:
+    """Renders slices of history as a text table, caching each row's cells.
+
+    Rows are keyed by absolute number (as in HistoryIndex), so appends and
+    evictions leave the cached rows valid; only rows not yet seen are
+    formatted. `pop` truncates the cache and replacing the whole buffer
+    resets it.
+    """
+    def __init__(self):
+        self._cells: Dict[int, Cells] = {}
+        self._top = 0  # one past the highest cached row number
+        self.formatted = 0  # rows formatted so far, for tests and tuning
+
+    def reset(self) -> None:
+        self._cells = {}
+        self._top = 0
+
+    def truncate(self, end: int) -> None:
+        """Forgets rows numbered `end` and above (they were popped)."""
+        for row in range(end, self._top):
+            self._cells.pop(row, None)
+        self._top = min(self._top, end)
+
+    def _prune(self, first: int, start: int, stop: int) -> None:
+        if len(self._cells) <= _MAX_CACHED:
+            return
+        self._cells = {r: c for r, c in self._cells.items() if r >= first}
+        if len(self._cells) > _MAX_CACHED:
+            self._cells = {r: self._cells[r] for r in range(start, stop)}
+
+    def cells(self, start: int, stop: int, fetch: Callable[[int, int], List[HistoryRow]],
+              first: int = 0) -> List[Cells]:
+        """Cells of rows start..stop-1 (absolute numbers); `fetch(i, j)` reads
+        in-memory positions i..j-1 and is only called for rows not cached."""
+        cache = self._cells
+        missing = [r for r in range(start, stop) if r not in cache]
+        # fetch contiguous runs of missing rows in one call each
+        i = 0
+        while i < len(missing):
+            j = i
+            while j + 1 < len(missing) and missing[j + 1] == missing[j] + 1:
+                j += 1
+            for offset, row in enumerate(fetch(missing[i] - first, missing[j] + 1 - first)):
+                cache[missing[i] + offset] = format_row(row)
+            self.formatted += j + 1 - i
+            self._top = max(self._top, missing[j] + 1)
+            i = j + 1
+        self._prune(first, start, stop)
+        return [cache[r] for r in range(start, stop)]
+
+    def render(self, start: int, stop: int, fetch: Callable[[int, int], List[HistoryRow]],
+               first: int = 0) -> str:
+        """Right-aligned table of rows start..stop-1, widths fitted to those rows."""
+        headers = tuple(HISTORY_COLUMNS)
+        rows = self.cells(start, stop, fetch, first)
+        widths = [len(h) for h in headers]
+        for cells in rows:
+            widths = [max(w, len(c)) for w, c in zip(widths, cells)]
+        return "\n".join(" ".join(c.rjust(w) for c, w in zip(line, widths)) for line in [headers, *rows])
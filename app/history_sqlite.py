@@ -0,0 +1,328 @@
+# app/history_sqlite.py
+from __future__ import annotations
+
+import atexit
+import sqlite3
+import threading
+import numpy as np
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Tuple
+from app.history import HistoryManager, added_payload
+from app.history_buffer import (
+    NAT, HistoryBuffer, HistoryRow, coerce_timestamp, decode_timestamp, encode_timestamp, typed_frame,
+)
+from app.history_dispatch import EventDispatcher
+from app.history_stats import HistoryStats
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    gen INTEGER NOT NULL,
+    operation TEXT,
+    a REAL,
+    b REAL,
+    result REAL,
+    error TEXT,
+    timestamp INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_history_gen_operation ON history (gen, operation);
+CREATE INDEX IF NOT EXISTS idx_history_gen_timestamp ON history (gen, timestamp);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+_SELECT = f"SELECT operation, a, b, result, error, COALESCE(timestamp, {NAT}) AS timestamp FROM history"
+
+
+def _ns(value: Any) -> Optional[int]:
+    """Timestamps are stored as INTEGER epoch nanoseconds (UTC, NULL when
+    missing), so they sort chronologically whatever offset the input had."""
+    ns = encode_timestamp(value)
+    return None if ns == NAT else ns
+
+
+def _stored_ns(value: Any) -> Optional[int]:
+    """_ns for stored rows: an unparseable timestamp is stored as NULL (see coerce_timestamp)."""
+    ns = coerce_timestamp(value)
+    return None if ns == NAT else ns
+
+
+def _row(stored: Tuple[Any, ...]) -> HistoryRow:
+    """A stored row with its timestamp back as ISO text, as HistoryBuffer.row gives it."""
+    return (*stored[:5], None if stored[5] is None else decode_timestamp(stored[5]))
+
+
+def _frame(sql: str, conn: sqlite3.Connection, params: Any) -> pd.DataFrame:
+    import pandas as pd
+    df = pd.read_sql_query(sql, conn, params=params)
+    df["timestamp"] = df["timestamp"].to_numpy(dtype=np.int64).view("datetime64[ns]")
+    return typed_frame(df)
+
+
+@dataclass(frozen=True)
+class SQLiteHistoryState:
+    """Identifies one generation of rows; what `state`/`restore` exchange."""
+    gen: int
+
+
+class SQLiteHistoryManager(HistoryManager):
+    """HistoryManager that persists rows to a SQLite database in WAL mode.
+
+    `add` queues rows and inserts them `batch_size` at a time in a single
+    transaction; any read flushes the queue first. Clearing or loading
+    starts a new generation of rows instead of deleting the old one, so
+    undo can switch back in O(1). Generations other than the current one
+    are purged when the database is next opened.
+    """
+    def __init__(self, db_path: str, csv_path: str | None = None, encoding: str = "utf-8",
+                 file_format: str = "auto", batch_size: int = 500, dispatcher: EventDispatcher | None = None):
+        super().__init__(csv_path=csv_path, encoding=encoding, file_format=file_format, dispatcher=dispatcher)
+        self.db_path = Path(db_path)
+        self.batch_size = max(int(batch_size), 1)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db_lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_text_timestamps()
+        self._pending: List[HistoryRow] = []
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'gen'").fetchone()
+        self._gen = row[0] if row else 0
+        with self._conn:
+            self._conn.execute("DELETE FROM history WHERE gen != ?", (self._gen,))
+            self._set_gen(self._gen)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM history WHERE gen = ?", (self._gen,)).fetchone()[0]
+        self._last_gen = self._gen
+        if self._count:
+            self._stats.invalidate()
+        atexit.register(self.close)
+
+    # --- storage primitives ---
+
+    def _migrate_text_timestamps(self) -> None:
+        """Converts a database written with ISO text timestamps to epoch nanoseconds."""
+        columns = {name: kind for _, name, kind, *_ in self._conn.execute("PRAGMA table_info(history)")}
+        if columns.get("timestamp", "").upper() != "TEXT":
+            return
+        rows = self._conn.execute("SELECT id, gen, operation, a, b, result, error, timestamp FROM history").fetchall()
+        with self._conn:
+            self._conn.execute("DROP INDEX IF EXISTS idx_history_gen_operation")
+            self._conn.execute("DROP INDEX IF EXISTS idx_history_gen_timestamp")
+            self._conn.execute("DROP TABLE history")
+        self._conn.executescript(_SCHEMA)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO history (id, gen, operation, a, b, result, error, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(*r[:7], _stored_ns(r[7])) for r in rows])
+
+    def _set_gen(self, gen: int) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('gen', ?)", (gen,))
+        self._gen = gen
+
+    def _new_gen(self) -> int:
+        # never reuse a generation an undo memento might still point at
+        self._last_gen += 1
+        return self._last_gen
+
+    def flush(self) -> None:
+        """Inserts queued rows in one transaction; a no-op once closed."""
+        with self._db_lock:
+            if not self._pending or self._conn is None:
+                return
+            rows, self._pending = self._pending, []
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO history (gen, operation, a, b, result, error, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(self._gen, *row) for row in rows])
+
+    def _insert_buffer(self, buffer: HistoryBuffer) -> None:
+        with self._db_lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO history (gen, operation, a, b, result, error, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((self._gen, *buffer.row(i)[:5], _ns(buffer.timestamp_ns(i))) for i in range(len(buffer))))
+
+    def close(self) -> None:
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        with self._db_lock:
+            if self._conn is None:
+                return
+            try:
+                self.flush()
+            finally:
+                self._conn.close()
+                self._conn = None
+                atexit.unregister(self.close)
+
+    # --- HistoryManager interface ---
+
+    @property
+    def df(self) -> pd.DataFrame:
+        with self._lock:
+            if self._df_cache is None:
+                with self._db_lock:
+                    self.flush()
+                    self._df_cache = _frame(f"{_SELECT} WHERE gen = ? ORDER BY id", self._conn, (self._gen,))
+            return self._df_cache
+
+    @df.setter
+    def df(self, value: pd.DataFrame) -> None:
+        self._replace_rows(HistoryBuffer.from_frame(value))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def state(self) -> SQLiteHistoryState:
+        self.flush()
+        return SQLiteHistoryState(self._gen)
+
+    def restore(self, state: SQLiteHistoryState) -> None:
+        with self._db_lock, self._conn:
+            self.flush()
+            self._set_gen(state.gen)
+            self._count = self._conn.execute("SELECT COUNT(*) FROM history WHERE gen = ?", (self._gen,)).fetchone()[0]
+        self._stats.invalidate()
+        self._renderer.reset()
+        self._df_cache = None
+        self._notify("restored", {"rows": self._count})
+
+    def pop(self, count: int = 1) -> List[HistoryRow]:
+        with self._db_lock:
+            self.flush()
+            with self._conn:
+                found = self._conn.execute(
+                    "SELECT id, operation, a, b, result, error, timestamp FROM history WHERE gen = ? ORDER BY id DESC LIMIT ?",
+                    (self._gen, max(int(count), 0))).fetchall()
+                self._conn.executemany("DELETE FROM history WHERE id = ?", [(r[0],) for r in found])
+        rows = [_row(r[1:]) for r in reversed(found)]
+        for row in reversed(rows):
+            self._stats.remove(row[0], row[3], row[4])
+        self._renderer.truncate(self._count - len(rows))
+        self._count -= len(rows)
+        self._df_cache = None
+        self._notify("restored", {"rows": self._count})
+        return rows
+
+    def push(self, rows: List[HistoryRow]) -> None:
+        with self._db_lock:
+            self._pending.extend(self._stored(row) for row in rows)
+            self.flush()
+            for row in rows:
+                self._stats.add(row[0], row[3], row[4])
+        self._count += len(rows)
+        self._df_cache = None
+        self._notify("restored", {"rows": self._count})
+
+    @staticmethod
+    def _stored(row: HistoryRow) -> Tuple[Any, ...]:
+        return (*row[:5], _stored_ns(row[5]))
+
+    def add_row(self, row: HistoryRow) -> None:
+        row = self._stored(row)
+        with self._lock, self._db_lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            self._count += 1
+            self._stats.add(row[0], row[3], row[4])
+            self._df_cache = None
+            self._seq += 1
+            seq = self._seq
+        if self._observers or self.dispatcher is not None:
+            self._notify("added", added_payload(row, seq))
+
+    def add_many(self, rows: Iterable[HistoryRow]) -> int:
+        """Queues a block of rows, flushing once if the batch fills up."""
+        rows = [self._stored(row) for row in rows]
+        if not rows:
+            return 0
+        with self._lock, self._db_lock:
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            self._count += len(rows)
+            for row in rows:
+                self._stats.add(row[0], row[3], row[4])
+            self._df_cache = None
+            first = self._seq + 1
+            self._seq += len(rows)
+        if self._observers or self.dispatcher is not None:
+            self._notify("added_batch", {"rows": [added_payload(row, first + i) for i, row in enumerate(rows)],
+                                         "seq": first + len(rows) - 1})
+        return len(rows)
+
+    def clear(self):
+        with self._db_lock, self._conn:
+            self.flush()
+            self._set_gen(self._new_gen())
+        self._count = 0
+        self._stats = HistoryStats()
+        self._renderer.reset()
+        self._df_cache = None
+        self._notify("cleared", {})
+
+    def to_buffer(self) -> HistoryBuffer:
+        return HistoryBuffer.from_frame(self.df)
+
+    def _rows(self, start: int, stop: int) -> List[HistoryRow]:
+        with self._db_lock:
+            self.flush()
+            return [_row(r) for r in self._conn.execute(
+                "SELECT operation, a, b, result, error, timestamp FROM history WHERE gen = ? ORDER BY id LIMIT ? OFFSET ?",
+                (self._gen, stop - start, start))]
+
+    def _replace_rows(self, buffer: HistoryBuffer) -> None:
+        with self._db_lock, self._conn:
+            self.flush()
+            self._set_gen(self._new_gen())
+        self._insert_buffer(buffer)
+        self._count = len(buffer)
+        self._stats.invalidate()
+        self._renderer.reset()
+        self._df_cache = None
+
+    def query(self, operation: Optional[str] = None, status: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              limit: Optional[int] = None, **ranges: Tuple[Optional[float], Optional[float]]) -> pd.DataFrame:
+        """Filters rows in SQL without materializing the full history.
+
+        `ranges` maps a numeric column ("a", "b", "result") to an inclusive
+        (low, high) pair; either bound may be None.
+        """
+        clauses, params = ["gen = ?"], [self._gen]
+        if operation is not None:
+            clauses.append("operation = ?")
+            params.append(operation)
+        if status == "error":
+            clauses.append("error IS NOT NULL")
+        elif status == "ok":
+            clauses.append("error IS NULL")
+        elif status is not None:
+            raise ValueError(f"Unknown status: {status}")
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_ns(since))
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(_ns(until))
+        for column, (low, high) in ranges.items():
+            if column not in ("a", "b", "result"):
+                raise ValueError(f"Cannot filter on column: {column}")
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+        sql = f"{_SELECT} WHERE {' AND '.join(clauses)} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._db_lock:
+            self.flush()
+            return _frame(sql, self._conn, params)
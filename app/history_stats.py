@@ -0,0 +1,266 @@
+# app/history_stats.py
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from app.history_buffer import HistoryBuffer
+
+# magnitudes below this share the zero bucket of the sketch
+_MIN_MAGNITUDE = 1e-12
+# results are buffered and added to the sketch in bulk, keeping add() cheap
+_FOLD_EVERY = 1024
+
+
+def _finite(result: Any) -> Optional[float]:
+    """`result` as a float, or None for missing and non-finite results."""
+    if result is None:
+        return None
+    if type(result) is float:
+        return result if math.isfinite(result) else None
+    try:
+        value = float(result)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch over log-spaced buckets.
+
+    Every value lands in a bucket whose bounds are within
+    `relative_accuracy` of it, so quantiles carry that relative error.
+    Buckets are plain counts: values can be removed again, and sketches
+    with the same accuracy merge by adding counts. Memory follows the
+    range of values seen, not how many there were.
+    """
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive: Dict[int, int] = {}
+        self._negative: Dict[int, int] = {}
+        self._zero = 0
+        self.count = 0
+
+    def _value(self, key: int) -> float:
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def add_many(self, values: Sequence[float], count: int = 1) -> None:
+        """Adds `count` copies of each value; a negative count removes them.
+
+        Bucket keys are always computed here, with numpy, so a value removed
+        later lands in exactly the bucket it was added to.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        magnitude = np.abs(values)
+        nonzero = magnitude >= _MIN_MAGNITUDE
+        self._zero += int((~nonzero).sum()) * count
+        for store, mask in ((self._positive, nonzero & (values > 0)), (self._negative, nonzero & (values < 0))):
+            if not mask.any():
+                continue
+            keys, counts = np.unique(np.ceil(np.log(magnitude[mask]) / self._log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for key, n in zip(keys.tolist(), counts.tolist()):
+                remaining = store.get(key, 0) + n * count
+                if remaining > 0:
+                    store[key] = remaining
+                else:
+                    store.pop(key, None)
+        self.count += len(values) * count
+
+    def add(self, value: float) -> None:
+        self.add_many((value,))
+
+    def remove(self, value: float) -> None:
+        self.add_many((value,), -1)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other._gamma != self._gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other._positive.items():
+            self._positive[key] = self._positive.get(key, 0) + count
+        for key, count in other._negative.items():
+            self._negative[key] = self._negative.get(key, 0) + count
+        self._zero += other._zero
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the q-quantile (0 <= q <= 1), or None when empty."""
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # most negative first: largest magnitudes of the negative store
+        for key in sorted(self._negative, reverse=True):
+            seen += self._negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self._zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._positive):
+            seen += self._positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self._positive)) if self._positive else 0.0
+
+
+class OperationStats:
+    """Running count, error count, sum, min, max and quantiles of one operation.
+
+    `remove` must undo the most recent `add` still counted (as `pop` does),
+    which lets min and max live on stacks that only grow when a new
+    extreme arrives. Merged stats are for reporting; don't remove from them.
+    """
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.sketch = QuantileSketch()
+        # newest results not yet in the sketch, oldest first
+        self._pending = array("d")
+        # unboxed doubles: ascending results push every row onto the max stack
+        self._mins = array("d")
+        self._maxs = array("d")
+
+    @property
+    def values(self) -> int:
+        """How many finite results are counted."""
+        return self.sketch.count + len(self._pending)
+
+    def _fold(self) -> None:
+        if self._pending:
+            self.sketch.add_many(self._pending)
+            self._pending = array("d")
+
+    def add(self, result: Any, error: Optional[str] = None) -> None:
+        self.count += 1
+        if error is not None:
+            self.errors += 1
+            return
+        value = _finite(result)
+        if value is None:
+            return
+        self.total += value
+        self._pending.append(value)
+        if len(self._pending) >= _FOLD_EVERY:
+            self._fold()
+        if not self._mins or value <= self._mins[-1]:
+            self._mins.append(value)
+        if not self._maxs or value >= self._maxs[-1]:
+            self._maxs.append(value)
+
+    def remove(self, result: Any, error: Optional[str] = None) -> None:
+        self.count -= 1
+        if error is not None:
+            self.errors -= 1
+            return
+        value = _finite(result)
+        if value is None:
+            return
+        if self._pending:
+            self._pending.pop()  # the newest result is the one being taken back
+        else:
+            self.sketch.remove(value)
+        # the sum is reset once empty so rounding drift cannot build up
+        self.total = self.total - value if self.values else 0.0
+        if self._mins and self._mins[-1] == value:
+            self._mins.pop()
+        if self._maxs and self._maxs[-1] == value:
+            self._maxs.pop()
+
+    def merge(self, other: "OperationStats") -> None:
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self._fold()
+        other._fold()
+        self.sketch.merge(other.sketch)
+        self._mins = array("d", [min(self._mins[-1:] + other._mins[-1:])] if self._mins or other._mins else [])
+        self._maxs = array("d", [max(self._maxs[-1:] + other._maxs[-1:])] if self._maxs or other._maxs else [])
+
+    def _quantile(self, q: float) -> Optional[float]:
+        self._fold()
+        value = self.sketch.quantile(q)
+        if value is None:
+            return None
+        # the bucket estimate can overshoot the observed extremes
+        return min(max(value, self._mins[-1]), self._maxs[-1])
+
+    def summary(self) -> Dict[str, Any]:
+        values = self.values
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": self.errors / self.count if self.count else 0.0,
+            "min": self._mins[-1] if values else None,
+            "max": self._maxs[-1] if values else None,
+            "mean": self.total / values if values else None,
+            "p50": self._quantile(0.5),
+            "p99": self._quantile(0.99),
+        }
+
+
+class HistoryStats:
+    """Per-operation running aggregates kept alongside a history buffer.
+
+    Adds and pops update them in place, so a summary costs the same
+    whatever the history size. Replacing the whole buffer marks them
+    stale and the next summary rebuilds them from the rows.
+    """
+    def __init__(self):
+        self.stale = False
+        self._ops: Dict[str, OperationStats] = {}
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    def rebuild(self, buffer: HistoryBuffer) -> None:
+        self._ops = {}
+        self.stale = False
+        cols = buffer.columns()
+        names = cols["operations"]
+        for code, result, valid, error in zip(cols["op_codes"].tolist(), cols["result"].tolist(),
+                                              cols["result_valid"].tolist(), cols["error_codes"].tolist()):
+            self.add(names[code], result if valid else None, "error" if error >= 0 else None)
+
+    def add(self, operation: str, result: Any, error: Optional[str] = None) -> None:
+        if self.stale:
+            return
+        stats = self._ops.get(operation)
+        if stats is None:
+            stats = self._ops[operation] = OperationStats()
+        stats.add(result, error)
+
+    def remove(self, operation: str, result: Any, error: Optional[str] = None) -> None:
+        """Takes back the newest row of `operation` (the one `pop` removed)."""
+        if self.stale:
+            return
+        stats = self._ops.get(operation)
+        if stats is None:
+            return
+        stats.remove(result, error)
+        if stats.count <= 0:
+            del self._ops[operation]
+
+    def merge(self, other: "HistoryStats") -> None:
+        for operation, stats in other._ops.items():
+            self._ops.setdefault(operation, OperationStats()).merge(stats)
+
+    def operations(self) -> List[str]:
+        return sorted(self._ops)
+
+    def overall(self) -> OperationStats:
+        """All operations merged into one."""
+        merged = OperationStats()
+        for stats in self._ops.values():
+            merged.merge(stats)
+        return merged
+
+    def summary(self, operation: Optional[str] = None) -> Dict[str, Any]:
+        """Summary of one operation, or of each operation keyed by name."""
+        if operation is not None:
+            return self._ops.get(operation, OperationStats()).summary()
+        return {name: self._ops[name].summary() for name in sorted(self._ops)}
@@ -12,6 +12,12 @@ def parse_operands_lbyl(a_raw: str, b_raw: str) -> Tuple[float, float]:
     except ValueError as e:
         raise OperandError(f"Operands must be numeric: {e}")
 
+def parse_operand_eafp(raw: str, name: str = "Operand") -> float:
+    try:
+        return float(raw)
+    except Exception as e:
+        raise OperandError(f"{name} must be numeric: {e}")
+
 def parse_operands_eafp(a_raw: str, b_raw: str) -> Tuple[float, float]:
     try:
         return float(a_raw), float(b_raw)
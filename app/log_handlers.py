@@ -0,0 +1,176 @@
+# app/log_handlers.py
+"""Logging building blocks shared by `app.logger` and `LoggingObserver`.
+
+- JsonLinesFormatter: one compact JSON object per record.
+- BatchedRotatingFileHandler: buffers records, writes them in batches and
+  rotates the file by size.
+- attach_handlers(queue=True): the logger only enqueues records; a
+  QueueListener thread formats and writes them.
+- EventSampler: keeps 1 in N events and/or caps events per second.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+LOG_FORMATS = ("text", "json")
+
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+_listeners_lock = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats a record as compact JSON; history events keep their payload as an object."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if hasattr(record, "event"):
+            entry["event"] = record.event
+            entry["payload"] = getattr(record, "payload", None)
+        else:
+            entry["msg"] = record.getMessage()
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that writes `batch_size` records at a time.
+
+    Records are formatted as they arrive and written together on the next
+    full batch, `flush()` or `close()`. Rotation is checked once per batch,
+    so a file can overshoot `maxBytes` by at most one batch.
+    """
+    def __init__(self, filename: str, maxBytes: int = 0, backupCount: int = 5,
+                 batch_size: int = 64, encoding: str = "utf-8", delay: bool = True):
+        super().__init__(filename, mode="a", maxBytes=maxBytes, backupCount=backupCount,
+                         encoding=encoding, delay=delay)
+        self.batch_size = max(int(batch_size), 1)
+        self._lines: List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._lines.append(self.format(record) + self.terminator)
+            if len(self._lines) >= self.batch_size:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._lines:
+                data, self._lines = "".join(self._lines), []
+                if self.stream is None:
+                    self.stream = self._open()
+                if self.maxBytes > 0 and self.stream.tell() > 0 and self.stream.tell() + len(data) > self.maxBytes:
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.write(data)
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.flush()
+        super().close()
+
+
+class _EnqueueOnlyHandler(logging.handlers.QueueHandler):
+    # the stock QueueHandler formats the message before enqueueing; leave
+    # that to the listener thread so the caller only pays for the put
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def make_file_handler(log_file: str, fmt: str = "text", max_bytes: int = 0, backup_count: int = 5,
+                      batch_size: int = 1, text_format: Optional[logging.Formatter] = None) -> logging.Handler:
+    """A file handler for `fmt`; batching and rotation kick in when configured."""
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {fmt}")
+    if max_bytes > 0 or batch_size > 1:
+        handler: logging.Handler = BatchedRotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                              batch_size=batch_size)
+    else:
+        handler = logging.FileHandler(log_file, encoding="utf-8", delay=True)
+    handler.setFormatter(JsonLinesFormatter() if fmt == "json" else
+                         text_format or logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    return handler
+
+
+def attach_handlers(logger: logging.Logger, handlers: List[logging.Handler], use_queue: bool = False) -> None:
+    """Adds `handlers` to `logger`, behind a queue and listener thread if `use_queue`."""
+    if not use_queue:
+        for handler in handlers:
+            logger.addHandler(handler)
+        return
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    logger.addHandler(_EnqueueOnlyHandler(records))
+    with _listeners_lock:
+        previous = _listeners.pop(logger.name, None)
+        _listeners[logger.name] = listener
+    if previous is not None:
+        previous.stop()
+
+
+def stop_queue_logging(name: Optional[str] = None) -> None:
+    """Drains and stops the listener for logger `name` (all listeners when None).
+
+    The logger keeps working afterwards, writing synchronously.
+    """
+    with _listeners_lock:
+        names = list(_listeners) if name is None else [name]
+        stopped = [(n, _listeners.pop(n)) for n in names if n in _listeners]
+    for logger_name, listener in stopped:
+        logger = logging.getLogger(logger_name)
+        for handler in [h for h in logger.handlers if isinstance(h, _EnqueueOnlyHandler)]:
+            logger.removeHandler(handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+            logger.addHandler(handler)
+
+
+atexit.register(stop_queue_logging)
+
+
+class EventSampler:
+    """Decides which high-volume events to keep.
+
+    Keeps one event in every `every`, and at most `max_per_second` per
+    second (0 disables either limit). `suppressed` counts events dropped.
+    """
+    def __init__(self, every: int = 1, max_per_second: float = 0, clock=time.monotonic):
+        self.every = max(int(every), 1)
+        self.max_per_second = max(float(max_per_second), 0.0)
+        self._clock = clock
+        self._seen = 0
+        self._tokens = self.max_per_second
+        self._last = clock()
+        self.suppressed = 0
+
+    def allow(self) -> bool:
+        self._seen += 1
+        if (self._seen - 1) % self.every:
+            self.suppressed += 1
+            return False
+        if self.max_per_second:
+            now = self._clock()
+            self._tokens = min(self.max_per_second, self._tokens + (now - self._last) * self.max_per_second)
+            self._last = now
+            if self._tokens < 1:
+                self.suppressed += 1
+                return False
+            self._tokens -= 1
+        return True
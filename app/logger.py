@@ -1,15 +1,25 @@
 # app/logger.py
 import logging
 from pathlib import Path
+from app.log_handlers import attach_handlers, make_file_handler, JsonLinesFormatter
 
 def setup_logger(
     name: str = "calculator", 
     log_file: str = "calculator.log", 
-    level=logging.INFO
+    level=logging.INFO,
+    fmt: str = "text",
+    use_queue: bool = False,
+    max_bytes: int = 0,
+    backup_count: int = 5,
+    batch_size: int = 1,
 ) -> logging.Logger:
     """
     Sets up a logger with both console and file handlers.
     Avoids adding duplicate handlers if called multiple times.
+
+    `fmt="json"` writes JSON lines, `max_bytes` rotates the file, `batch_size`
+    groups file writes and `use_queue` moves formatting and I/O to a
+    listener thread.
     """
     log_path = Path(log_file)
     log_path.parent.mkdir(parents=True, exist_ok=True)
@@ -25,21 +35,24 @@ def setup_logger(
 
         # Console handler
         console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        console_handler.setFormatter(JsonLinesFormatter() if fmt == "json" else formatter)
 
         # File handler
-        file_handler = logging.FileHandler(log_path, mode="a")
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        file_handler = make_file_handler(str(log_path), fmt, max_bytes=max_bytes, backup_count=backup_count,
+                                         batch_size=batch_size, text_format=formatter)
 
+        attach_handlers(logger, [console_handler, file_handler], use_queue=use_queue)
         logger.info("Logger initialized.")
 
     return logger
 
 
-# Shared logger instance
-logger = setup_logger()
+def __getattr__(name: str):
+    """Shared logger instance, created (and its log file opened) on first access."""
+    if name == "logger":
+        globals()["logger"] = shared = setup_logger()
+        return shared
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
@@ -1,11 +1,54 @@
 from __future__ import annotations
-from typing import Protocol, Dict, Callable
+import math
+from typing import Protocol, Dict, Callable, Tuple
+import numpy as np
 from app.exceptions import InvalidOperationError
 
+# Array kernels return the computed values plus a mapping of error message
+# to boolean row mask. Rows flagged in a mask hold NaN in the values array.
+ErrorMasks = Dict[str, np.ndarray]
+
+_OVERFLOW_MESSAGE = "(34, 'Numerical result out of range')"
+_ZERO_NEGATIVE_POWER_MESSAGE = "0.0 cannot be raised to a negative power"
+_FRACTIONAL_POWER_MESSAGE = "Fractional power of negative number not supported"
+_NON_FINITE_DEGREE_MESSAGE = "Root of negative number needs a finite degree"
+
+
+def _finish(values: np.ndarray, errors: ErrorMasks) -> Tuple[np.ndarray, ErrorMasks]:
+    """Blank out rows that failed a domain rule and drop empty masks."""
+    errors = {msg: mask for msg, mask in errors.items() if mask.any()}
+    for mask in errors.values():
+        values[mask] = np.nan
+    return values, errors
+
+
+def _snap_root(magnitude: float, base: float, degree: float) -> float:
+    """`magnitude` (base ** (1 / degree)) snapped to the nearest integer when that
+    integer is the exact root: 27 ** (1 / 3) is 3.0000000000000004."""
+    if not math.isfinite(magnitude):
+        return magnitude
+    nearest = float(round(magnitude))
+    try:
+        if nearest ** degree == base:
+            return nearest
+    except (OverflowError, ZeroDivisionError):
+        pass
+    return magnitude
+
+
+def _snap_root_array(magnitude: np.ndarray, base: np.ndarray, degree: np.ndarray) -> np.ndarray:
+    """_snap_root over arrays; call under np.errstate(all="ignore")."""
+    nearest = np.rint(magnitude)
+    return np.where(np.isfinite(magnitude) & (np.power(nearest, degree) == base), nearest, magnitude)
+
+
 class OperationStrategy(Protocol):
     def execute(self, a: float, b: float) -> float:
         ...
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        ...
+
 class Add:
     name = "add"
     symbol = "+"
@@ -13,6 +56,10 @@ class Add:
     def execute(self, a: float, b: float) -> float:
         return a + b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            return np.add(a, b), {}
+
 class Subtract:
     name = "subtract"
     symbol = "-"
@@ -20,6 +67,10 @@ class Subtract:
     def execute(self, a: float, b: float) -> float:
         return a - b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            return np.subtract(a, b), {}
+
 class Multiply:
     name = "multiply"
     symbol = "*"
@@ -27,6 +78,10 @@ class Multiply:
     def execute(self, a: float, b: float) -> float:
         return a * b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            return np.multiply(a, b), {}
+
 class Divide:
     name = "divide"
     symbol = "/"
@@ -36,13 +91,37 @@ class Divide:
             raise ZeroDivisionError("Cannot divide by zero")
         return a / b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            values = np.true_divide(a, b)
+        return _finish(values, {"Cannot divide by zero": b == 0})
+
 class Power:
     name = "power"
     symbol = "**"
 
     def execute(self, a: float, b: float) -> float:
+        # checked up front, as execute_array does: Python returns inf for
+        # 0 ** -inf and a complex number for fractional powers of negatives
+        if a == 0 and b < 0:
+            raise ZeroDivisionError(_ZERO_NEGATIVE_POWER_MESSAGE)
+        if a < 0 and math.isfinite(a) and math.isfinite(b) and b != math.trunc(b):
+            raise ValueError(_FRACTIONAL_POWER_MESSAGE)
         return a ** b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            values = np.power(a, b)
+            finite = np.isfinite(a) & np.isfinite(b)
+            zero_negative = (a == 0) & (b < 0)
+            complex_result = (a < 0) & finite & (b != np.trunc(b))
+        overflow = np.isinf(values) & finite & ~zero_negative
+        return _finish(values, {
+            _ZERO_NEGATIVE_POWER_MESSAGE: zero_negative,
+            _FRACTIONAL_POWER_MESSAGE: complex_result,
+            _OVERFLOW_MESSAGE: overflow,
+        })
+
 class Root:
     name = "root"
     symbol = "root"
@@ -52,10 +131,41 @@ class Root:
             raise ValueError("Root degree cannot be zero")
         # handle negative a with integer odd roots
         if a < 0:
+            if not math.isfinite(b):
+                raise ValueError(_NON_FINITE_DEGREE_MESSAGE)
             if int(b) % 2 == 0:
                 raise ValueError("Even root of negative number not supported")
-            return -((-a) ** (1.0 / b))
-        return a ** (1.0 / b)
+        base = abs(a)
+        exponent = 1.0 / b
+        if base == 0 and exponent < 0:
+            raise ZeroDivisionError(_ZERO_NEGATIVE_POWER_MESSAGE)
+        magnitude = _snap_root(base ** exponent, base, b)
+        # a tiny degree overflows 1 / b itself, and ** then returns inf quietly
+        if math.isinf(magnitude) and math.isfinite(a):
+            raise OverflowError(_OVERFLOW_MESSAGE)
+        return -magnitude if a < 0 else magnitude
+
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            zero_degree = b == 0
+            finite_degree = np.isfinite(b)
+            negative = a < 0
+            non_finite_negative = negative & ~finite_degree
+            even_negative = negative & finite_degree & ~zero_degree & (np.mod(np.trunc(b), 2) == 0)
+            exponent = 1.0 / b
+            base = np.abs(a)
+            magnitude = _snap_root_array(np.power(base, exponent), base, b)
+            zero_negative = (a == 0) & (exponent < 0) & ~zero_degree
+        values = np.where(negative, -magnitude, magnitude)
+        rejected = zero_degree | non_finite_negative | even_negative | zero_negative
+        overflow = np.isinf(magnitude) & np.isfinite(a) & ~rejected
+        return _finish(values, {
+            "Root degree cannot be zero": zero_degree,
+            _NON_FINITE_DEGREE_MESSAGE: non_finite_negative,
+            "Even root of negative number not supported": even_negative,
+            _ZERO_NEGATIVE_POWER_MESSAGE: zero_negative,
+            _OVERFLOW_MESSAGE: overflow,
+        })
 
 class Modulus:
     name = "modulus"
@@ -66,6 +176,11 @@ class Modulus:
             raise ZeroDivisionError("Cannot modulus by zero")
         return a % b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            values = np.mod(a, b)
+        return _finish(values, {"Cannot modulus by zero": b == 0})
+
 class IntDivide:
     name = "int_divide"
     symbol = "//"
@@ -75,6 +190,11 @@ class IntDivide:
             raise ZeroDivisionError("Cannot integer-divide by zero")
         return a // b
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            values = np.floor_divide(a, b)
+        return _finish(values, {"Cannot integer-divide by zero": b == 0})
+
 class Percent:
     name = "percent"
     symbol = "percent"
@@ -85,6 +205,11 @@ class Percent:
             raise ZeroDivisionError("Cannot compute percentage with denominator zero")
         return (a / b) * 100.0
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            values = np.true_divide(a, b) * 100.0
+        return _finish(values, {"Cannot compute percentage with denominator zero": b == 0})
+
 class AbsDiff:
     name = "abs_diff"
     symbol = "abs"
@@ -92,6 +217,10 @@ class AbsDiff:
     def execute(self, a: float, b: float) -> float:
         return abs(a - b)
 
+    def execute_array(self, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ErrorMasks]:
+        with np.errstate(all="ignore"):
+            return np.abs(np.subtract(a, b)), {}
+
 # registry
 _OPERATION_REGISTRY: Dict[str, Callable[[], OperationStrategy]] = {
     Add.name: Add, Add.symbol: Add,
@@ -106,9 +235,34 @@ _OPERATION_REGISTRY: Dict[str, Callable[[], OperationStrategy]] = {
     AbsDiff.name: AbsDiff, AbsDiff.symbol: AbsDiff,
 }
 
+# Flyweights: strategies are stateless, so each one is created once and
+# shared. An operation's ID is its index in this tuple.
+_OPERATIONS: Tuple[OperationStrategy, ...] = (
+    Add(), Subtract(), Multiply(), Divide(), Power(),
+    Root(), Modulus(), IntDivide(), Percent(), AbsDiff(),
+)
+OPERATION_NAMES: Tuple[str, ...] = tuple(op.name for op in _OPERATIONS)
+_ID_BY_CLASS: Dict[type, int] = {type(op): i for i, op in enumerate(_OPERATIONS)}
+_TOKEN_IDS: Dict[str, int] = {token: _ID_BY_CLASS[cls] for token, cls in _OPERATION_REGISTRY.items()}
+
+def resolve_operation(token: str) -> int:
+    """Resolves a token or alias ("+", " ADD ") to its operation ID."""
+    op_id = _TOKEN_IDS.get(token) if isinstance(token, str) else None
+    if op_id is None:
+        op_id = _TOKEN_IDS.get(str(token).strip().lower())
+        if op_id is None:
+            raise InvalidOperationError(f"Invalid operation: {token}")
+    return op_id
+
+def get_operation(op_id: int) -> OperationStrategy:
+    return _OPERATIONS[op_id]
+
+def operation_name(op_id: int) -> str:
+    return OPERATION_NAMES[op_id]
+
+def canonical_name(token: str) -> str:
+    """Resolves aliases ("+", " ADD ") to the operation's name."""
+    return OPERATION_NAMES[resolve_operation(token)]
+
 def get_operation_instance(token: str) -> OperationStrategy:
-    t = str(token).strip().lower()
-    cls = _OPERATION_REGISTRY.get(t)
-    if not cls:
-        raise InvalidOperationError(f"Invalid operation: {token}")
-    return cls()
+    return _OPERATIONS[resolve_operation(token)]
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _log_dir(monkeypatch, tmp_path):
+    """Calculators built by tests log under tmp_path, not the working tree."""
+    monkeypatch.setenv("CALCULATOR_LOG_DIR", str(tmp_path / "logs"))
@@ -0,0 +1,114 @@
+import math
+import pytest
+from unittest.mock import patch
+from app.calculation import Calculation, CalculationFactory
+from app.operations import resolve_operation
+from app.calculation_cache import ResultCache, CacheEntry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_order():
+    cache = ResultCache(capacity=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a").result == 1  # "a" becomes most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c").result == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = ResultCache(capacity=4, ttl_seconds=10, clock=clock)
+    cache.put("k", 5)
+    clock.now = 9.9
+    assert cache.get("k").result == 5
+    clock.now = 10
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_zero_capacity_stores_nothing():
+    cache = ResultCache(capacity=0)
+    cache.put("k", 1)
+    assert len(cache) == 0
+
+
+def test_stats_counts_and_clear():
+    cache = ResultCache(capacity=4)
+    assert cache.stats()["hit_rate"] == 0.0
+    cache.get("missing")
+    cache.put("k", 1)
+    cache.get("k")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_cache_entry_reraises_original_type():
+    entry = CacheEntry(error_type=ZeroDivisionError, error="Cannot divide by zero")
+    with pytest.raises(ZeroDivisionError, match="Cannot divide by zero"):
+        entry.raise_error()
+    CacheEntry(result=1.0).raise_error()  # no error, no raise
+
+
+def test_perform_uses_cache_for_aliases():
+    cache = ResultCache()
+    assert Calculation("+", 2, 3).perform(cache) == 5
+    with patch("app.calculation.get_operation") as lookup:
+        calc = Calculation("add", 2, 3)
+        assert calc.perform(cache) == 5
+        lookup.assert_not_called()
+    assert cache.stats()["hits"] == 1
+
+
+def test_perform_caches_errors():
+    cache = ResultCache()
+    with pytest.raises(ZeroDivisionError):
+        Calculation("/", 1, 0).perform(cache)
+    calc = Calculation("divide", 1, 0)
+    with pytest.raises(ZeroDivisionError, match="Cannot divide by zero"):
+        calc.perform(cache)
+    assert calc.error == "Cannot divide by zero"
+    assert calc.result is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_factory_resolves_operation_id_once():
+    calc = CalculationFactory.create("*", "2", "3")
+    assert calc.op_id == resolve_operation("multiply")
+    cache = ResultCache()
+    calc.perform(cache)
+    assert ResultCache.key(calc.op_id, 2.0, 3.0) in cache._entries
+
+
+def test_signed_zero_operands_cached_separately():
+    cache = ResultCache()
+    assert math.copysign(1.0, Calculation("*", 1, 0.0).perform(cache)) == 1.0
+    assert math.copysign(1.0, Calculation("*", 1, -0.0).perform(cache)) == -1.0
+    assert cache.stats()["hits"] == 0 and len(cache) == 2
+
+
+def test_nan_operands_bypass_cache():
+    cache = ResultCache()
+    assert ResultCache.key(0, float("nan"), 1.0) is None
+    assert math.isnan(Calculation("+", float("nan"), 1).perform(cache))
+    assert len(cache) == 0 and cache.stats()["misses"] == 0
+
+
+def test_calculation_is_slotted_and_yields_a_history_row():
+    calc = CalculationFactory.create("+", "2", "3")
+    assert not hasattr(calc, "__dict__")
+    calc.perform()
+    assert calc.as_row("2026-10-18T10:00:00") == ("add", 2.0, 3.0, 5.0, None, "2026-10-18T10:00:00")
@@ -0,0 +1,174 @@
+import io
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+from app.calculator_batch import (
+    BatchReport, MalformedLine, chunked, detect_format, evaluate_chunk, main, read_jobs, run_batch
+)
+from app.calculator_repl import Calculator
+from app.history import HistoryManager
+
+
+@pytest.fixture
+def calc():
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"):
+        c = Calculator()
+        c.history.clear()
+        c.caretaker.clear()
+        yield c
+
+
+def test_detect_format():
+    assert detect_format("jobs.jsonl") == "jsonl"
+    assert detect_format("jobs.csv") == "csv"
+    assert detect_format("-") == "csv"
+    assert detect_format("jobs.txt", "JSONL") == "jsonl"
+    with pytest.raises(ValueError):
+        detect_format("jobs.csv", "xml")
+
+
+def test_read_jobs_csv_any_column_order():
+    stream = io.StringIO("b,operation,a\n2,+,1\n\n5,/,10\n")
+    assert list(read_jobs(stream, "csv")) == [("+", "1", "2"), ("/", "10", "5")]
+
+
+def test_read_jobs_csv_requires_header():
+    with pytest.raises(ValueError, match="header"):
+        list(read_jobs(io.StringIO("+,1,2\n"), "csv"))
+
+
+def test_read_jobs_jsonl_malformed_line():
+    stream = io.StringIO('{"operation": "*", "a": 2, "b": 3}\nnot json\n\n[1, 2]\n')
+    jobs = list(read_jobs(stream, "jsonl"))
+    assert jobs[0] == ("*", 2, 3)
+    assert isinstance(jobs[1][0], MalformedLine) and jobs[1][0].startswith("Line 2: invalid JSON")
+    assert jobs[2] == ("Line 4: expected a JSON object", None, None)
+
+
+def test_malformed_jsonl_line_reports_parse_error(tmp_path):
+    src = tmp_path / "jobs.jsonl"
+    src.write_text('{"operation": "+", "a": 1, "b": 2}\n{"operation": "+", "a": 1,\n')
+    out = tmp_path / "out.jsonl"
+    report = run_batch(src, out)
+    results = [json.loads(line) for line in out.read_text().splitlines()]
+    assert report.errors == 1
+    assert results[1]["operation"] is None
+    assert results[1]["error"].startswith("Line 2: invalid JSON")
+
+
+def test_chunked():
+    assert [len(c) for c in chunked(range(7), 3)] == [3, 3, 1]
+
+
+def test_evaluate_chunk_reports_errors_per_row():
+    rows, op_ids = evaluate_chunk([("+", "1", "2"), ("/", "1", "0"), ("nope", "1", "1"), ("*", "x", "2"), ("-", "", "1"),
+                                   ("", "1", "2"), (None, "1", "2")])
+    assert rows[0] == ("+", "1", "2", 3.0, None)
+    assert rows[1][3:] == (None, "Cannot divide by zero")
+    assert rows[2][4] == "Invalid operation: nope"
+    assert rows[3][4].startswith("Operands must be numbers")
+    assert rows[4][4] == "First operand empty"
+    assert rows[5][4] == rows[6][4] == "Operation must be provided"
+    # operand errors keep the resolved operation, so history records its name
+    assert op_ids.tolist() == [0, 3, -1, 2, 1, -1, -1]
+
+
+def test_jsonl_null_and_missing_operands_are_errors(tmp_path):
+    src = tmp_path / "jobs.jsonl"
+    src.write_text('{"operation": "add", "a": 1, "b": null}\n{"operation": "add", "a": 1}\n'
+                   '{"operation": "add", "b": 2}\n')
+    out = tmp_path / "out.jsonl"
+    report = run_batch(src, out)
+    results = [json.loads(line) for line in out.read_text().splitlines()]
+    assert report.errors == 3
+    assert [r["result"] for r in results] == [None, None, None]
+    assert [r["error"] for r in results] == ["Second operand empty", "Second operand empty", "First operand empty"]
+
+
+def test_run_batch_streams_csv_to_jsonl(tmp_path):
+    src = tmp_path / "jobs.csv"
+    src.write_text("operation,a,b\n+,1,2\n/,1,0\npower,2,10\n")
+    out = tmp_path / "out.jsonl"
+    history = HistoryManager()
+    report = run_batch(src, out, chunk_size=2, history=history)
+    assert (report.rows, report.errors) == (3, 1)
+    results = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["result"] for r in results] == [3.0, None, 1024.0]
+    assert results[1]["error"] == "Cannot divide by zero"
+    assert history.df["operation"].tolist() == ["add", "divide", "power"]
+
+
+def test_operand_errors_recorded_under_canonical_name(tmp_path):
+    src = tmp_path / "jobs.csv"
+    src.write_text("operation,a,b\n*,x,2\n-,,1\n")
+    history = HistoryManager()
+    run_batch(src, tmp_path / "out.csv", history=history)
+    assert history.df["operation"].tolist() == ["multiply", "subtract"]
+    assert history.df["error"].tolist()[1] == "First operand empty"
+
+
+def test_run_batch_records_each_chunk_as_one_event(tmp_path):
+    src = tmp_path / "jobs.csv"
+    src.write_text("operation,a,b\n+,1,2\n/,1,0\npower,2,10\n")
+    history = HistoryManager()
+    observer = MagicMock()
+    history.attach(observer)
+    run_batch(src, tmp_path / "out.csv", chunk_size=2, history=history)
+    events = [c.args for c in observer.update.call_args_list]
+    assert [e for e, _ in events] == ["added_batch", "added_batch"]
+    assert [len(p["rows"]) for _, p in events] == [2, 1]
+
+
+def test_run_batch_stdin_stdout(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO('{"operation": "-", "a": 5, "b": 3}\n'))
+    run_batch("-", "-", input_format="jsonl", output_format="csv")
+    assert capsys.readouterr().out == "operation,a,b,result,error\n-,5,3,2.0,\n"
+
+
+def test_report_rows_per_second():
+    assert BatchReport(rows=100, seconds=0.5).rows_per_second == 200
+    assert BatchReport().rows_per_second == 0.0
+    assert "rows/sec" in str(BatchReport(rows=1, seconds=1))
+
+
+def test_calculator_run_batch_undo(calc, tmp_path):
+    src = tmp_path / "jobs.csv"
+    src.write_text("operation,a,b\n+,1,2\n*,2,3\n")
+    calc.run_batch(src, tmp_path / "out.csv")
+    assert len(calc.history) == 2
+    calc.undo()
+    assert len(calc.history) == 0
+    calc.redo()
+    assert calc.history.df["result"].tolist() == [3, 6]
+
+
+def test_calculator_run_batch_without_history_or_undo(calc, tmp_path):
+    src = tmp_path / "jobs.csv"
+    src.write_text("operation,a,b\n+,1,2\n")
+    calc.run_batch(src, tmp_path / "out.csv", record_history=False)
+    assert len(calc.history) == 0
+    calc.evaluate("+", "1", "1")
+    calc.run_batch(src, tmp_path / "out.csv", undoable=False)
+    assert len(calc.history) == 2
+    assert not calc.caretaker.can_undo()
+
+
+def test_calculator_run_batch_defers_autosave(calc, tmp_path):
+    src = tmp_path / "jobs.csv"
+    src.write_text("operation,a,b\n+,1,2\n+,3,4\n")
+    observer = MagicMock()
+    calc.autosave = observer
+    calc.history.attach(observer)
+    calc.run_batch(src, tmp_path / "out.csv", autosave=False)
+    observer.update.assert_not_called()
+    observer.compact.assert_called_once()
+
+
+def test_main_reports_throughput(tmp_path, capsys):
+    src = tmp_path / "jobs.jsonl"
+    src.write_text('{"operation": "+", "a": 1, "b": 2}\n')
+    out = tmp_path / "out.csv"
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"):
+        assert main([str(src), "-o", str(out), "--no-history"]) == 0
+    assert "Processed 1 rows (0 errors)" in capsys.readouterr().err
+    assert out.read_text().splitlines()[1] == "+,1,2,3.0,"
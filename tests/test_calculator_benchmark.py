@@ -0,0 +1,110 @@
+import json
+import time
+import pytest
+from app.calculator_benchmark import (
+    LAZY_MODULES, Comparison, StartupReport, compare, main, measure_memory, measure_startup, run_suite,
+)
+from app.history import HistoryManager
+
+
+@pytest.mark.slow
+def test_startup_leaves_heavy_modules_unloaded():
+    report = measure_startup(runs=1)
+    assert report.lazy_loaded == []
+    assert len(report.wall_ms) == 1
+    assert report.import_ms[0] > 0
+    assert "median" in str(report)
+
+
+def test_report_budget_and_lazy_checks():
+    report = StartupReport(wall_ms=[100, 300, 200], import_ms=[50] * 3, construct_ms=[5] * 3)
+    assert report.median_ms == 200
+    assert report.within(250)
+    assert not report.within(150)
+    report.lazy_loaded = [LAZY_MODULES[0]]
+    assert not report.within(250)
+    assert LAZY_MODULES[0] in str(report)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("budget, status", [("100000", 0), ("0.001", 1)])
+def test_main_exit_status_reflects_budget(budget, status, capsys):
+    assert main(["startup", "--runs", "1", "--budget-ms", budget]) == status
+    assert "Startup over 1 runs" in capsys.readouterr().out
+
+
+def test_suite_reports_every_metric_per_size(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = run_suite(sizes=[50, 200], samples=20)
+    assert results["meta"]["sizes"] == [50, 200]
+    for size in (50, 200):
+        metrics = {k.split("/")[0] for k in results["metrics"] if f"/{size}/" in k}
+        assert metrics == {"history_append", "evaluate", "undo", "redo",
+                           "save_csv", "load_csv", "save_binary", "load_binary"}
+        assert results["metrics"][f"evaluate/{size}/p50_us"] <= results["metrics"][f"evaluate/{size}/p99_us"]
+    assert list(tmp_path.iterdir()) == []  # everything written went to a temp dir
+
+
+def test_comparison_direction_tolerance_and_noise():
+    slower = Comparison("evaluate/1000/p50_us", 100.0, 150.0)
+    assert slower.change == pytest.approx(0.5)
+    assert slower.regressed(0.25) and not slower.regressed(0.6)
+    # throughput: lower is worse
+    assert Comparison("history_append/1000/rows_per_sec", 1000.0, 500.0).regressed(0.25)
+    assert not Comparison("history_append/1000/rows_per_sec", 1000.0, 2000.0).regressed(0.25)
+    # tail latency is informational; tiny absolute changes are noise
+    assert not Comparison("evaluate/1000/p99_us", 100.0, 500.0).regressed(0.25)
+    assert not Comparison("undo/1000/p50_us", 10.0, 20.0).regressed(0.25)
+
+
+def test_compare_skips_metrics_missing_from_baseline():
+    results = {"metrics": {"a/1/seconds": 1.0, "b/1/seconds": 2.0}}
+    baseline = {"metrics": {"a/1/seconds": 0.5}}
+    assert [c.metric for c in compare(results, baseline)] == ["a/1/seconds"]
+
+
+def _write_results(path, seconds):
+    path.write_text(json.dumps({"meta": {}, "metrics": {"save_csv/10/seconds": seconds}}))
+
+
+@pytest.mark.parametrize("baseline_seconds, status", [(1.0, 0), (0.01, 1)])
+def test_suite_command_compares_with_baseline(tmp_path, monkeypatch, baseline_seconds, status):
+    monkeypatch.setattr("app.calculator_benchmark.run_suite",
+                        lambda sizes, samples: {"meta": {}, "metrics": {"save_csv/10/seconds": 0.5}})
+    baseline = tmp_path / "baseline.json"
+    _write_results(baseline, baseline_seconds)
+    out = tmp_path / "results.json"
+    assert main(["suite", "--sizes", "10", "-o", str(out), "--baseline", str(baseline)]) == status
+    assert json.loads(out.read_text())["metrics"] == {"save_csv/10/seconds": 0.5}
+
+
+def test_suite_command_updates_baseline(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.calculator_benchmark.run_suite",
+                        lambda sizes, samples: {"meta": {}, "metrics": {"x/1/seconds": 1.0}})
+    baseline = tmp_path / "new" / "baseline.json"
+    assert main(["suite", "--sizes", "1e3", "--baseline", str(baseline), "--update-baseline"]) == 0
+    assert json.loads(baseline.read_text())["metrics"] == {"x/1/seconds": 1.0}
+    assert main(["suite", "--baseline", str(tmp_path / "missing.json")]) == 0
+
+
+@pytest.mark.slow
+def test_history_append_cost_does_not_grow_with_size():
+    def per_row(rows):
+        history = HistoryManager()
+        start = time.perf_counter()
+        for i in range(rows):
+            history.add("add", i, 1, i + 1, None, "2026-10-18T10:00:00")
+        return (time.perf_counter() - start) / rows
+
+    small = min(per_row(2_000) for _ in range(3))
+    large = min(per_row(40_000) for _ in range(3))
+    # a quadratic append (such as a concat per row) is ~20x slower per row here
+    assert large < small * 4
+
+
+def test_memory_report_shows_slots_and_columns_saving(capsys):
+    per_row = measure_memory(rows=5000)
+    assert per_row["calculation_slots"] < per_row["calculation_dataclass"]
+    assert per_row["history_frame"] < per_row["calculation_slots"]
+    assert main(["memory", "--rows", "500"]) == 0
+    assert "slots save" in capsys.readouterr().out
@@ -12,10 +12,43 @@ def clean_env(monkeypatch):
         "CALCULATOR_LOG_DIR",
         "CALCULATOR_HISTORY_DIR",
         "CALCULATOR_HISTORY_FILE",
+        "CALCULATOR_HISTORY_FORMAT",
+        "CALCULATOR_HISTORY_BACKEND",
+        "CALCULATOR_HISTORY_DB",
+        "CALCULATOR_SQLITE_BATCH_SIZE",
         "CALCULATOR_AUTO_SAVE",
         "CALCULATOR_AUTO_SAVE_PATH",
+        "CALCULATOR_AUTO_SAVE_MODE",
+        "CALCULATOR_AUTO_SAVE_COMPACT_EVERY",
+        "CALCULATOR_AUTO_SAVE_FLUSH_ROWS",
+        "CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS",
+        "CALCULATOR_AUTO_SAVE_FSYNC",
         "CALCULATOR_MAX_HISTORY_SIZE",
+        "CALCULATOR_HISTORY_ARCHIVE_DIR",
+        "CALCULATOR_ARCHIVE_SPILL_ROWS",
+        "CALCULATOR_ARCHIVE_FILE_ROWS",
+        "CALCULATOR_MAX_UNDO_DEPTH",
         "CALCULATOR_PRECISION",
+        "CALCULATOR_CACHE_SIZE",
+        "CALCULATOR_CACHE_TTL_SECONDS",
+        "CALCULATOR_EXPRESSION_CACHE_SIZE",
+        "CALCULATOR_BATCH_CHUNK_SIZE",
+        "CALCULATOR_WORKERS",
+        "CALCULATOR_SERVER_HOST",
+        "CALCULATOR_SERVER_PORT",
+        "CALCULATOR_SERVER_HISTORY",
+        "CALCULATOR_OBSERVER_DISPATCH",
+        "CALCULATOR_OBSERVER_QUEUE_SIZE",
+        "CALCULATOR_OBSERVER_BATCH_SIZE",
+        "CALCULATOR_OBSERVER_BACKPRESSURE",
+        "CALCULATOR_LOG_FORMAT",
+        "CALCULATOR_LOG_QUEUE",
+        "CALCULATOR_LOG_MAX_BYTES",
+        "CALCULATOR_LOG_BACKUP_COUNT",
+        "CALCULATOR_LOG_BATCH_SIZE",
+        "CALCULATOR_LOG_SAMPLE_EVERY",
+        "CALCULATOR_LOG_MAX_PER_SECOND",
+        "CALCULATOR_METRICS",
         "CALCULATOR_MAX_INPUT_VALUE",
         "CALCULATOR_DEFAULT_ENCODING",
         "HISTORY_PATH",
@@ -84,3 +117,80 @@ def test_load_config_creates_missing_directory(clean_env, tmp_path, monkeypatch)
     assert Path(config.CALCULATOR_LOG_DIR).exists()
     assert Path(config.CALCULATOR_HISTORY_DIR).exists()
     assert Path(config.CALCULATOR_AUTO_SAVE_PATH).parent.exists()
+
+
+def test_load_config_max_undo_depth(clean_env, monkeypatch):
+    assert load_config().CALCULATOR_MAX_UNDO_DEPTH == 100
+    monkeypatch.setenv("CALCULATOR_MAX_UNDO_DEPTH", "5")
+    assert load_config().CALCULATOR_MAX_UNDO_DEPTH == 5
+
+
+def test_load_config_auto_save_mode(clean_env, monkeypatch):
+    config = load_config()
+    assert config.CALCULATOR_AUTO_SAVE_MODE == "append"
+    assert config.CALCULATOR_AUTO_SAVE_COMPACT_EVERY == 1000
+    monkeypatch.setenv("CALCULATOR_AUTO_SAVE_MODE", "FULL")
+    monkeypatch.setenv("CALCULATOR_AUTO_SAVE_COMPACT_EVERY", "10")
+    config = load_config()
+    assert config.CALCULATOR_AUTO_SAVE_MODE == "full"
+    assert config.CALCULATOR_AUTO_SAVE_COMPACT_EVERY == 10
+
+
+def test_load_config_auto_save_flush_policy(clean_env, monkeypatch):
+    config = load_config()
+    assert config.CALCULATOR_AUTO_SAVE_FLUSH_ROWS == 1
+    assert config.CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS == 0
+    assert config.CALCULATOR_AUTO_SAVE_FSYNC is True
+    monkeypatch.setenv("CALCULATOR_AUTO_SAVE_FLUSH_ROWS", "500")
+    monkeypatch.setenv("CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS", "250")
+    monkeypatch.setenv("CALCULATOR_AUTO_SAVE_FSYNC", "false")
+    config = load_config()
+    assert config.CALCULATOR_AUTO_SAVE_FLUSH_ROWS == 500
+    assert config.CALCULATOR_AUTO_SAVE_FLUSH_INTERVAL_MS == 250
+    assert config.CALCULATOR_AUTO_SAVE_FSYNC is False
+
+
+def test_load_config_history_format(clean_env, monkeypatch):
+    assert load_config().CALCULATOR_HISTORY_FORMAT == "auto"
+    monkeypatch.setenv("CALCULATOR_HISTORY_FORMAT", "Binary")
+    assert load_config().CALCULATOR_HISTORY_FORMAT == "binary"
+
+
+def test_load_config_history_backend(clean_env, monkeypatch, tmp_path):
+    config = load_config()
+    assert config.CALCULATOR_HISTORY_BACKEND == "memory"
+    assert config.CALCULATOR_HISTORY_DB == str(Path("data") / "history.db")
+    assert config.CALCULATOR_SQLITE_BATCH_SIZE == 500
+    monkeypatch.setenv("CALCULATOR_HISTORY_BACKEND", "SQLite")
+    monkeypatch.setenv("CALCULATOR_HISTORY_DB", str(tmp_path / "h.db"))
+    monkeypatch.setenv("CALCULATOR_SQLITE_BATCH_SIZE", "50")
+    config = load_config()
+    assert config.CALCULATOR_HISTORY_BACKEND == "sqlite"
+    assert config.CALCULATOR_HISTORY_DB == str(tmp_path / "h.db")
+    assert config.CALCULATOR_SQLITE_BATCH_SIZE == 50
+
+
+def test_load_config_archive_settings(clean_env, monkeypatch, tmp_path):
+    config = load_config()
+    assert config.CALCULATOR_MAX_HISTORY_SIZE == 0
+    assert config.CALCULATOR_HISTORY_ARCHIVE_DIR == ""
+    assert config.CALCULATOR_ARCHIVE_SPILL_ROWS == 256
+    assert config.CALCULATOR_ARCHIVE_FILE_ROWS == 100000
+    monkeypatch.setenv("CALCULATOR_HISTORY_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setenv("CALCULATOR_ARCHIVE_SPILL_ROWS", "8")
+    monkeypatch.setenv("CALCULATOR_ARCHIVE_FILE_ROWS", "64")
+    config = load_config()
+    assert config.CALCULATOR_HISTORY_ARCHIVE_DIR == str(tmp_path)
+    assert config.CALCULATOR_ARCHIVE_SPILL_ROWS == 8
+    assert config.CALCULATOR_ARCHIVE_FILE_ROWS == 64
+
+
+def test_load_config_cache_settings(clean_env, monkeypatch):
+    config = load_config()
+    assert config.CALCULATOR_CACHE_SIZE == 1024
+    assert config.CALCULATOR_CACHE_TTL_SECONDS == 0
+    monkeypatch.setenv("CALCULATOR_CACHE_SIZE", "16")
+    monkeypatch.setenv("CALCULATOR_CACHE_TTL_SECONDS", "2.5")
+    config = load_config()
+    assert config.CALCULATOR_CACHE_SIZE == 16
+    assert config.CALCULATOR_CACHE_TTL_SECONDS == 2.5
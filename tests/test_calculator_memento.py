@@ -1,23 +1,14 @@
+import datetime
 import pytest
-import pandas as pd
-from app.calculator_memento import Memento, Caretaker
+from app.calculator_memento import Memento, AppendMemento, ReplaceMemento, Caretaker
+from app.history import HistoryManager
 
 
-# --- Tests for Memento ---
-
-def test_memento_stores_copy_not_reference():
-    """Ensure Memento stores a deep copy of the DataFrame."""
-    df = pd.DataFrame({"a": [1, 2, 3]})
-    m = Memento(df)
-    assert m.snapshot.equals(df)
-    assert m.snapshot is not df  # deep copy check
-
-    # modifying original should not affect snapshot
-    df.loc[0, "a"] = 99
-    assert m.snapshot.loc[0, "a"] == 1
+def _ts(seconds):
+    return (datetime.datetime(2026, 10, 18, 10) + datetime.timedelta(seconds=seconds)).isoformat()
 
 
-# --- Fixtures for Caretaker ---
+# --- Fixtures ---
 
 @pytest.fixture
 def caretaker():
@@ -25,25 +16,76 @@ def caretaker():
 
 
 @pytest.fixture
-def df():
-    return pd.DataFrame({"a": [1, 2], "b": [3, 4]})
+def history():
+    h = HistoryManager()
+    h.add("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    return h
+
+
+def _append(history, caretaker, a):
+    history.add("add", a, 1, a + 1, None, _ts(a))
+    caretaker.save(AppendMemento(1))
+
+
+# --- Tests for Memento ---
+
+def test_memento_base_is_abstract(history):
+    m = Memento()
+    with pytest.raises(NotImplementedError):
+        m.undo(history)
+    with pytest.raises(NotImplementedError):
+        m.redo(history)
+
+
+def test_append_memento_keeps_no_rows_until_undone(history):
+    m = AppendMemento(1)
+    assert m.rows == []
+    m.undo(history)
+    assert len(history) == 0
+    assert m.rows == [("add", 1.0, 2.0, 3.0, None, "2026-10-18T10:00:00")]
+    m.redo(history)
+    assert len(history) == 1
+    assert m.rows == []
+
+
+def test_replace_memento_shares_buffers(history):
+    before = history.state
+    history.clear()
+    m = ReplaceMemento(before, history.state)
+    m.undo(history)
+    assert history.state is before
+    assert len(history) == 1
+    m.redo(history)
+    assert len(history) == 0
 
 
 # --- Tests for Caretaker.save() ---
 
-def test_save_adds_memento_and_clears_redos(caretaker, df):
-    """save() adds a Memento and clears the redo stack."""
-    caretaker._redos.append(Memento(df))
-    caretaker.save(df)
+def test_save_adds_memento_and_clears_redos(caretaker):
+    caretaker._redos.append(AppendMemento())
+    caretaker.save(AppendMemento())
     assert len(caretaker._undos) == 1
     assert caretaker._redos == []
 
 
+def test_max_depth_drops_oldest():
+    c = Caretaker(max_depth=2)
+    first, second, third = AppendMemento(), AppendMemento(), AppendMemento()
+    for m in (first, second, third):
+        c.save(m)
+    assert list(c._undos) == [second, third]
+
+
+def test_max_depth_zero_means_unbounded():
+    c = Caretaker(max_depth=0)
+    assert c.max_depth is None
+
+
 # --- Tests for can_undo() / can_redo() ---
 
 def test_can_undo_with_memento():
     c = Caretaker()
-    c._undos.append(Memento(pd.DataFrame()))
+    c._undos.append(AppendMemento())
     assert c.can_undo() is True
 
 def test_can_undo_empty():
@@ -52,7 +94,7 @@ def test_can_undo_empty():
 
 def test_can_redo_with_memento():
     c = Caretaker()
-    c._redos.append(Memento(pd.DataFrame()))
+    c._redos.append(AppendMemento())
     assert c.can_redo() is True
 
 def test_can_redo_empty():
@@ -60,41 +102,43 @@ def test_can_redo_empty():
     assert c.can_redo() is False
 
 
-# --- Tests for undo() ---
-
-def test_undo_success(caretaker, df):
-    """undo() should restore last snapshot and move current_df to redos."""
-    caretaker.save(df)
-    df2 = pd.DataFrame({"a": [9], "b": [8]})
-    restored = caretaker.undo(df2)
-    assert isinstance(restored, pd.DataFrame)
-    assert restored.equals(df)
-    # The current df pushed to redos
-    assert len(caretaker._redos) == 1
-    assert caretaker._redos[0].snapshot.equals(df2)
-
-
-def test_undo_empty_raises(caretaker, df):
+# --- Tests for undo() / redo() ---
+
+def test_undo_redo_appends(caretaker, history):
+    _append(history, caretaker, 5)
+    _append(history, caretaker, 6)
+    caretaker.undo(history)
+    caretaker.undo(history)
+    assert len(history) == 1
+    assert len(caretaker._redos) == 2
+    caretaker.redo(history)
+    assert len(history) == 2
+    assert history.df.iloc[-1]["a"] == 5
+    caretaker.redo(history)
+    assert history.df["a"].tolist() == [1, 5, 6]
+
+
+def test_undo_clear_then_continue(caretaker, history):
+    _append(history, caretaker, 5)
+    before = history.state
+    history.clear()
+    caretaker.save(ReplaceMemento(before, history.state))
+    caretaker.undo(history)
+    assert history.df["a"].tolist() == [1, 5]
+    caretaker.undo(history)
+    assert history.df["a"].tolist() == [1]
+    caretaker.redo(history)
+    caretaker.redo(history)
+    assert history.df.empty
+
+
+def test_undo_empty_raises(caretaker, history):
     """undo() raises IndexError when no undos available."""
     with pytest.raises(IndexError, match="Nothing to undo"):
-        caretaker.undo(df)
-
-
-# --- Tests for redo() ---
-
-def test_redo_success(caretaker, df):
-    """redo() should restore last redo snapshot and move current_df to undos."""
-    caretaker._redos.append(Memento(df))
-    df2 = pd.DataFrame({"a": [99], "b": [88]})
-    restored = caretaker.redo(df2)
-    assert isinstance(restored, pd.DataFrame)
-    assert restored.equals(df)
-    # The current df pushed to undos
-    assert len(caretaker._undos) == 1
-    assert caretaker._undos[0].snapshot.equals(df2)
+        caretaker.undo(history)
 
 
-def test_redo_empty_raises(caretaker, df):
+def test_redo_empty_raises(caretaker, history):
     """redo() raises IndexError when no redos available."""
     with pytest.raises(IndexError, match="Nothing to redo"):
-        caretaker.redo(df)
+        caretaker.redo(history)
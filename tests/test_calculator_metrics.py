@@ -0,0 +1,77 @@
+import pytest
+from app.calculator_metrics import CalculatorMetrics, LatencyHistogram
+from app.history import AutoSaveObserver, HistoryManager, HistoryObserver
+
+
+def test_histogram_percentiles_are_close_upper_bounds():
+    hist = LatencyHistogram()
+    for us in range(1, 101):
+        hist.record(us * 1e-6)
+    s = hist.summary()
+    assert s["count"] == 100
+    assert s["mean_us"] == pytest.approx(50.5)
+    assert 50 <= s["p50_us"] <= 50 * 1.2
+    assert 99 <= s["p99_us"] <= 100
+    assert s["max_us"] == pytest.approx(100)
+
+
+def test_histogram_folds_buffered_samples_and_merges():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for _ in range(3000):  # crosses the bulk-bucketing threshold
+        a.record(1e-6)
+    b.record(1e-3)
+    assert a.count == 3000
+    a.merge(b)
+    s = a.summary()
+    assert s["count"] == 3001
+    assert s["p50_us"] == pytest.approx(1.0, rel=0.2)
+    assert s["max_us"] == pytest.approx(1000)
+
+
+def test_histogram_empty_and_tiny_values():
+    hist = LatencyHistogram()
+    assert hist.percentile(50) == 0.0
+    hist.record(0.0)
+    assert hist.percentile(99) == 0.0
+
+
+def test_metrics_snapshot_orders_stages_and_groups_operations():
+    metrics = CalculatorMetrics()
+    metrics.record("total", 2e-5, "add")
+    metrics.record("validate", 1e-6, "add")
+    metrics.record("custom", 1e-6)
+    snap = metrics.snapshot()
+    assert list(snap["stages"]) == ["validate", "total", "custom"]
+    assert list(snap["operations"]["add"]) == ["validate", "total"]
+    assert "add: 1 calls" in metrics.format()
+    metrics.reset()
+    assert metrics.snapshot() == {"stages": {}, "operations": {}}
+    assert metrics.format() == "(no calculations measured yet)"
+
+
+def test_nested_time_is_taken_once():
+    metrics = CalculatorMetrics()
+    metrics.record_nested("observers", 0.5)
+    metrics.record_nested("autosave", 0.25)
+    assert metrics.take_nested() == 0.75
+    assert metrics.take_nested() == 0.0
+
+
+def test_history_times_observers_and_autosave_separately(tmp_path):
+    class Quiet(HistoryObserver):
+        def update(self, event, payload):
+            pass
+
+    history = HistoryManager()
+    history.metrics = CalculatorMetrics()
+    history.attach(Quiet())
+    history.attach(Quiet())
+    autosave = AutoSaveObserver(history, str(tmp_path / "h.csv"))
+    history.attach(autosave)
+    history.add("add", 1, 2, 3)
+    autosave.close()
+    snap = history.metrics.snapshot()
+    # two plain observers are one fan-out sample
+    assert snap["stages"]["observers"]["count"] == 1
+    assert snap["stages"]["autosave"]["count"] == 1
+    assert set(snap["operations"]["add"]) == {"observers", "autosave"}
@@ -0,0 +1,84 @@
+import os
+import time
+import pytest
+from app.calculator_batch import chunked, evaluate_chunk, run_batch
+from app.calculator_parallel import WorkerCrashError, evaluate_parallel
+from app.history import HistoryManager
+
+
+# worker functions must be importable by the child processes
+
+def _slow_first(chunk):
+    if chunk[0] == 0:
+        time.sleep(0.3)
+    return list(chunk)
+
+
+def _crash_once(chunk):
+    marker, values = chunk
+    if values[0] == 3 and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return values
+
+
+def _always_crash(chunk):
+    os._exit(1)
+
+
+def _crash_on_two(chunk):
+    if chunk == [2]:
+        os._exit(1)
+    return chunk
+
+
+def _fail_in_workers(chunk):
+    if os.getpid() != chunk[0]:
+        raise RuntimeError("worker failure")
+    return chunk[1]
+
+
+def test_results_keep_input_order_when_a_chunk_is_slow():
+    chunks = [[i, i + 1] for i in range(0, 12, 2)]
+    assert list(evaluate_parallel(chunks, _slow_first, workers=3)) == chunks
+
+
+def test_crashed_worker_loses_no_rows(tmp_path):
+    marker = str(tmp_path / "crashed")
+    chunks = [(marker, [i]) for i in range(8)]
+    assert list(evaluate_parallel(chunks, _crash_once, workers=2)) == [[i] for i in range(8)]
+    assert os.path.exists(marker)
+
+
+def test_repeated_crash_raises():
+    with pytest.raises(WorkerCrashError):
+        list(evaluate_parallel([[1]], _always_crash, workers=1, retries=1))
+
+
+def test_crash_is_charged_to_the_chunk_that_caused_it():
+    chunks = [[i] for i in range(4)]
+    with pytest.raises(WorkerCrashError, match="Chunk 2 crashed its worker 2 times"):
+        list(evaluate_parallel(chunks, _crash_on_two, workers=2, retries=1))
+
+
+def test_failing_chunk_falls_back_to_this_process():
+    assert list(evaluate_parallel([(os.getpid(), "ok")], _fail_in_workers, workers=1, retries=1)) == ["ok"]
+
+
+def test_parallel_batch_matches_serial(tmp_path):
+    ops = ["+", "-", "*", "/", "power", "root", "%", "//", "percent", "abs", "nope"]
+    lines = ["operation,a,b"] + [f"{ops[i % len(ops)]},{i % 17 - 5},{i % 7 - 2}" for i in range(500)]
+    src = tmp_path / "jobs.csv"
+    src.write_text("\n".join(lines) + "\n")
+    serial, parallel = HistoryManager(), HistoryManager()
+    run_batch(src, tmp_path / "serial.csv", chunk_size=37, history=serial)
+    report = run_batch(src, tmp_path / "parallel.csv", chunk_size=37, history=parallel, workers=3)
+    assert report.rows == 500
+    assert (tmp_path / "parallel.csv").read_text() == (tmp_path / "serial.csv").read_text()
+    assert parallel.df[["operation", "a", "b", "error"]].equals(serial.df[["operation", "a", "b", "error"]])
+
+
+def test_evaluate_chunk_is_picklable_worker():
+    jobs = [("+", "1", "2")] * 5
+    results = list(evaluate_parallel(chunked(jobs, 2), evaluate_chunk, workers=2))
+    assert [len(rows) for rows, _ in results] == [2, 2, 1]
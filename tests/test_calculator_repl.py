@@ -1,6 +1,7 @@
 # tests/test_calculator_repl.py
+import pandas as pd
 import pytest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from app.calculator_repl import Calculator, repl
 from app.exceptions import CalculatorError
 
@@ -40,8 +41,8 @@ def test_error_recorded_in_history(calc):
     with pytest.raises(CalculatorError):
         calc.evaluate("/", "1", "0")  # divide by zero
     last_entry = calc.history.df.iloc[-1]
-    assert last_entry["result"] is None
-    assert last_entry["error"] is not None
+    assert pd.isna(last_entry["result"])
+    assert last_entry["error"] == "Cannot divide by zero"
 
 def test_auto_save_exception(calc):
     calc.config.CALCULATOR_AUTO_SAVE = True
@@ -55,6 +56,36 @@ def test_parse_operands_failure(calc):
     with pytest.raises(CalculatorError):
         calc.evaluate("+", "bad", "input")
 
+def test_history_records_canonical_operation(calc):
+    calc.evaluate("+", "1", "2")
+    calc.evaluate("add", "3", "4")
+    assert calc.history.df["operation"].tolist() == ["add", "add"]
+
+
+def test_evaluate_batch_mixed_operations(calc):
+    batch = calc.evaluate_batch(["+", "add", "/", "root", "bogus"],
+                                [2, 3, 1, -16, 1],
+                                [3, 4, 0, 2, 1])
+    assert batch.results[:2].tolist() == [5, 7]
+    assert batch.error_mask.tolist() == [False, False, True, True, True]
+    assert batch.errors[2] == "Cannot divide by zero"
+    assert batch.errors[3] == "Even root of negative number not supported"
+    assert batch.errors[4] == "Invalid operation: bogus"
+    assert calc.history.df.empty
+
+def test_evaluate_batch_single_token_and_columns(calc):
+    import pandas as pd
+    frame = pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": [2.0, 2.0, 2.0]})
+    batch = calc.evaluate_batch("*", frame["a"], frame["b"])
+    assert batch.results.tolist() == [2, 4, 6]
+    assert not batch.error_mask.any()
+
+def test_evaluate_batch_rejects_bad_operands(calc):
+    with pytest.raises(CalculatorError):
+        calc.evaluate_batch("+", ["x"], [1])
+    with pytest.raises(CalculatorError):
+        calc.evaluate_batch("+", [1, 2], [1])
+
 def test_repl_commands(monkeypatch):
     # Patch input and print to simulate user REPL input
     inputs = iter([
@@ -101,3 +132,264 @@ def test_repl_operation(monkeypatch, calc):
         repl()
         result_msgs = [msg for msg in outputs if "Result:" in msg[0]]
         assert any("Result: 5" in msg[0] for msg in result_msgs)
+
+def test_evaluate_expression_records_one_row(calc):
+    assert calc.evaluate_expression("(a + b) * c", a=1, b=2, c=4) == 12
+    calc.evaluate_expression("(a + b) * c", a=2, b=2, c=4)
+    df = calc.history.df
+    assert df["operation"].tolist() == ["(a + b) * c"] * 2
+    assert df["result"].tolist() == [12, 16]
+    assert calc.expressions.stats()["hits"] == 1
+    calc.undo()
+    assert len(calc.history) == 1
+
+
+def test_evaluate_expression_domain_error(calc):
+    with pytest.raises(CalculatorError, match="Cannot divide by zero"):
+        calc.evaluate_expression("1 / x", x=0)
+    assert calc.history.df.iloc[-1]["error"] == "Cannot divide by zero"
+
+
+def test_repl_expression(monkeypatch):
+    inputs = iter(["= x * 2 + 1", "4", "exit"])
+    outputs = []
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    monkeypatch.setattr("builtins.print", lambda *a, **k: outputs.append(a))
+    with patch("app.calculator_repl.Calculator.evaluate_expression", return_value=9.0) as evaluate:
+        repl()
+    evaluate.assert_called_once_with("x * 2 + 1", {"x": 4.0})
+    assert any("Result: 9.0" in msg[0] for msg in outputs if msg)
+
+
+def test_repl_expression_rejects_non_numeric_binding(monkeypatch):
+    inputs = iter(["= x * 2", "four", "exit"])
+    outputs = []
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    monkeypatch.setattr("builtins.print", lambda *a, **k: outputs.append(a))
+    with patch("app.calculator_repl.Calculator.evaluate_expression") as evaluate:
+        repl()
+    evaluate.assert_not_called()
+    assert any(msg and msg[0].startswith("Error: x must be numeric") for msg in outputs)
+
+
+def test_undo_restores_cleared_history(calc):
+    calc.evaluate("+", "1", "1")
+    calc.evaluate("*", "2", "3")
+    calc.clear_history()
+    calc.undo()
+    assert len(calc.history.df) == 2
+    calc.undo()
+    assert len(calc.history.df) == 1
+    calc.redo()
+    assert calc.history.df.iloc[-1]["result"] == 6
+
+def test_undo_error_row(calc):
+    with pytest.raises(CalculatorError):
+        calc.evaluate("/", "1", "0")
+    calc.undo()
+    assert calc.history.df.empty
+
+def test_close_flushes_autosave(calc):
+    calc.autosave = MagicMock()
+    calc.close()
+    calc.autosave.close.assert_called_once()
+
+def test_repl_eof_closes_calculator(monkeypatch):
+    def raise_eof(_):
+        raise EOFError
+    monkeypatch.setattr("builtins.input", raise_eof)
+    monkeypatch.setattr("builtins.print", lambda *a, **k: None)
+    with patch("app.calculator_repl.Calculator.close") as close:
+        repl()
+        close.assert_called_once()
+
+def test_sqlite_backend_selected_by_config(monkeypatch, tmp_path):
+    from app.history_sqlite import SQLiteHistoryManager
+    monkeypatch.setenv("CALCULATOR_HISTORY_BACKEND", "sqlite")
+    monkeypatch.setenv("CALCULATOR_HISTORY_DB", str(tmp_path / "calc.db"))
+    with patch("app.calculator_repl.LoggingObserver"):
+        c = Calculator()
+    assert isinstance(c.history, SQLiteHistoryManager)
+    c.evaluate("+", "2", "3")
+    c.clear_history()
+    c.undo()
+    assert c.history.df["result"].tolist() == [5]
+    c.close()
+
+def test_unknown_backend_rejected(monkeypatch):
+    monkeypatch.setenv("CALCULATOR_HISTORY_BACKEND", "redis")
+    with patch("app.calculator_repl.LoggingObserver"), pytest.raises(ValueError):
+        Calculator()
+
+def test_async_observer_dispatch_from_config(monkeypatch):
+    monkeypatch.setenv("CALCULATOR_OBSERVER_DISPATCH", "async")
+    monkeypatch.setenv("CALCULATOR_OBSERVER_BACKPRESSURE", "coalesce")
+    with patch("app.calculator_repl.LoggingObserver"):
+        calc = Calculator()
+    assert calc.history.dispatcher.policy == "coalesce"
+    observer = MagicMock()
+    calc.history.attach(observer)
+    calc.evaluate("+", "1", "2")
+    calc.close()
+    observer.update_batch.assert_called()
+
+def test_unknown_observer_dispatch_rejected(monkeypatch):
+    monkeypatch.setenv("CALCULATOR_OBSERVER_DISPATCH", "later")
+    with patch("app.calculator_repl.LoggingObserver"), pytest.raises(ValueError):
+        Calculator()
+
+def test_history_bounded_by_max_size(monkeypatch, tmp_path):
+    monkeypatch.setenv("CALCULATOR_MAX_HISTORY_SIZE", "2")
+    monkeypatch.setenv("CALCULATOR_HISTORY_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setenv("CALCULATOR_ARCHIVE_SPILL_ROWS", "1")
+    with patch("app.calculator_repl.LoggingObserver"):
+        c = Calculator()
+    for i in range(4):
+        c.evaluate("+", str(i), "0")
+    assert c.history.df["result"].tolist() == [2, 3]
+    assert c.history.full_history()["result"].tolist() == [0, 1, 2, 3]
+
+def test_history_unbounded_without_archive_by_default(monkeypatch):
+    with patch("app.calculator_repl.LoggingObserver"):
+        c = Calculator()
+    assert c.history.max_size is None
+    assert c.history.archive is None
+
+def test_evaluate_uses_result_cache(calc):
+    calc.evaluate("+", "2", "3")
+    calc.evaluate("add", "2", "3")
+    with pytest.raises(CalculatorError):
+        calc.evaluate("/", "1", "0")
+    with pytest.raises(CalculatorError):
+        calc.evaluate("/", "1", "0")
+    stats = calc.cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    # every evaluation is still recorded
+    assert len(calc.history.df) == 4
+    assert calc.history.df.iloc[-1]["error"] == "Cannot divide by zero"
+
+def test_cache_disabled(monkeypatch):
+    monkeypatch.setenv("CALCULATOR_CACHE_SIZE", "0")
+    with patch("app.calculator_repl.LoggingObserver"):
+        c = Calculator()
+    assert c.cache is None
+    assert c.cache_stats() is None
+    assert c.evaluate("*", "2", "3") == 6
+
+def test_repl_cache_command(monkeypatch):
+    inputs = iter(["cache", "exit"])
+    outputs = []
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    monkeypatch.setattr("builtins.print", lambda *a, **k: outputs.append(a))
+    with patch("app.calculator_repl.LoggingObserver"):
+        repl()
+    assert any("hits=0" in msg[0] for msg in outputs if msg)
+
+def test_evaluate_records_every_stage(calc):
+    calc.enable_metrics()
+    calc.evaluate("+", "1", "2")
+    with pytest.raises(CalculatorError):
+        calc.evaluate("/", "1", "0")
+    snap = calc.metrics_snapshot()
+    for stage in ("validate", "lookup", "perform", "caretaker", "history", "observers", "total"):
+        assert stage in snap["stages"]
+    assert snap["stages"]["total"]["count"] == 2
+    assert snap["operations"]["divide"]["perform"]["count"] == 1
+    # the timed path keeps the same history and undo behaviour
+    assert calc.history.df["error"].tolist()[-1] == "Cannot divide by zero"
+    calc.undo()
+    assert len(calc.history) == 1
+
+def test_metrics_can_be_switched_off(calc, monkeypatch):
+    calc.enable_metrics(False)
+    assert calc.metrics_snapshot() is None
+    assert calc.history.metrics is None
+    calc.evaluate("+", "1", "2")
+    calc.enable_metrics()
+    assert calc.metrics_snapshot()["stages"] == {}
+
+def test_metrics_off_unless_configured(monkeypatch):
+    monkeypatch.delenv("CALCULATOR_METRICS", raising=False)
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"):
+        assert Calculator().metrics is None
+        monkeypatch.setenv("CALCULATOR_METRICS", "true")
+        assert Calculator().metrics is not None
+
+def test_repl_stats_command(monkeypatch):
+    inputs = iter(["stats on", "+", "2", "3", "stats", "stats reset", "stats off", "stats", "stats on", "exit"])
+    outputs = []
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    monkeypatch.setattr("builtins.print", lambda *a, **k: outputs.append(a[0] if a else ""))
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"), \
+         patch("app.calculator_repl.Calculator.close"):
+        repl()
+    table = next(o for o in outputs if str(o).startswith("stage"))
+    assert "perform" in table and "add: 1 calls" in table
+    assert "Metrics reset." in outputs
+    assert "Metrics are off (use 'stats on')." in outputs
+    assert outputs[-2:] == ["Metrics on.", "Goodbye!"]
+
+def test_parse_query():
+    from app.calculator_repl import parse_query
+    assert parse_query(" op=+ status=error result=1..10 a=..5 b=2 since=2026-10-18 limit=3") == {
+        "operation": "+", "status": "error", "result": (1.0, 10.0), "a": (None, 5.0), "b": (2.0, 2.0),
+        "since": "2026-10-18", "limit": 3}
+    for bad in ("op", "color=red", "a=x..1"):
+        with pytest.raises(ValueError):
+            parse_query(bad)
+
+def test_calculator_query_accepts_aliases(calc):
+    calc.evaluate("+", "1", "2")
+    calc.evaluate("*", "2", "3")
+    with pytest.raises(CalculatorError):
+        calc.evaluate("/", "1", "0")
+    assert calc.query("+")["result"].tolist() == [3]
+    assert calc.query(status="error")["operation"].tolist() == ["divide"]
+    calc.evaluate_expression("x + 1", x=1)
+    assert len(calc.query("x + 1")) == 1
+
+def test_repl_query_command(monkeypatch):
+    inputs = iter(["+", "2", "3", "query op=add result=5", "query op=add result=6", "query color=red", "exit"])
+    outputs = []
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    monkeypatch.setattr("builtins.print", lambda *a, **k: outputs.append(a[0] if a else ""))
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"), \
+         patch("app.calculator_repl.Calculator.close"):
+        repl()
+    assert any("add" in str(o) and "5.0" in str(o) for o in outputs if str(o).lstrip().startswith("operation"))
+    assert "(no matching rows)" in outputs
+    assert "Error: Unknown query filter: color" in outputs
+
+
+def test_repl_summary_command(monkeypatch):
+    inputs = iter(["+", "2", "3", "/", "1", "0", "summary", "summary +", "summary power", "exit"])
+    outputs = []
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    monkeypatch.setattr("builtins.print", lambda *a, **k: outputs.append(a[0] if a else ""))
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"), \
+         patch("app.calculator_repl.Calculator.close"):
+        repl()
+    tables = [str(o) for o in outputs if str(o).startswith("operation")]
+    assert len(tables) == 2
+    assert "divide" in tables[0] and "(all)" in tables[0] and "50.0%" in tables[0]
+    assert "add" in tables[1] and "divide" not in tables[1]
+    assert "(no rows for that operation)" in outputs
+
+
+def test_repl_history_paging(monkeypatch):
+    inputs = iter(["history", "+", "2", "3", "*", "4", "5", "history", "history head 1", "history page 5",
+                   "history tail x", "exit"])
+    outputs = []
+    monkeypatch.setattr("builtins.input", lambda _: next(inputs))
+    monkeypatch.setattr("builtins.print", lambda *a, **k: outputs.append(a[0] if a else ""))
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"), \
+         patch("app.calculator_repl.Calculator.close"):
+        repl()
+    tables = [str(o) for o in outputs if str(o).lstrip().startswith("operation")]
+    assert "(history is empty)" in outputs
+    assert "add" in tables[0] and "multiply" in tables[0]
+    assert "multiply" not in tables[1]
+    assert any(str(o).startswith("(rows 1-1 of 2") for o in outputs)
+    assert "(no rows there; history has 2)" in outputs
+    assert "Error: Expected a positive number after tail" in outputs
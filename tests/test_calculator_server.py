@@ -0,0 +1,155 @@
+import asyncio
+import json
+import threading
+import pytest
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+from app.calculator_repl import Calculator
+from app.calculator_server import CalculatorClient, CalculatorServer
+from app.exceptions import CalculatorError
+
+
+@pytest.fixture
+def calculator():
+    with patch("app.calculator_repl.LoggingObserver"), patch("app.calculator_repl.AutoSaveObserver"):
+        calc = Calculator()
+        calc.history.clear()
+        yield calc
+
+
+def _run(calculator, history_mode, scenario):
+    async def main():
+        server = CalculatorServer(calculator, history_mode=history_mode, host="127.0.0.1", port=0)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.close()
+    with patch("app.calculator_repl.LoggingObserver"):
+        return asyncio.run(main())
+
+
+def test_handle_request_errors(calculator):
+    server = CalculatorServer(calculator, history_mode="shared")
+    assert server.handle_request(calculator, b"not json")["error"].startswith("Malformed request")
+    assert server.handle_request(calculator, {"id": 1, "op": "nope"})["error"] == "Unknown command: nope"
+    assert server.handle_request(calculator, {"id": 2, "operation": "+", "a": 1})["error"] == "Missing field: b"
+    response = server.handle_request(calculator, {"id": 3, "operation": "/", "a": 1, "b": 0})
+    assert response == {"id": 3, "ok": False, "error": "Cannot divide by zero"}
+    with pytest.raises(ValueError):
+        CalculatorServer(calculator, history_mode="global")
+
+
+def test_handle_request_summary(calculator):
+    server = CalculatorServer(calculator, history_mode="shared")
+    server.handle_request(calculator, {"operation": "+", "a": 2, "b": 3})
+    server.handle_request(calculator, {"operation": "/", "a": 1, "b": 0})
+    response = server.handle_request(calculator, {"op": "summary"})
+    assert response["summary"]["add"]["p50"] == 5
+    assert response["overall"]["error_rate"] == 0.5
+    assert server.handle_request(calculator, {"op": "summary", "operation": "/"})["summary"]["errors"] == 1
+
+
+def test_evaluate_expression_and_history(calculator):
+    async def scenario(server):
+        async with await CalculatorClient.connect(server.host, server.port) as client:
+            assert await client.evaluate("+", 2, 3) == 5
+            with pytest.raises(CalculatorError, match="Cannot divide by zero"):
+                await client.evaluate("/", 1, 0)
+            expr = await client.request("expression", expression="x * 2", bindings={"x": 4})
+            assert expr["result"] == 8
+            assert (await client.request("undo"))["ok"]
+            return await client.request("history")
+    history = _run(calculator, "shared", scenario)
+    rows = history["rows"]
+    assert [r["operation"] for r in rows] == ["add", "divide"]
+    assert rows[1]["result"] is None and rows[1]["error"] == "Cannot divide by zero"
+
+
+def test_session_histories_are_isolated(calculator):
+    async def scenario(server):
+        async with await CalculatorClient.connect(server.host, server.port) as first, \
+                await CalculatorClient.connect(server.host, server.port) as second:
+            await first.evaluate("+", 1, 1)
+            await second.evaluate("*", 2, 2)
+            await second.evaluate("*", 3, 3)
+            return (await first.request("history"))["rows"], (await second.request("history"))["rows"]
+    first, second = _run(calculator, "session", scenario)
+    assert len(first) == 1 and len(second) == 2
+    assert len(calculator.history) == 0
+
+
+def test_history_limit_and_non_finite_values(calculator):
+    server = CalculatorServer(calculator, history_mode="shared")
+    for a in (1, 2, 3):
+        server.handle_request(calculator, {"operation": "+", "a": a, "b": 0})
+    overflow = server.handle_request(calculator, {"id": 9, "operation": "*", "a": 1e308, "b": 10})
+    line = server._handle_lines(calculator, [b'{"op": "history", "limit": 2}'])
+    rows = json.loads(line)["rows"]
+    assert [r["a"] for r in rows] == [3, 1e308]
+    assert rows[1]["result"] == "inf"
+    assert json.loads(server._handle_lines(calculator, [b'{"operation": "*", "a": 1e308, "b": 10}']))["result"] == "inf"
+    assert overflow["result"] == float("inf")
+
+
+def test_session_histories_archive_evicted_rows(calculator, tmp_path):
+    calculator.config = replace(calculator.config, CALCULATOR_MAX_HISTORY_SIZE=2,
+                                CALCULATOR_HISTORY_ARCHIVE_DIR=str(tmp_path / "archive"))
+    session = calculator.session()
+    assert session.cache is calculator.cache and session.logging_observer is calculator.logging_observer
+    for a in range(5):
+        session.evaluate("+", str(a), "0")
+    assert session.history.df["a"].tolist() == [3, 4]
+    assert session.history.full_history()["a"].tolist() == [0, 1, 2, 3, 4]
+    session.history.close()
+    assert list((tmp_path / "archive" / "sessions").rglob("*.csv"))
+
+
+def test_pipelined_load(calculator):
+    clients, per_client = 20, 250
+
+    async def one_client(server, n):
+        async with await CalculatorClient.connect(server.host, server.port) as client:
+            requests = [{"id": i, "operation": "+", "a": n, "b": i} for i in range(per_client)]
+            return n, await client.pipeline(requests)
+
+    async def scenario(server):
+        return await asyncio.gather(*(one_client(server, n) for n in range(clients)))
+
+    for n, responses in _run(calculator, "shared", scenario):
+        assert [r["id"] for r in responses] == list(range(per_client))
+        assert [r["result"] for r in responses] == [n + i for i in range(per_client)]
+    assert len(calculator.history) == clients * per_client
+
+
+def test_save_runs_off_the_event_loop(calculator, tmp_path):
+    seen = {}
+
+    def record_thread(path=None):
+        seen["thread"] = threading.current_thread().name
+        seen["path"] = path
+
+    async def scenario(server):
+        async with await CalculatorClient.connect(server.host, server.port) as client:
+            return await client.request("save", path="h.csv")
+
+    with patch.object(calculator, "save", side_effect=record_thread):
+        assert _run(calculator, "shared", scenario)["ok"]
+    assert seen["thread"].startswith("calculator")
+    assert Path(seen["path"]) == (Path(calculator.config.CALCULATOR_HISTORY_DIR) / "h.csv").resolve()
+
+
+def test_save_and_load_refuse_paths_outside_history_dir(calculator, tmp_path):
+    server = CalculatorServer(calculator, history_mode="shared")
+    outside = tmp_path / "outside.csv"
+    outside.write_text("operation,a,b,result,error,timestamp\n")
+    with patch.object(calculator, "save") as save, patch.object(calculator, "load") as load:
+        for op, path in (("save", "../../etc/passwd"), ("load", str(outside)), ("load", "sub/../../x.csv")):
+            response = server.handle_request(calculator, {"id": 1, "op": op, "path": path})
+            assert response["ok"] is False
+            assert response["error"].startswith("Path outside the history directory")
+        save.assert_not_called()
+        load.assert_not_called()
+        assert server.handle_request(calculator, {"id": 2, "op": "save"})["ok"]
+        save.assert_called_once_with(None)
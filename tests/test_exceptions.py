@@ -1,10 +1,10 @@
 import pytest
-from app.exceptions import CalculatorError, InvalidOperationError, OperandError
+from app.exceptions import CalculatorError, InvalidOperationError, OperandError, ExpressionError
 
 
 # --- Basic Inheritance Tests ---
 
-@pytest.mark.parametrize("exc_class", [InvalidOperationError, OperandError])
+@pytest.mark.parametrize("exc_class", [InvalidOperationError, OperandError, ExpressionError])
 def test_exception_inherits_from_calculatorerror(exc_class):
     """Test that custom exceptions inherit from CalculatorError."""
     exc = exc_class("message")
@@ -0,0 +1,91 @@
+import math
+import numpy as np
+import pytest
+from app.expression import ExpressionCompiler, compile_expression, CONST, APPLY
+from app.exceptions import ExpressionError
+
+
+@pytest.mark.parametrize("source,expected", [
+    ("1 + 2 * 3", 7),
+    ("(1 + 2) * 3", 9),
+    ("2 ** 3 ** 2", 512),
+    ("-2 ** 2", -4),
+    ("10 - 4 - 3", 3),
+    ("7 // 2 + 7 % 2", 4),
+    ("root(27, 3) + abs(2, 5)", 6),
+    ("percent(50, 200)", 25),
+    ("1.5e1 / .5", 30),
+])
+def test_constant_expressions(source, expected):
+    assert compile_expression(source).evaluate() == pytest.approx(expected)
+
+
+def test_constant_subexpressions_are_folded():
+    compiled = compile_expression("(1 + 2) * x")
+    assert compiled.program[0] == (CONST, 3.0)
+    assert [code for code, _ in compiled.program].count(APPLY) == 1
+
+
+def test_variables_and_bindings():
+    compiled = compile_expression("(a + b) * c ** 0.5 % d")
+    assert compiled.variables == ("a", "b", "c", "d")
+    assert compiled.evaluate(a=1, b=2, c=16, d=5) == pytest.approx(2)
+    assert compiled.evaluate({"a": 1, "b": 2}, c=16, d=5) == pytest.approx(2)
+
+
+def test_missing_binding_raises():
+    with pytest.raises(ExpressionError, match="Missing value for: y"):
+        compile_expression("x + y").evaluate(x=1)
+
+
+@pytest.mark.parametrize("source", ["", "1 +", "(1 + 2", "1 2", "sqrt(4, 2)", "root(4)", "1 $ 2"])
+def test_syntax_errors(source):
+    with pytest.raises(ExpressionError):
+        compile_expression(source)
+
+
+def test_domain_error_raises_at_evaluation():
+    compiled = compile_expression("1 / (x - 1)")
+    with pytest.raises(ZeroDivisionError, match="Cannot divide by zero"):
+        compiled.evaluate(x=1)
+
+
+def test_evaluate_array_matches_scalar():
+    compiled = compile_expression("(a + b) * c ** 0.5 % d")
+    rng = np.random.default_rng(0)
+    a, b = rng.uniform(-10, 10, 50), rng.uniform(-10, 10, 50)
+    c, d = rng.uniform(0, 100, 50), rng.uniform(1, 10, 50)
+    values, errors = compiled.evaluate_array({"a": a, "b": b, "c": c, "d": d})
+    assert errors == {}
+    for i in range(50):
+        assert values[i] == pytest.approx(compiled.evaluate(a=a[i], b=b[i], c=c[i], d=d[i]))
+
+
+def test_evaluate_array_reports_first_error_per_row():
+    compiled = compile_expression("root(1 / x, 2)")
+    values, errors = compiled.evaluate_array({"x": np.array([0.0, -4.0, 4.0])})
+    assert errors["Cannot divide by zero"].tolist() == [True, False, False]
+    assert errors["Even root of negative number not supported"].tolist() == [False, True, False]
+    assert math.isnan(values[0]) and math.isnan(values[1])
+    assert values[2] == pytest.approx(0.5)
+
+
+def test_evaluate_array_broadcasts_scalars():
+    values, errors = compile_expression("x * k").evaluate_array({"x": [1, 2, 3], "k": 2})
+    assert values.tolist() == [2, 4, 6]
+
+
+def test_compiler_lru_cache():
+    compiler = ExpressionCompiler(capacity=2)
+    first = compiler.compile("x + 1")
+    assert compiler.compile(" x + 1 ") is first
+    compiler.compile("x + 2")
+    compiler.compile("x + 3")
+    assert compiler.compile("x + 1") is not first
+    assert compiler.stats() == {"size": 2, "capacity": 2, "hits": 1, "misses": 4}
+
+
+def test_compiler_capacity_zero_disables_cache():
+    compiler = ExpressionCompiler(capacity=0)
+    compiler.compile("1 + 1")
+    assert len(compiler) == 0
@@ -1,10 +1,15 @@
 # tests/test_history_full.py
+import datetime
 import pytest
 import pandas as pd
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 from app.history import HistoryManager, HistoryObserver, LoggingObserver, AutoSaveObserver
 
+
+def _ts(seconds):
+    return (datetime.datetime(2026, 10, 18, 10) + datetime.timedelta(seconds=seconds)).isoformat()
+
 def test_attach_detach_observer():
     history = HistoryManager()
     class DummyObserver(HistoryObserver):
@@ -132,3 +137,237 @@ def test_autosave_observer(monkeypatch, tmp_path):
     auto2 = AutoSaveObserver(history, str(path2))
     auto2.update("cleared", {"key": "val"})
     assert not path2.exists()
+
+def test_add_keeps_rows_with_unparseable_timestamps():
+    history = HistoryManager()
+    history.add("add", 1, 2, 3, None, "yesterday")
+    history.add("add", 2, 2, 4, None, "2026-10-18T10:00:00")
+    assert history.df["timestamp"].isna().tolist() == [True, False]
+    assert history.query(since="2026-10-18")["a"].tolist() == [2]
+
+def test_df_is_cached_until_next_mutation():
+    history = HistoryManager()
+    history.add("add", 1, 2, 3, None, "time")
+    first = history.df
+    assert history.df is first
+    history.add("add", 2, 2, 4, None, "time")
+    assert history.df is not first
+    assert len(history.df) == 2
+    assert len(history) == 2
+
+def test_df_setter_replaces_rows():
+    history = HistoryManager()
+    history.add("add", 1, 2, 3, None, "time")
+    history.df = pd.DataFrame([{"operation": "multiply", "a": 2, "b": 3, "result": 6, "error": None, "timestamp": "t"}])
+    assert len(history) == 1
+    assert history.df.iloc[0]["operation"] == "multiply"
+
+def test_add_many_rows_is_linear():
+    history = HistoryManager()
+    for i in range(20000):
+        history.add("add", i, 1, i + 1, None, "time")
+    assert len(history.df) == 20000
+    assert history.df.iloc[-1]["result"] == 20000
+
+def test_autosave_append_mode_appends_rows(tmp_path):
+    history = HistoryManager()
+    path = tmp_path / "auto.csv"
+    auto = AutoSaveObserver(history, str(path))
+    history.attach(auto)
+    history.add("add", 1, 2, 3, None, "t0")
+    with patch.object(history.df, "to_csv", side_effect=AssertionError("full rewrite")):
+        history.add("divide", 1, 0, None, "Cannot divide by zero", "t1")
+    auto.close()
+    lines = path.read_text().splitlines()
+    assert lines[0] == "operation,a,b,result,error,timestamp"
+    assert len(lines) == 3
+    # "t1" is not a timestamp: the row is kept, with an empty one
+    assert lines[2] == "divide,1,0,,Cannot divide by zero,"
+    loaded = HistoryManager()
+    loaded.load(str(path))
+    assert loaded.df["operation"].tolist() == ["add", "divide"]
+
+def test_autosave_compacts_after_clear_and_periodically(tmp_path):
+    history = HistoryManager()
+    path = tmp_path / "auto.csv"
+    auto = AutoSaveObserver(history, str(path), compact_every=2)
+    history.attach(auto)
+    for i in range(3):
+        history.add("add", i, 1, i + 1, None, f"t{i}")
+    with patch.object(auto, "compact", wraps=auto.compact) as compact:
+        history.add("add", 3, 1, 4, None, "t3")
+        history.clear()
+        history.add("add", 9, 1, 10, None, "t9")
+        assert compact.call_count == 2
+    auto.close()
+    assert len(path.read_text().splitlines()) == 2
+
+def test_autosave_compaction_keeps_rows_evicted_from_memory(tmp_path):
+    history = HistoryManager(max_size=3)
+    path = tmp_path / "auto.csv"
+    auto = AutoSaveObserver(history, str(path), compact_every=2)
+    history.attach(auto)
+    for i in range(6):
+        history.add("add", i, 1, i + 1, None, _ts(i))
+    auto.close()
+    assert len(history) == 3
+    assert len(path.read_text().splitlines()) == 7
+
+def test_autosave_full_mode_rewrites(tmp_path):
+    history = HistoryManager()
+    path = tmp_path / "auto.csv"
+    auto = AutoSaveObserver(history, str(path), mode="full")
+    history.attach(auto)
+    with patch.object(auto, "compact") as compact:
+        history.add("add", 1, 2, 3, None, "t0")
+        history.add("add", 1, 2, 3, None, "t1")
+        assert compact.call_count == 2
+
+def test_autosave_invalid_mode():
+    with pytest.raises(ValueError):
+        AutoSaveObserver(HistoryManager(), "x.csv", mode="sometimes")
+
+def _primed_autosave(tmp_path, compact=True, **kwargs):
+    history = HistoryManager()
+    path = tmp_path / "auto.csv"
+    auto = AutoSaveObserver(history, str(path), **kwargs)
+    history.attach(auto)
+    if compact:
+        history.add("add", 0, 0, 0, None, "t0")  # first add compacts
+    else:
+        auto._needs_compact = False  # append to the file as found
+    return history, auto, path
+
+def test_load_does_not_modify_file_without_trailing_newline(tmp_path):
+    path = tmp_path / "other_tool.csv"
+    text = "operation,a,b,result,error,timestamp\nadd,1,2,3,,2026-10-18T10:00:00\nadd,4,5,9,,2026-10-18T10:00:01"
+    path.write_text(text)
+    history = HistoryManager()
+    history.load(str(path))
+    assert history.df["a"].tolist() == [1, 4]
+    assert path.read_text() == text
+
+def test_autosave_keeps_complete_row_missing_newline(tmp_path):
+    path = tmp_path / "auto.csv"
+    path.write_text("operation,a,b,result,error,timestamp\nadd,1,2,3,,2026-10-18T10:00:00")
+    history, auto, _ = _primed_autosave(tmp_path, compact=False)
+    history.add("add", 4, 5, 9, None, "2026-10-18T10:00:01")
+    auto.close()
+    assert path.read_text().splitlines()[1:] == ["add,1,2,3,,2026-10-18T10:00:00", "add,4,5,9,,2026-10-18T10:00:01"]
+
+def test_autosave_truncates_torn_row(tmp_path):
+    path = tmp_path / "auto.csv"
+    path.write_text("operation,a,b,result,error,timestamp\nadd,1,2,3,,2026-10-18T10:00:00\nadd,4,5")
+    history, auto, _ = _primed_autosave(tmp_path, compact=False)
+    history.add("add", 6, 1, 7, None, "2026-10-18T10:00:02")
+    auto.close()
+    assert path.read_text().splitlines()[1:] == ["add,1,2,3,,2026-10-18T10:00:00", "add,6,1,7,,2026-10-18T10:00:02"]
+
+def test_recover_torn_tail_edge_cases(tmp_path):
+    from app.history import recover_torn_tail
+    assert recover_torn_tail(tmp_path / "missing.csv") is False
+    empty = tmp_path / "empty.csv"
+    empty.write_text("")
+    assert recover_torn_tail(empty) is False
+    partial = tmp_path / "partial.csv"
+    partial.write_text("operation,a,b")
+    assert recover_torn_tail(partial) is True
+    assert partial.read_text() == ""
+
+
+def test_autosave_flushes_every_n_rows(tmp_path):
+    history, auto, path = _primed_autosave(tmp_path, flush_rows=3, fsync=False)
+    history.add("add", 1, 1, 2, None, "t1")
+    history.add("add", 2, 1, 3, None, "t2")
+    assert len(path.read_text().splitlines()) == 2
+    history.add("add", 3, 1, 4, None, "t3")
+    assert len(path.read_text().splitlines()) == 5
+    auto.close()
+
+def test_autosave_timer_flushes(tmp_path):
+    import time
+    history, auto, path = _primed_autosave(tmp_path, flush_rows=0, flush_interval_ms=20)
+    history.add("add", 1, 1, 2, None, "t1")
+    deadline = time.time() + 2
+    while len(path.read_text().splitlines()) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(path.read_text().splitlines()) == 3
+    auto.close()
+    assert not auto._timer.is_alive()
+
+def test_autosave_close_flushes_pending(tmp_path):
+    history, auto, path = _primed_autosave(tmp_path, flush_rows=100)
+    history.add("add", 1, 1, 2, None, "t1")
+    assert len(path.read_text().splitlines()) == 2
+    auto.close()
+    assert len(path.read_text().splitlines()) == 3
+
+def test_autosave_clear_discards_pending(tmp_path):
+    history, auto, path = _primed_autosave(tmp_path, flush_rows=100)
+    history.add("add", 1, 1, 2, None, "t1")
+    history.clear()
+    auto.close()
+    assert len(path.read_text().splitlines()) == 2
+
+def test_add_many_appends_and_notifies_once():
+    history = HistoryManager()
+    history.add("add", 0, 0, 0, None, "2026-10-18T10:00:00")
+    events = []
+
+    class DummyObserver(HistoryObserver):
+        def update(self, event, payload):
+            events.append((event, payload))
+
+    history.attach(DummyObserver())
+    rows = [("add", i, 1, i + 1, None, _ts(i)) for i in range(1, 4)] + [("divide", 1, 0, None, "boom", _ts(4))]
+    assert history.add_many(iter(rows)) == 4
+    assert history.add_many([]) == 0
+    assert history.df["a"].tolist() == [0, 1, 2, 3, 1]
+    assert history.summary("divide")["errors"] == 1
+    assert [e for e, _ in events] == ["added_batch"]
+    payload = events[0][1]
+    assert payload["seq"] == 5
+    assert [r["seq"] for r in payload["rows"]] == [2, 3, 4, 5]
+    assert payload["rows"][-1] == {"operation": "divide", "a": 1, "b": 0, "result": None, "error": "boom",
+                                   "timestamp": "2026-10-18T10:00:04", "seq": 5}
+
+def test_logging_observer_logs_batch_summary(tmp_path):
+    log_obs = LoggingObserver(str(tmp_path / "batch.log"))
+    rows = [{"operation": "add", "error": None}, {"operation": "add", "error": None},
+            {"operation": "divide", "error": "boom"}]
+    with patch.object(log_obs.logger, "info") as info:
+        log_obs.update("added_batch", {"rows": rows, "seq": 3})
+    info.assert_called_once()
+    assert info.call_args.kwargs["extra"]["payload"] == {
+        "count": 3, "errors": 1, "operations": {"add": 2, "divide": 1}, "seq": 3}
+
+def test_autosave_appends_batch_in_one_write(tmp_path):
+    history, auto, path = _primed_autosave(tmp_path, flush_rows=2)
+    with patch.object(auto, "flush", wraps=auto.flush) as flush:
+        history.add_many([("add", i, 1, i + 1, None, _ts(i)) for i in range(1, 6)])
+        assert flush.call_count == 1
+    assert len(path.read_text().splitlines()) == 7
+    auto.close()
+
+def test_autosave_compacts_when_batch_crosses_threshold(tmp_path):
+    history, auto, path = _primed_autosave(tmp_path, compact_every=3)
+    history.add("add", 1, 1, 2, None, _ts(1))
+    with patch.object(auto, "compact", wraps=auto.compact) as compact:
+        history.add_many([("add", i, 1, i + 1, None, _ts(i)) for i in range(2, 5)])
+        assert compact.call_count == 1
+    auto.close()
+    assert len(path.read_text().splitlines()) == 6
+
+def test_autosave_round_trips_nanosecond_timestamps(tmp_path):
+    history, auto, path = _primed_autosave(tmp_path, compact_every=3)
+    base = 1_792_296_000_123_456_789  # 2026-10-18T04:00:00.123456789
+    for i in range(5):  # appended rows, then a rewrite, then more appended rows
+        history.add("add", i, 1, i + 1, None, base + i * 1_000_001)
+    auto.close()
+    stamps = [line.rsplit(",", 1)[1] for line in path.read_text().splitlines()[1:]]
+    assert stamps[1] == "2026-10-18T04:00:00.123456789"
+    assert all("T" in s for s in stamps[1:])  # stamps[0] is the primer's placeholder
+    loaded = HistoryManager()
+    loaded.load(str(path))
+    expected = history.df["timestamp"].to_numpy().view("int64")
+    assert loaded.df["timestamp"].to_numpy().view("int64").tolist() == expected.tolist()
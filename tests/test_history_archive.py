@@ -0,0 +1,107 @@
+import datetime
+import pytest
+from unittest.mock import patch
+from app.history import HistoryManager
+from app.history_archive import HistoryArchive
+from app.calculator_memento import Caretaker, AppendMemento
+
+
+def _ts(seconds):
+    return (datetime.datetime(2026, 10, 18, 10) + datetime.timedelta(seconds=seconds)).isoformat()
+
+
+def _add(history, n, start=0):
+    for i in range(start, start + n):
+        history.add("add", i, 1, i + 1, None, _ts(i))
+
+
+def test_eviction_spills_in_bulk(tmp_path):
+    archive = HistoryArchive(str(tmp_path / "archive"), spill_rows=3)
+    history = HistoryManager(max_size=4, archive=archive)
+    _add(history, 6)
+    assert len(history) == 4
+    assert archive.files() == []  # two rows staged, below the spill size
+    _add(history, 1, start=6)
+    assert len(archive.files()) == 1
+    assert history.df["a"].tolist() == [3, 4, 5, 6]
+    assert history.full_history()["a"].tolist() == list(range(7))
+
+
+def test_archive_rotates_files(tmp_path):
+    archive = HistoryArchive(str(tmp_path), spill_rows=1, rows_per_file=2)
+    history = HistoryManager(max_size=1, archive=archive)
+    _add(history, 6)
+    assert [p.name for p in archive.files()] == [
+        "history-archive-00001.csv", "history-archive-00002.csv", "history-archive-00003.csv"]
+    assert archive.to_frame()["a"].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_archive_resumes_existing_files(tmp_path):
+    HistoryArchive(str(tmp_path), spill_rows=1, rows_per_file=3)
+    first = HistoryArchive(str(tmp_path), spill_rows=1, rows_per_file=3)
+    first.stage(("add", 1.0, 1.0, 2.0, None, "2026-10-18T10:00:00"))
+    second = HistoryArchive(str(tmp_path), spill_rows=1, rows_per_file=3)
+    for _ in range(3):
+        second.stage(("add", 2.0, 1.0, 3.0, None, "2026-10-18T10:00:00"))
+    assert len(second.files()) == 2
+    assert len(second.to_frame()) == 4
+
+
+def test_close_flushes_staged_rows(tmp_path):
+    archive = HistoryArchive(str(tmp_path), spill_rows=100)
+    history = HistoryManager(max_size=2, archive=archive)
+    _add(history, 3)
+    assert archive.files() == []
+    assert len(history.full_history()) == 3
+    history.close()
+    assert len(archive.files()) == 1
+
+
+def test_staged_rows_flushed_at_exit(tmp_path):
+    with patch("app.history_archive.atexit.register") as register:
+        archive = HistoryArchive(str(tmp_path), spill_rows=100)
+    register.assert_called_once_with(archive.flush)
+    history = HistoryManager(max_size=2, archive=archive)
+    _add(history, 3)
+    assert archive.files() == []
+    register.call_args.args[0]()  # what the interpreter runs at exit, without close()
+    assert len(archive.files()) == 1
+    assert len(archive.to_frame()) == 1
+
+
+def test_memory_stays_bounded_without_archive():
+    history = HistoryManager(max_size=10)
+    _add(history, 1000)
+    assert len(history) == 10
+    assert history.state.capacity == 10
+    assert history.full_history()["a"].tolist() == list(range(990, 1000))
+
+
+def test_load_and_setter_trim_to_max_size(tmp_path):
+    source = HistoryManager()
+    _add(source, 5)
+    path = tmp_path / "h.csv"
+    source.save(str(path))
+    history = HistoryManager(max_size=3)
+    history.load(str(path))
+    assert history.df["a"].tolist() == [2, 3, 4]
+    history.df = source.df
+    assert len(history) == 3
+
+
+def test_undo_after_eviction_only_reaches_live_rows(tmp_path):
+    archive = HistoryArchive(str(tmp_path), spill_rows=1)
+    history = HistoryManager(max_size=2, archive=archive)
+    caretaker = Caretaker()
+    for i in range(4):
+        history.add("add", i, 1, i + 1, None, _ts(i))
+        caretaker.save(AppendMemento(1))
+    for _ in range(3):
+        caretaker.undo(history)
+    assert history.df.empty
+    assert archive.to_frame()["a"].tolist() == [0, 1]
+    for _ in range(3):
+        caretaker.redo(history)
+    assert history.df["a"].tolist() == [2, 3]
+    # redo never duplicates archived rows
+    assert history.full_history()["a"].tolist() == [0, 1, 2, 3]
@@ -0,0 +1,125 @@
+import pandas as pd
+import numpy as np
+import pytest
+from app.history import HistoryManager, AutoSaveObserver
+from app.history_binary import write_history, read_history, is_binary_path
+
+
+@pytest.fixture
+def history():
+    h = HistoryManager()
+    h.add("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    h.add("divide", 1, 0, None, "Cannot divide by zero", "2026-10-18T10:00:01")
+    h.add("multiply", 2, 3, 6, None, None)
+    return h
+
+
+def test_is_binary_path():
+    assert is_binary_path("data/history.hbin")
+    assert not is_binary_path("data/history.csv")
+
+
+def test_round_trip(tmp_path, history):
+    path = tmp_path / "history.hbin"
+    history.save(str(path))
+    loaded = HistoryManager()
+    loaded.load(str(path))
+    assert len(loaded) == 3
+    for i in range(3):
+        assert loaded.state.row(i) == history.state.row(i)
+    assert loaded.df["operation"].tolist() == ["add", "divide", "multiply"]
+    assert pd.isna(loaded.df.iloc[1]["result"])
+
+
+def test_load_memory_maps_columns(tmp_path, history):
+    path = tmp_path / "history.hbin"
+    write_history(history.state, path)
+    buf = read_history(path)
+    cols = buf.columns()
+    assert isinstance(cols["a"], np.memmap)
+    assert not cols["a"].flags.writeable
+
+
+def test_mutating_loaded_history_copies_on_write(tmp_path, history):
+    path = tmp_path / "history.hbin"
+    history.save(str(path))
+    loaded = HistoryManager()
+    loaded.load(str(path))
+    loaded.add("subtract", 5, 1, 4, None, "2026-10-18T10:00:00")
+    assert len(loaded) == 4
+    assert loaded.state.row(-1) == ("subtract", 5.0, 1.0, 4.0, None, "2026-10-18T10:00:00")
+    assert loaded.pop(2)[0][0] == "multiply"
+    # the file itself is untouched
+    assert len(read_history(path)) == 3
+
+
+def test_save_over_mapped_file(tmp_path, history):
+    path = tmp_path / "history.hbin"
+    history.save(str(path))
+    loaded = HistoryManager()
+    loaded.load(str(path))
+    loaded.add("subtract", 5, 1, 4, None, "2026-10-18T10:00:00")
+    loaded.save(str(path))
+    assert len(read_history(path)) == 4
+
+
+def test_empty_history(tmp_path):
+    path = tmp_path / "empty.hbin"
+    HistoryManager().save(str(path))
+    loaded = HistoryManager()
+    loaded.load(str(path))
+    assert loaded.df.empty
+    loaded.add("add", 1, 1, 2, None, "2026-10-18T10:00:00")
+    assert len(loaded) == 1
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "bogus.hbin"
+    path.write_bytes(b"not a history file at all")
+    with pytest.raises(ValueError, match="Not a binary history file"):
+        read_history(path)
+
+
+def test_format_override(tmp_path, history):
+    path = tmp_path / "history.dat"
+    history.file_format = "binary"
+    history.save(str(path))
+    assert path.read_bytes().startswith(b"CALCHIST")
+    loaded = HistoryManager(file_format="binary")
+    loaded.load(str(path))
+    assert len(loaded) == 3
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError):
+        HistoryManager(file_format="xml")
+
+
+def test_autosave_to_binary_path(tmp_path):
+    h = HistoryManager()
+    path = tmp_path / "auto.hbin"
+    auto = AutoSaveObserver(h, str(path))
+    h.attach(auto)
+    h.add("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    h.add("add", 2, 2, 4, None, "2026-10-18T10:00:01")
+    auto.close()
+    assert auto.mode == "full"
+    assert len(read_history(path)) == 2
+
+
+def test_autosave_follows_binary_format_on_csv_path(tmp_path):
+    # CALCULATOR_HISTORY_FORMAT=binary with the default "history.csv" paths
+    path = tmp_path / "history.csv"
+    h = HistoryManager(csv_path=str(path), file_format="binary")
+    auto = AutoSaveObserver(h, str(path))
+    h.attach(auto)
+    h.add("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    h.save()
+    h.add("add", 2, 2, 4, None, "2026-10-18T10:00:01")
+    auto._pending.append({"operation": "add"})
+    auto.flush()
+    auto.close()
+    assert auto.mode == "full"
+    loaded = HistoryManager(file_format="binary")
+    loaded.load(str(path))
+    assert loaded.df["a"].tolist() == [1, 2]
@@ -0,0 +1,137 @@
+import datetime
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from app.history_buffer import (HistoryBuffer, HISTORY_COLUMNS, HISTORY_SCHEMA, NAT, decode_timestamp,
+                                empty_frame, encode_timestamp, format_timestamps, typed_frame)
+
+
+def _ts(seconds):
+    return (datetime.datetime(2026, 10, 18, 10) + datetime.timedelta(seconds=seconds)).isoformat()
+
+
+def test_append_grows_capacity():
+    buf = HistoryBuffer(capacity=2)
+    for i in range(5):
+        buf.append("add", i, 1, i + 1, None, _ts(i))
+    assert len(buf) == 5
+    assert buf.capacity >= 5
+    assert buf.row(-1) == ("add", 4.0, 1.0, 5.0, None, "2026-10-18T10:00:04")
+
+
+def test_row_out_of_range():
+    buf = HistoryBuffer()
+    with pytest.raises(IndexError):
+        buf.row(0)
+
+
+def test_to_frame_preserves_none_for_failed_rows():
+    buf = HistoryBuffer()
+    buf.append("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    buf.append("/", 1, 0, None, "Cannot divide by zero", "2026-10-18T10:00:01")
+    df = buf.to_frame()
+    assert list(df.columns) == HISTORY_COLUMNS
+    assert df.iloc[0]["result"] == 3
+    assert pd.isna(df.iloc[1]["result"])
+    assert pd.isna(df.iloc[0]["error"])
+    assert {c: str(t) for c, t in df.dtypes.items()} == HISTORY_SCHEMA
+    assert df["operation"].cat.categories.tolist() == ["add", "/"]
+    assert df.iloc[1]["timestamp"] == pd.Timestamp("2026-10-18T10:00:01")
+    assert df.iloc[1]["error"] == "Cannot divide by zero"
+
+
+def test_to_frame_empty():
+    df = HistoryBuffer().to_frame()
+    assert df.empty
+    assert list(df.columns) == HISTORY_COLUMNS
+
+
+def test_from_frame_round_trip():
+    buf = HistoryBuffer()
+    buf.append("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    buf.append("divide", 1, 0, None, "boom", "2026-10-18T10:00:01")
+    copy = HistoryBuffer.from_frame(buf.to_frame())
+    assert len(copy) == 2
+    assert copy.row(0) == buf.row(0)
+    assert copy.row(1) == buf.row(1)
+
+
+def test_from_frame_tolerates_missing_columns():
+    copy = HistoryBuffer.from_frame(pd.DataFrame({"operation": ["add"], "a": [1], "b": [2]}))
+    op, a, b, result, error, ts = copy.row(0)
+    assert (op, a, b, result, error, ts) == ("add", 1.0, 2.0, None, None, None)
+
+
+def _fill(buf, n, start=0):
+    return [buf.append("add", i, 1, i + 1, None, _ts(i)) for i in range(start, start + n)]
+
+
+def test_ring_evicts_oldest_rows():
+    buf = HistoryBuffer(capacity=2, max_rows=3)
+    evicted = _fill(buf, 5)
+    assert evicted[:3] == [None, None, None]
+    assert [r[1] for r in evicted[3:]] == [0.0, 1.0]
+    assert len(buf) == 3
+    assert buf.capacity == 3
+    assert buf.evicted == 2
+    assert buf.to_frame()["a"].tolist() == [2, 3, 4]
+    assert buf.timestamps() == ["2026-10-18T10:00:02", "2026-10-18T10:00:03", "2026-10-18T10:00:04"]
+
+
+def test_ring_pop_and_append_after_wrap():
+    buf = HistoryBuffer(max_rows=3)
+    _fill(buf, 4)
+    assert [r[1] for r in buf.pop(2)] == [2.0, 3.0]
+    assert buf.append("add", 9, 1, 10, None, "2026-10-18T10:00:09") is None
+    assert buf.to_frame()["a"].tolist() == [1, 9]
+    assert buf.timestamps() == ["2026-10-18T10:00:01", "2026-10-18T10:00:09"]
+
+
+def test_bounded_keeps_newest_rows():
+    buf = HistoryBuffer()
+    _fill(buf, 5)
+    small = buf.bounded(2)
+    assert small.max_rows == 2
+    assert small.to_frame()["a"].tolist() == [3, 4]
+    assert small.append("add", 7, 1, 8, None, "2026-10-18T10:00:07")[1] == 3.0
+    assert buf.bounded(None) is buf
+
+
+def test_encode_timestamp_accepts_iso_datetime_and_ns():
+    ns = encode_timestamp("2026-10-18T10:00:00")
+    assert encode_timestamp(datetime.datetime(2026, 10, 18, 10)) == ns
+    assert encode_timestamp(datetime.datetime(2026, 10, 18, 12, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))) == ns
+    assert encode_timestamp(ns) == ns
+    assert encode_timestamp(None) == encode_timestamp("") == encode_timestamp(float("nan")) == NAT
+    assert decode_timestamp(ns) == "2026-10-18T10:00:00"
+    assert decode_timestamp(NAT) is None
+    precise = encode_timestamp("2026-10-18T10:00:00.000000789")
+    assert precise == ns + 789
+    assert decode_timestamp(precise) == "2026-10-18T10:00:00.000000789"
+    stamps = [ns, ns + 500_000, precise, NAT]
+    assert format_timestamps(np.array(stamps)) == [decode_timestamp(t) for t in stamps]
+    with pytest.raises(ValueError, match="Invalid timestamp"):
+        encode_timestamp("yesterday")
+
+
+def test_empty_frame_is_typed():
+    assert {c: str(t) for c, t in empty_frame().dtypes.items()} == HISTORY_SCHEMA
+
+
+def test_typed_frame_converts_csv_style_rows():
+    df = pd.DataFrame({"operation": ["add", "divide"], "a": ["1", "1"], "b": [2, 0], "result": [3.0, None],
+                       "error": [None, "boom"], "timestamp": ["2026-10-18T10:00:00", "not a time"]})
+    typed = typed_frame(df)
+    assert {c: str(t) for c, t in typed.dtypes.items()} == HISTORY_SCHEMA
+    assert typed["a"].tolist() == [1.0, 1.0]
+    assert pd.isna(typed.iloc[1]["result"])
+    assert pd.isna(typed.iloc[1]["timestamp"])
+
+
+def test_typed_frame_is_smaller_than_object_columns():
+    buf = HistoryBuffer()
+    for i in range(1000):
+        buf.append("add" if i % 2 else "divide", i, 1, i + 1, None, _ts(i))
+    df = buf.to_frame()
+    assert df.memory_usage(deep=True).sum() * 3 < df.astype(object).memory_usage(deep=True).sum()
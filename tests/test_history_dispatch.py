@@ -0,0 +1,176 @@
+import datetime
+import threading
+import time
+import pandas as pd
+import pytest
+from app.history import AutoSaveObserver, HistoryManager, HistoryObserver
+from app.history_dispatch import COALESCED, EventDispatcher
+
+
+def _ts(seconds):
+    return (datetime.datetime(2026, 10, 18, 10) + datetime.timedelta(seconds=seconds)).isoformat()
+
+
+class Recorder(HistoryObserver):
+    def __init__(self, gate=None):
+        self.events = []
+        self.batches = []
+        self.threads = set()
+        self.gate = gate
+
+    def update(self, event, payload):
+        self.events.append((event, payload))
+
+    def update_batch(self, events):
+        if self.gate is not None:
+            self.gate.wait()
+        self.threads.add(threading.current_thread().name)
+        self.batches.append(len(events))
+        super().update_batch(events)
+
+
+def _history(**kwargs):
+    return HistoryManager(dispatcher=EventDispatcher(**kwargs))
+
+
+def test_events_delivered_in_order_on_worker_thread():
+    history = _history(batch_size=8)
+    recorder = Recorder()
+    history.attach(recorder)
+    for i in range(20):
+        history.add("add", i, 1, i + 1, None, _ts(i))
+    history.clear()
+    assert history.flush_events(timeout=5)
+    assert [p["a"] for e, p in recorder.events if e == "added"] == list(range(20))
+    assert recorder.events[-1][0] == "cleared"
+    assert recorder.threads == {"history-dispatch"}
+    assert max(recorder.batches) <= 8
+    history.close()
+
+
+def test_block_policy_waits_for_room():
+    gate = threading.Event()
+    history = _history(max_queue=2, batch_size=1, policy="block")
+    recorder = Recorder(gate)
+    history.attach(recorder)
+    producer = threading.Thread(target=lambda: [history.add("add", i, 1, 0) for i in range(6)])
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()  # blocked on the full queue
+    gate.set()
+    producer.join(timeout=5)
+    history.close()
+    assert [p["a"] for _, p in recorder.events] == list(range(6))
+    assert history.dispatcher.dropped == 0
+
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "coalesce"])
+def test_lossy_policies_report_dropped_events(policy):
+    gate = threading.Event()
+    history = _history(max_queue=3, batch_size=100, policy=policy)
+    recorder = Recorder(gate)
+    history.attach(recorder)
+    history.add("add", -1, 1, 0)  # taken by the worker, which then waits on the gate
+    while history.dispatcher._queue:
+        time.sleep(0.001)
+    history.clear()
+    for i in range(10):
+        history.add("add", i, 1, 0)
+    gate.set()
+    history.close()
+    dropped = history.dispatcher.dropped
+    assert dropped > 0
+    assert (COALESCED, {"dropped": dropped}) in recorder.events
+    if policy == "coalesce":
+        assert ("cleared", {}) in recorder.events
+    delivered_adds = [p["a"] for e, p in recorder.events if e == "added"]
+    assert delivered_adds == sorted(delivered_adds)
+    assert delivered_adds[-1] == 9
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        EventDispatcher(policy="ignore")
+
+
+def test_close_drains_and_later_events_are_inline():
+    history = _history()
+    recorder = Recorder()
+    history.attach(recorder)
+    history.add("add", 1, 1, 2)
+    history.close()
+    assert len(recorder.events) == 1
+    history.add("add", 2, 2, 4)
+    assert len(recorder.events) == 2
+
+
+def test_autosave_resyncs_after_coalesce(tmp_path):
+    gate = threading.Event()
+    path = tmp_path / "history.csv"
+    history = _history(max_queue=4, batch_size=100, policy="coalesce")
+    history.attach(Recorder(gate))
+    autosave = AutoSaveObserver(history, str(path))
+    history.attach(autosave)
+    for i in range(50):
+        history.add("add", i, 1, i + 1, None, _ts(i))
+    gate.set()
+    history.close()
+    autosave.close()
+    assert pd.read_csv(path)["a"].tolist() == list(range(50))
+
+
+def test_autosave_skips_rows_already_compacted(tmp_path):
+    path = tmp_path / "history.csv"
+    history = _history(batch_size=100)
+    autosave = AutoSaveObserver(history, str(path))
+    gate = threading.Event()
+    history.attach(Recorder(gate))
+    history.attach(autosave)
+    for i in range(5):
+        history.add("add", i, 1, i + 1, None, _ts(i))
+    gate.set()
+    history.close()
+    autosave.close()
+    # the first add compacts all five rows; the other four must not be appended again
+    assert pd.read_csv(path)["a"].tolist() == list(range(5))
+
+
+def test_coalesce_drops_queued_batches():
+    gate = threading.Event()
+    history = _history(max_queue=2, batch_size=100, policy="coalesce")
+    recorder = Recorder(gate)
+    history.attach(recorder)
+    history.add("add", -1, 1, 0)  # taken by the worker, which then waits on the gate
+    while history.dispatcher._queue:
+        time.sleep(0.001)
+    history.add_many([("add", 0, 1, 1, None, None)])
+    history.add_many([("add", 1, 1, 2, None, None)])
+    history.add_many([("add", 2, 1, 3, None, None)])
+    gate.set()
+    history.close()
+    assert history.dispatcher.dropped == 2
+    assert [e for e, _ in recorder.events] == ["added", COALESCED, "added_batch"]
+
+
+def test_queued_events_drained_at_exit_without_close(tmp_path):
+    import subprocess
+    import sys
+    path = tmp_path / "history.csv"
+    script = f"""
+import time
+from app.history import AutoSaveObserver, HistoryManager
+from app.history_dispatch import EventDispatcher
+
+class SlowAutoSave(AutoSaveObserver):
+    def update_batch(self, events):
+        time.sleep(0.01)
+        super().update_batch(events)
+
+history = HistoryManager(dispatcher=EventDispatcher(batch_size=8))
+history.attach(SlowAutoSave(history, {str(path)!r}, flush_rows=0))
+for i in range(200):
+    history.add("add", i, 1, i + 1, None, "2026-10-18T10:00:00")
+"""
+    done = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=60)
+    assert done.returncode == 0, done.stderr
+    assert pd.read_csv(path)["a"].tolist() == list(range(200))
@@ -0,0 +1,94 @@
+import datetime
+import pytest
+from app.calculator_memento import AppendMemento, Caretaker, ReplaceMemento
+from app.history import HistoryManager
+from app.history_buffer import HistoryBuffer
+
+
+BASE = datetime.datetime(2026, 10, 18, 10)
+
+
+def _ts(seconds):
+    return (BASE + datetime.timedelta(seconds=seconds)).isoformat()
+
+
+def _fill(history, n, start=0):
+    for i in range(start, start + n):
+        history.add("add" if i % 2 == 0 else "subtract", i, 1, i + 1 if i % 2 == 0 else i - 1, None, _ts(i))
+
+
+def test_query_uses_filters():
+    history = HistoryManager()
+    _fill(history, 5)
+    history.add("divide", 1, 0, None, "Cannot divide by zero", "2026-10-18T10:00:09")
+    assert history.query(operation="add")["a"].tolist() == [0, 2, 4]
+    assert history.query(status="error")["b"].tolist() == [0]
+    assert len(history.query(status="ok")) == 5
+    assert history.query(since="2026-10-18T10:00:03", until="2026-10-18T10:00:05")["a"].tolist() == [3, 4]
+    assert history.query(result=(2, 3))["a"].tolist() == [2, 3]
+    assert history.query(a=(None, 1), b=(1, 1))["a"].tolist() == [0, 1]
+    assert len(history.query(limit=2)) == 2
+    assert history.query(operation="power").empty
+    assert history.query(operation="add", since="2026-10-18T10:00:01", result=(4, None))["a"].tolist() == [4]
+    with pytest.raises(ValueError):
+        history.query(status="maybe")
+    with pytest.raises(ValueError):
+        history.query(operation_id=(1, 2))
+
+
+def test_query_reads_only_candidate_rows(monkeypatch):
+    history = HistoryManager()
+    _fill(history, 1000)
+    taken = []
+    original = HistoryBuffer.take
+    monkeypatch.setattr(HistoryBuffer, "take", lambda self, positions: taken.append(len(positions)) or original(self, positions))
+    assert len(history.query(since=_ts(10), until=_ts(20))) == 10
+    assert len(history.query(operation="add", since=_ts(10), until=_ts(20))) == 5
+    assert taken == [10, 5]
+
+
+def test_index_follows_undo_redo_clear_and_load(tmp_path):
+    history = HistoryManager()
+    caretaker = Caretaker()
+    _fill(history, 4)
+    history.add("divide", 1, 0, None, "Cannot divide by zero", "2026-10-18T10:00:05")
+    caretaker.save(AppendMemento(1))
+    caretaker.undo(history)
+    assert history.query(status="error").empty
+    assert history.query(since="2026-10-18T10:00:05").empty
+    caretaker.redo(history)
+    assert len(history.query(status="error")) == 1
+
+    before = history.state
+    history.clear()
+    caretaker.save(ReplaceMemento(before, history.state))
+    assert history.query(operation="add").empty
+    caretaker.undo(history)
+    assert history.query(operation="add")["a"].tolist() == [0, 2]
+
+    path = tmp_path / "h.csv"
+    history.save(str(path))
+    history.clear()
+    _fill(history, 3, start=10)
+    history.load(str(path))
+    assert history.query(operation="add")["a"].tolist() == [0, 2]
+    history.add("add", 50, 1, 51, None, "2026-10-18T09:00:00")  # out of time order
+    assert history.query(until="2026-10-18T10:00:00")["a"].tolist() == [50]
+
+
+def test_query_skips_evicted_rows_and_rebuilds():
+    history = HistoryManager(max_size=10)
+    _fill(history, 3000)
+    assert history.query(operation="add")["a"].tolist() == [2990, 2992, 2994, 2996, 2998]
+    assert history.query(since=_ts(0))["a"].min() == 2990
+    assert len(history._index._time_keys) <= 10 + 2 * 1024
+
+
+def test_query_on_binary_loaded_history(tmp_path):
+    history = HistoryManager()
+    _fill(history, 6)
+    path = tmp_path / "h.hbin"
+    history.save(str(path))
+    loaded = HistoryManager()
+    loaded.load(str(path))
+    assert loaded.query(operation="subtract", since="2026-10-18T10:00:02")["a"].tolist() == [3, 5]
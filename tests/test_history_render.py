@@ -0,0 +1,69 @@
+import datetime
+import pytest
+from app.calculator_memento import AppendMemento, Caretaker
+from app.calculator_repl import parse_history_args
+from app.history import HistoryManager
+
+
+def _ts(seconds):
+    return (datetime.datetime(2026, 10, 18, 10) + datetime.timedelta(seconds=seconds)).isoformat()
+
+
+def _fill(history, n, start=0):
+    for i in range(start, start + n):
+        history.add("add", i, 1, i + 1, None, _ts(i))
+
+
+def test_render_formats_only_the_slice():
+    history = HistoryManager()
+    _fill(history, 1000)
+    table = history.render(-3).splitlines()
+    assert table[0].split() == ["operation", "a", "b", "result", "error", "timestamp"]
+    assert table[1].split() == ["add", "997", "1", "998", "-", _ts(997)]
+    assert len(table) == 4
+    assert history._renderer.formatted == 3
+
+
+def test_render_reuses_cached_rows_after_appends():
+    history = HistoryManager()
+    _fill(history, 50)
+    history.render(-20)
+    _fill(history, 2, start=50)
+    last = history.render(-20).splitlines()[-1]
+    assert last.split()[1] == "51"
+    assert history._renderer.formatted == 22
+
+
+def test_render_follows_undo_and_clear():
+    history = HistoryManager()
+    caretaker = Caretaker()
+    _fill(history, 3)
+    history.render()
+    caretaker.save(AppendMemento(1))
+    caretaker.undo(history)
+    history.add("divide", 1, 0, None, "Cannot divide by zero", "2026-10-18T10:00:09")
+    last = history.render().splitlines()[-1]
+    assert last.split()[:4] == ["divide", "1", "0", "-"]
+    history.clear()
+    assert len(history.render().splitlines()) == 1
+
+
+def test_render_with_evictions():
+    history = HistoryManager(max_size=5)
+    _fill(history, 20)
+    assert [line.split()[1] for line in history.render().splitlines()[1:]] == ["15", "16", "17", "18", "19"]
+    _fill(history, 1, start=20)
+    assert history.render(-1).splitlines()[-1].split()[1] == "20"
+
+
+def test_parse_history_args():
+    assert parse_history_args("", 100) == (80, 100)
+    assert parse_history_args("head 10", 100) == (0, 10)
+    assert parse_history_args("tail 5", 3) == (0, 3)
+    assert parse_history_args("page 2 limit 30", 100) == (30, 60)
+    assert parse_history_args("page 9", 100) == (100, 100)
+    assert parse_history_args("limit 7", 100) == (93, 100)
+    assert parse_history_args("all", 100) == (0, 100)
+    for bad in ("head", "head x", "head 0", "sideways 3", "head 1 tail 2"):
+        with pytest.raises(ValueError):
+            parse_history_args(bad, 100)
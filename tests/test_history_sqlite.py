@@ -0,0 +1,205 @@
+import pandas as pd
+import pytest
+from app.calculator_memento import Caretaker, AppendMemento, ReplaceMemento
+from app.history import HistoryObserver
+from app.history_sqlite import SQLiteHistoryManager
+
+
+@pytest.fixture
+def history(tmp_path):
+    h = SQLiteHistoryManager(str(tmp_path / "history.db"), batch_size=3)
+    yield h
+    h.close()
+
+
+class Recorder(HistoryObserver):
+    def __init__(self):
+        self.events = []
+
+    def update(self, event, payload):
+        self.events.append(event)
+
+
+def _fill(history, n=5):
+    for i in range(n):
+        history.add("add" if i % 2 == 0 else "divide", i, 1, i + 1, None, f"2026-10-18T10:00:0{i}")
+
+
+def test_add_batches_inserts(history):
+    _fill(history, 2)
+    assert len(history) == 2
+    assert len(history._pending) == 2
+    history.add("add", 9, 9, 18, None, "2026-10-18T10:00:00")
+    assert history._pending == []
+    assert history.df["a"].tolist() == [0, 1, 9]
+
+
+def test_rows_persist_across_reopen(tmp_path):
+    path = str(tmp_path / "history.db")
+    h = SQLiteHistoryManager(path)
+    _fill(h, 4)
+    h.close()
+    reopened = SQLiteHistoryManager(path)
+    assert len(reopened) == 4
+    assert reopened.df.iloc[-1]["a"] == 3
+    reopened.close()
+
+
+def test_observer_events_unchanged(history, tmp_path):
+    rec = Recorder()
+    history.attach(rec)
+    history.add("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    history.save(str(tmp_path / "out.csv"))
+    history.load(str(tmp_path / "out.csv"))
+    history.clear()
+    assert rec.events == ["added", "saved", "loaded", "cleared"]
+
+
+def test_save_and_load_csv_and_binary(history, tmp_path):
+    _fill(history, 3)
+    for name in ("out.csv", "out.hbin"):
+        history.save(str(tmp_path / name))
+        history.clear()
+        history.load(str(tmp_path / name))
+        assert history.df["a"].tolist() == [0, 1, 2]
+
+
+def test_query_uses_filters(history):
+    _fill(history, 5)
+    history.add("divide", 1, 0, None, "Cannot divide by zero", "2026-10-18T10:00:09")
+    assert history.query(operation="add")["a"].tolist() == [0, 2, 4]
+    assert history.query(status="error")["b"].tolist() == [0]
+    assert len(history.query(status="ok")) == 5
+    assert history.query(since="2026-10-18T10:00:03", until="2026-10-18T10:00:05")["a"].tolist() == [3, 4]
+    assert history.query(result=(2, 3))["a"].tolist() == [1, 2]
+    assert len(history.query(limit=2)) == 2
+    assert history.query(operation="power").empty
+    with pytest.raises(ValueError):
+        history.query(status="maybe")
+    with pytest.raises(ValueError):
+        history.query(operation_id=(1, 2))
+
+
+def test_indexes_exist(history):
+    names = {r[0] for r in history._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"idx_history_gen_operation", "idx_history_gen_timestamp"} <= names
+    mode = history._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_undo_redo_with_generations(history):
+    caretaker = Caretaker()
+    _fill(history, 2)
+    caretaker.save(AppendMemento(2))
+    before = history.state
+    history.clear()
+    caretaker.save(ReplaceMemento(before, history.state))
+    history.add("add", 7, 7, 14, None, "2026-10-18T10:00:00")
+    caretaker.save(AppendMemento(1))
+
+    caretaker.undo(history)
+    assert history.df.empty
+    caretaker.undo(history)
+    assert history.df["a"].tolist() == [0, 1]
+    caretaker.undo(history)
+    assert len(history) == 0
+    caretaker.redo(history)
+    caretaker.redo(history)
+    caretaker.redo(history)
+    assert history.df["a"].tolist() == [7]
+
+
+def test_stale_generations_purged_on_open(tmp_path):
+    path = str(tmp_path / "history.db")
+    h = SQLiteHistoryManager(path)
+    _fill(h, 3)
+    h.clear()
+    h.add("add", 1, 1, 2, None, "2026-10-18T10:00:00")
+    h.close()
+    reopened = SQLiteHistoryManager(path)
+    total = reopened._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+    assert total == 1
+    reopened.close()
+
+
+def test_summary_follows_undo_and_reopen(history, tmp_path):
+    caretaker = Caretaker()
+    _fill(history, 5)
+    assert history.summary("add")["count"] == 3
+    history.add("add", 50, 50, 100, None, "2026-10-18T10:00:00")
+    caretaker.save(AppendMemento(1))
+    assert history.summary("add")["max"] == 100
+    caretaker.undo(history)
+    assert history.summary("add")["max"] == 5
+    before = history.state
+    history.clear()
+    caretaker.save(ReplaceMemento(before, history.state))
+    assert history.summary() == {}
+    caretaker.undo(history)
+    assert history.summary("divide")["mean"] == 3
+    history.close()
+    reopened = SQLiteHistoryManager(str(tmp_path / "history.db"))
+    assert reopened.summary_overall()["count"] == 5
+    reopened.close()
+
+
+def test_render_pages_from_the_database(history):
+    _fill(history, 5)
+    lines = history.render(1, 3).splitlines()
+    assert [line.split()[1] for line in lines[1:]] == ["1", "2"]
+    history.pop(1)
+    history.add("add", 9, 9, 18, None, "2026-10-18T10:00:00")
+    assert history.render(-1).splitlines()[-1].split()[1] == "9"
+
+
+def test_add_many_queues_rows_and_sends_one_event(history):
+    rec = Recorder()
+    history.attach(rec)
+    assert history.add_many(("add", i, 1, i + 1, None, f"2026-10-18T10:00:0{i}") for i in range(4)) == 4
+    assert history._pending == []
+    assert len(history) == 4
+    assert rec.events == ["added_batch"]
+    assert history.df["a"].tolist() == [0, 1, 2, 3]
+    assert history.summary("add")["count"] == 4
+
+
+def test_timestamps_stored_as_epoch_nanoseconds(history):
+    # 11:00+02:00 is 09:00 UTC: earlier than 10:00 although it sorts later as text
+    history.add("add", 1, 1, 2, None, "2026-10-18T11:00:00+02:00")
+    history.add("add", 2, 2, 4, None, "2026-10-18T10:00:00.000000001")
+    history.add("add", 3, 3, 6, None, None)
+    history.flush()
+    stored = [r[0] for r in history._conn.execute("SELECT timestamp FROM history ORDER BY id")]
+    assert stored[0] == 1792314000000000000 and stored[2] is None
+    assert history.query(since="2026-10-18T09:30:00")["a"].tolist() == [2]
+    assert history.df["timestamp"].tolist()[:2] == [pd.Timestamp("2026-10-18T09:00:00"),
+                                                     pd.Timestamp("2026-10-18T10:00:00.000000001")]
+
+
+def test_text_timestamps_migrated_on_open(tmp_path):
+    import sqlite3
+    path = tmp_path / "history.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE history (id INTEGER PRIMARY KEY, gen INTEGER NOT NULL, operation TEXT,
+                              a REAL, b REAL, result REAL, error TEXT, timestamp TEXT);
+        CREATE INDEX idx_history_gen_timestamp ON history (gen, timestamp);
+        INSERT INTO history VALUES (1, 0, 'add', 1, 2, 3, NULL, '2026-10-18T10:00:00');
+        INSERT INTO history VALUES (2, 0, 'add', 4, 5, 9, NULL, 'not a time');
+    """)
+    conn.close()
+    h = SQLiteHistoryManager(str(path))
+    kinds = {name: kind for _, name, kind, *_ in h._conn.execute("PRAGMA table_info(history)")}
+    assert kinds["timestamp"] == "INTEGER"
+    assert h.df["a"].tolist() == [1, 4]
+    assert h.df["timestamp"].isna().tolist() == [False, True]
+    h.close()
+
+
+def test_flush_after_close_is_a_no_op(tmp_path):
+    h = SQLiteHistoryManager(str(tmp_path / "history.db"))
+    h.add("add", 1, 2, 3, None, "2026-10-18T10:00:00")
+    h.close()
+    h._pending.append(("add", 1, 2, 3, None, None))
+    h.flush()
+    h.close()
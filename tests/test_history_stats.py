@@ -0,0 +1,108 @@
+import random
+import pytest
+from app.calculator_memento import AppendMemento, Caretaker, ReplaceMemento
+from app.history import HistoryManager
+from app.history_stats import HistoryStats, OperationStats, QuantileSketch
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(0, 2) * rng.choice([-1, 1]) for _ in range(5000)] + [0.0] * 50
+    sketch = QuantileSketch(0.01)
+    for v in values:
+        sketch.add(v)
+    ordered = sorted(values)
+    for q in (0.0, 0.1, 0.5, 0.9, 0.99, 1.0):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.0201, abs=1e-12)
+    assert QuantileSketch().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        QuantileSketch(0)
+
+
+def test_sketch_remove_and_merge():
+    left, right, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for v in range(1, 101):
+        (left if v % 2 else right).add(v)
+        both.add(v)
+    left.merge(right)
+    assert left.count == 100
+    assert left.quantile(0.5) == both.quantile(0.5)
+    for v in range(51, 101):
+        both.remove(v)
+    assert both.quantile(1.0) == pytest.approx(50, rel=0.01)
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(0.05))
+
+
+def test_operation_stats_undo_restores_min_max():
+    stats = OperationStats()
+    for v in (5, 3, 8, 3, 1):
+        stats.add(v)
+    stats.add(None, "Cannot divide by zero")
+    s = stats.summary()
+    assert (s["count"], s["errors"], s["min"], s["max"], s["mean"]) == (6, 1, 1, 8, 4)
+    assert s["error_rate"] == pytest.approx(1 / 6)
+    stats.remove(None, "Cannot divide by zero")
+    stats.remove(1)
+    assert stats.summary()["min"] == 3
+    stats.remove(3)
+    stats.remove(8)
+    assert (stats.summary()["min"], stats.summary()["max"]) == (3, 5)
+    stats.remove(3)
+    stats.remove(5)
+    assert stats.summary() == {"count": 0, "errors": 0, "error_rate": 0.0, "min": None, "max": None,
+                               "mean": None, "p50": None, "p99": None}
+
+
+def test_history_stats_merge():
+    a, b = HistoryStats(), HistoryStats()
+    a.add("add", 1)
+    b.add("add", 9)
+    b.add("divide", None, "boom")
+    a.merge(b)
+    assert a.summary("add")["min"] == 1 and a.summary("add")["max"] == 9
+    assert a.overall().summary()["count"] == 3
+
+
+def test_summary_follows_undo_redo_clear_and_load(tmp_path):
+    history = HistoryManager()
+    caretaker = Caretaker()
+    for i in range(1, 6):
+        history.add("add", i, 0, i)
+    history.add("divide", 1, 0, None, "Cannot divide by zero")
+    assert history.summary("add")["mean"] == 3
+    assert history.summary()["divide"]["error_rate"] == 1.0
+    history.add("add", 100, 0, 100)
+    caretaker.save(AppendMemento(1))
+    assert history.summary("add")["max"] == 100
+    caretaker.undo(history)
+    assert history.summary("add")["max"] == 5
+    caretaker.redo(history)
+    assert history.summary("add")["max"] == 100
+
+    before = history.state
+    history.clear()
+    caretaker.save(ReplaceMemento(before, history.state))
+    assert history.summary() == {}
+    caretaker.undo(history)
+    assert history._stats.stale is False  # swapped back, not rebuilt
+    assert history.summary("add")["count"] == 6
+
+    path = tmp_path / "h.csv"
+    history.save(str(path))
+    history.clear()
+    history.add("power", 2, 2, 4)
+    history.load(str(path))
+    assert sorted(history.summary()) == ["add", "divide"]
+    assert history.summary("add")["max"] == 100
+    assert history.summary_overall()["count"] == 7
+
+
+def test_summary_keeps_evicted_rows():
+    history = HistoryManager(max_size=3)
+    for i in range(10):
+        history.add("multiply", i, 1, i)
+    assert len(history) == 3
+    assert history.summary("multiply")["count"] == 10
+    assert history.summary("multiply")["min"] == 0
@@ -1,5 +1,5 @@
 import pytest
-from app.input_validators import parse_operands_lbyl, parse_operands_eafp
+from app.input_validators import parse_operand_eafp, parse_operands_lbyl, parse_operands_eafp
 from app.exceptions import OperandError
 
 @pytest.mark.parametrize(
@@ -78,3 +78,11 @@ def test_parse_operands_eafp_invalid(a_raw, b_raw):
     """EAFP invalid conversion should raise OperandError."""
     with pytest.raises(OperandError, match="Operands must be numeric"):
         parse_operands_eafp(a_raw, b_raw)
+
+
+def test_parse_operand_eafp():
+    assert parse_operand_eafp(" 2.5 ") == 2.5
+    with pytest.raises(OperandError, match="x must be numeric"):
+        parse_operand_eafp("two", "x")
+    with pytest.raises(OperandError, match="Operand must be numeric"):
+        parse_operand_eafp(None)
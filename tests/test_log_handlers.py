@@ -0,0 +1,113 @@
+import json
+import logging
+import threading
+import pytest
+from app.log_handlers import (
+    BatchedRotatingFileHandler, EventSampler, JsonLinesFormatter,
+    attach_handlers, make_file_handler, stop_queue_logging,
+)
+from app.history import LoggingObserver
+from app.logger import setup_logger
+
+
+def _record(msg="hello", **extra):
+    record = logging.LogRecord("calc", logging.INFO, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_keeps_payload_as_object():
+    line = JsonLinesFormatter().format(_record(event="added", payload={"a": 1.5, "result": None}))
+    entry = json.loads(line)
+    assert entry["event"] == "added"
+    assert entry["payload"] == {"a": 1.5, "result": None}
+    assert " " not in line
+    assert json.loads(JsonLinesFormatter().format(_record()))["msg"] == "hello"
+
+
+def test_batched_handler_writes_per_batch(tmp_path):
+    path = tmp_path / "batched.log"
+    handler = BatchedRotatingFileHandler(str(path), batch_size=3)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.emit(_record("one"))
+    handler.emit(_record("two"))
+    assert not path.exists()  # nothing written, file not even opened yet
+    handler.emit(_record("three"))
+    assert path.read_text().splitlines() == ["one", "two", "three"]
+    handler.emit(_record("four"))
+    handler.close()
+    assert path.read_text().splitlines()[-1] == "four"
+
+
+def test_batched_handler_rotates_by_size(tmp_path):
+    path = tmp_path / "rotating.log"
+    handler = BatchedRotatingFileHandler(str(path), maxBytes=50, backupCount=2, batch_size=2)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for i in range(20):
+        handler.emit(_record(f"line-{i:02d}-xxxxxxxxxx"))
+    handler.close()
+    rotated = sorted(p.name for p in tmp_path.iterdir())
+    assert rotated == ["rotating.log", "rotating.log.1", "rotating.log.2"]
+    assert all(p.stat().st_size <= 50 for p in tmp_path.iterdir())
+
+
+def test_make_file_handler_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        make_file_handler(str(tmp_path / "x.log"), fmt="xml")
+
+
+def test_queue_logging_writes_on_listener_thread(tmp_path):
+    threads = []
+
+    class Recording(logging.Handler):
+        def emit(self, record):
+            threads.append(threading.current_thread())
+
+    logger = logging.getLogger("queue-test")
+    logger.handlers = []
+    logger.setLevel(logging.INFO)
+    attach_handlers(logger, [Recording()], use_queue=True)
+    for i in range(5):
+        logger.info("msg %d", i)
+    stop_queue_logging("queue-test")
+    assert len(threads) == 5
+    assert threading.current_thread() not in threads
+    # after the listener stops the logger keeps working synchronously
+    logger.info("late")
+    assert threads[-1] is threading.current_thread()
+
+
+def test_sampler_every_n():
+    sampler = EventSampler(every=3)
+    assert [sampler.allow() for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert sampler.suppressed == 4
+
+
+def test_sampler_rate_limit():
+    now = [0.0]
+    sampler = EventSampler(max_per_second=2, clock=lambda: now[0])
+    assert [sampler.allow() for _ in range(4)] == [True, True, False, False]
+    now[0] = 1.0
+    assert sampler.allow() and sampler.allow() and not sampler.allow()
+
+
+def test_logging_observer_json_queue_and_sampling(tmp_path):
+    path = tmp_path / "history.jsonl"
+    observer = LoggingObserver(str(path), fmt="json", use_queue=True, batch_size=10, sample_every=2)
+    for i in range(6):
+        observer.update("added", {"a": i})
+    observer.update("cleared", {})
+    observer.close()
+    entries = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [e["payload"] for e in entries if e["event"] == "added"] == [{"a": 0}, {"a": 2}, {"a": 4}]
+    assert entries[-1]["event"] == "cleared"
+    assert observer.sampler.suppressed == 3
+
+
+def test_setup_logger_json_queue(tmp_path):
+    path = tmp_path / "app.jsonl"
+    log = setup_logger("json_queue_logger", str(path), fmt="json", use_queue=True)
+    log.info("started %s", "ok")
+    stop_queue_logging("json_queue_logger")
+    messages = [json.loads(line)["msg"] for line in path.read_text().splitlines()]
+    assert messages == ["Logger initialized.", "started ok"]
@@ -2,7 +2,8 @@
 import logging
 from unittest.mock import patch
 import pytest
-from app.logger import setup_logger, logger, main
+import app.logger
+from app.logger import setup_logger, main
 
 def test_setup_logger_returns_logger(tmp_path):
     log_file = tmp_path / "calc.log"
@@ -62,3 +63,11 @@ def test_shared_logger_instance(tmp_path):
     log1 = setup_logger("shared_logger", str(log_file))
     log2 = setup_logger("shared_logger", str(log_file))
     assert log1 is log2
+
+def test_shared_logger_created_on_first_access(monkeypatch):
+    monkeypatch.delitem(vars(app.logger), "logger", raising=False)
+    shared = logging.getLogger("lazy_shared")
+    with patch("app.logger.setup_logger", return_value=shared) as mock_setup:
+        assert app.logger.logger is shared
+        assert app.logger.logger is shared
+    mock_setup.assert_called_once_with()
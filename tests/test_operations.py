@@ -1,7 +1,11 @@
+import math
+import numpy as np
 import pytest
 from app.operations import (
     Add, Subtract, Multiply, Divide, Power, Root,
-    get_operation_instance, _OPERATION_REGISTRY
+    Modulus, IntDivide, Percent, AbsDiff,
+    get_operation_instance, _OPERATION_REGISTRY,
+    resolve_operation, get_operation, operation_name, canonical_name, OPERATION_NAMES
 )
 from app.exceptions import InvalidOperationError
 
@@ -109,3 +113,101 @@ def test_registry_contains_expected_keys():
         "divide", "/", "power", "**", "root", "root"
     }
     assert expected_tokens.issubset(set(_OPERATION_REGISTRY.keys()))
+
+
+ALL_OPERATIONS = [Add, Subtract, Multiply, Divide, Power, Root, Modulus, IntDivide, Percent, AbsDiff]
+GRID = [-16.0, -8.0, -2.5, -1.0, 0.0, 0.5, 1.0, 2.0, 3.0, 400.0]
+
+
+@pytest.mark.parametrize("cls", ALL_OPERATIONS)
+def test_execute_array_matches_scalar(cls):
+    """Every kernel must agree with the scalar strategy, including its domain errors."""
+    op = cls()
+    a = np.repeat(GRID, len(GRID))
+    b = np.tile(GRID, len(GRID))
+    values, errors = op.execute_array(a, b)
+    assert values.shape == a.shape
+
+    for i, (x, y) in enumerate(zip(a, b)):
+        failed = [msg for msg, mask in errors.items() if mask[i]]
+        try:
+            expected = op.execute(float(x), float(y))
+        except Exception as e:
+            assert failed == [str(e)], (x, y)
+            assert math.isnan(values[i])
+        else:
+            assert failed == [], (x, y)
+            assert values[i] == pytest.approx(expected, nan_ok=True), (x, y)
+
+
+EDGE_GRID = [0.0, -0.0, 1.0, -1.0, 2.0, -2.0, 0.5, -0.5, 27.0, -27.0, 2.5, 1 / 3,
+             1e308, -1e308, 1e-320, -1e-320, math.inf, -math.inf, math.nan]
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("cls", ALL_OPERATIONS)
+def test_execute_array_matches_scalar_on_edges(cls):
+    """Signed zeros, subnormals, overflow and non-finite operands: same errors,
+    same values (to rounding), same signs, and no RuntimeWarning from numpy."""
+    op = cls()
+    a = np.repeat(EDGE_GRID, len(EDGE_GRID))
+    b = np.tile(EDGE_GRID, len(EDGE_GRID))
+    values, errors = op.execute_array(a, b)
+
+    for i, (x, y) in enumerate(zip(a, b)):
+        failed = [msg for msg, mask in errors.items() if mask[i]]
+        try:
+            expected = op.execute(float(x), float(y))
+        except Exception as e:
+            assert failed == [str(e)], (x, y)
+        else:
+            assert failed == [], (x, y)
+            if math.isnan(expected):
+                assert math.isnan(values[i]), (x, y)
+            else:
+                assert math.isclose(values[i], expected, rel_tol=1e-12), (x, y)
+                assert math.copysign(1, values[i]) == math.copysign(1, expected), (x, y)
+
+
+@pytest.mark.parametrize("a,b,expected", [(-27.0, 3.0, -3.0), (64.0, 3.0, 4.0), (8.0, 1.5, 4.0)])
+def test_root_exact_integer_roots(a, b, expected):
+    assert Root().execute(a, b) == expected
+    values, _ = Root().execute_array(np.array([a]), np.array([b]))
+    assert values[0] == expected
+
+
+def test_divide_array_zero_mask():
+    values, errors = Divide().execute_array(np.array([1.0, 4.0]), np.array([0.0, 2.0]))
+    assert errors["Cannot divide by zero"].tolist() == [True, False]
+    assert math.isnan(values[0])
+    assert values[1] == 2
+
+
+def test_root_array_even_root_of_negative_mask():
+    values, errors = Root().execute_array(np.array([-16.0, -8.0]), np.array([2.0, 3.0]))
+    assert errors["Even root of negative number not supported"].tolist() == [True, False]
+    assert values[1] == pytest.approx(-2)
+
+
+def test_power_fractional_of_negative_raises():
+    with pytest.raises(ValueError, match="Fractional power of negative number"):
+        Power().execute(-8, 0.5)
+
+
+def test_aliases_share_one_instance():
+    assert get_operation_instance("+") is get_operation_instance("add")
+    assert get_operation_instance(" POWER ") is get_operation_instance("**")
+
+
+def test_resolve_operation_ids_round_trip():
+    for op_id, name in enumerate(OPERATION_NAMES):
+        assert resolve_operation(name) == op_id
+        assert operation_name(op_id) == name
+        assert get_operation(op_id) is get_operation_instance(name)
+    assert resolve_operation("//") == resolve_operation("int_divide")
+    assert canonical_name(" ADD ") == canonical_name("+") == "add"
+
+
+def test_resolve_operation_invalid():
+    with pytest.raises(InvalidOperationError):
+        resolve_operation("sqrt")